@@ -1,32 +1,151 @@
 from fastapi import FastAPI, Request
-from app.services.rag_service import RagService
-from app.services.chat_service import create_item, get_chats_by_user_id, get_chats_by_user_id_and_pagination
-from app.repositories.qdrant_repository import QdrantRepository
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from app.services.chat_document_service import resolve_documents, save_documents
+from app.services.chat_service import CHAT_HISTORY_PROJECTION, create_indexes, create_item, get_chats_by_user_id, get_chats_by_user_id_and_pagination
+from app.services.summary_service import create_indexes as create_summary_indexes, get_summary, schedule_summary_update
 from app.services.rabbitmq_service import RabbitMQ
-from app.utils.document import to_document
-from app.utils.embedding import from_document
+from app.services.intent_service import ROUTED_REPLIES
+from app.core.bootstrap import get_answer_cache, get_embedding_cache, get_intent_classifier, get_property_ingestion_service, get_qdrant_repo, get_rag_service, property_collection, warm_up
+from app.consumer import consume_properties
 from app.middlewares.auth_middleware import JWTMiddleware
 from app.models.chat_model import Chat
-import os
+from app.utils.executor import install_default_executor
+from app.utils.llm_gateway import GatewayOverloaded, bind_gateways
+from app.utils.sse import to_server_sent_event
+from app.utils.chat_history import trim_chat_history
+from app.utils.metrics import metrics_response_body, new_trace_id, stage
+from app.core.config import settings
+from contextlib import asynccontextmanager
+import asyncio
+import logging
 import dotenv
-import json
-import threading
 from uuid import uuid4
 
 dotenv.load_dotenv()
 
-property_collection = os.getenv("QDRANT_PROPERTY_COLLECTION")
+logging.basicConfig(level=settings.LOG_LEVEL, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
 
-app = FastAPI()
+logger = logging.getLogger(__name__)
 
-qdrant_repo = QdrantRepository()
-rag_service = RagService(qdrant_repo=qdrant_repo, collection_names=[property_collection])
 rabbitmq_service = RabbitMQ()
 
-qdrant_repo.create_collection(collection_name=property_collection)
+CONSUMER_RESTART_DELAY_SECONDS = 5
+# The in-process property consumer, and whether it is waiting to be restarted after a failure (reported by /health)
+consumer = {"task": None, "restarting": False}
+
+def start_consumer(delay: float = 0):
+    consumer["task"] = asyncio.create_task(run_consumer(delay))
+    consumer["task"].add_done_callback(on_consumer_done)
+
+async def run_consumer(delay: float):
+    if delay:
+        await asyncio.sleep(delay)
+
+    consumer["restarting"] = False
+    await consume_properties(rabbitmq_service, get_property_ingestion_service())
+
+def on_consumer_done(task: asyncio.Task):
+    # Cancelled on shutdown. Anything else would silently stop ingestion, so it is logged and the consumer restarted
+    if task.cancelled():
+        return
+
+    logger.error("Property consumer stopped, restarting in %d s", CONSUMER_RESTART_DELAY_SECONDS, exc_info=task.exception())
+    consumer["restarting"] = True
+    start_consumer(delay=CONSUMER_RESTART_DELAY_SECONDS)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    install_default_executor()
+    bind_gateways()
+    # Importing this module builds nothing, the services are built here, concurrently, before the first request
+    services = [get_rag_service, get_intent_classifier]
+
+    if settings.INGESTION_CONSUMER_ENABLED:
+        services.append(get_property_ingestion_service)
+
+    await asyncio.gather(create_indexes(), create_summary_indexes(), warm_up(*services))
+
+    if settings.INGESTION_CONSUMER_ENABLED:
+        await rabbitmq_service.connect()
+        start_consumer()
+
+    yield
+
+    if consumer["task"] is not None:
+        consumer["task"].cancel()
+        await asyncio.gather(consumer["task"], return_exceptions=True)
+
+    await rabbitmq_service.close()
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(JWTMiddleware)
 
+@app.exception_handler(GatewayOverloaded)
+async def gateway_overloaded_handler(request: Request, exc: GatewayOverloaded):
+    # Shed load gets a quick 503 the client can retry, rather than a request stuck behind the Gemini rate limit
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "5"})
+
+async def load_chat_history(user_id: str):
+    # A limit of 0 would fetch every chat
+    if settings.CHAT_HISTORY_MAX_TURNS <= 0:
+        return []
+
+    with stage("history_fetch"):
+        chats = await get_chats_by_user_id(user_id=user_id, top_k=settings.CHAT_HISTORY_MAX_TURNS, projection=CHAT_HISTORY_PROJECTION)
+        await resolve_documents(chats)
+
+    chat_history = []
+
+    # Chats come newest first, the LLM expects the conversation in order
+    for chat in reversed(chats):
+        chat_history.append({
+            # uuid for _id
+            "_id": str(uuid4()),
+            "human": chat["request"],
+            "ai": chat["response"],
+            "source_documents": chat["source_documents"],
+            "page_contents": chat["page_contents"]
+        })
+
+    return trim_chat_history(
+        chat_history, max_turns=settings.CHAT_HISTORY_MAX_TURNS, max_tokens=settings.CHAT_HISTORY_MAX_TOKENS,
+        include_page_contents=not settings.CONTEXT_PACKING_ENABLED
+    )
+
+async def load_summary(user_id: str):
+    if not settings.CHAT_SUMMARY_ENABLED:
+        return None
+
+    with stage("summary_fetch"):
+        return await get_summary(user_id=user_id)
+
+async def save_chat(user_id: str, query: str, response: dict):
+    with stage("save_chat"):
+        documents = await save_documents(source_documents=response["source_documents"], page_contents=response["page_contents"])
+        chat_res = Chat(
+            user_id=user_id, 
+            request=query, 
+            response=response["result"], 
+            documents=documents
+        )
+        await create_item(item=chat_res)
+
+    if settings.CHAT_SUMMARY_ENABLED:
+        schedule_summary_update(user_id=user_id, summarize=get_rag_service().asummarize_conversation)
+
+def route_intent(query: str):
+    """The canned reply for a confidently classified contract or payment-history question, None to answer with RAG."""
+    intent_classifier = get_intent_classifier()
+
+    if intent_classifier is None:
+        return None
+
+    with stage("intent_classify"):
+        intent = intent_classifier.classify(query)
+
+    return ROUTED_REPLIES.get(intent)
+
 @app.get("/api/v1/chat-service/chats")
 async def get_chats(request: Request):
     user = request.state.user
@@ -37,9 +156,11 @@ async def get_chats(request: Request):
     is_pagination = request.query_params.get("pagination", False)
 
     if is_pagination:
-        chats = get_chats_by_user_id_and_pagination(user_id=user_id, top_k=top_k, skip=skip)
+        chats = await get_chats_by_user_id_and_pagination(user_id=user_id, top_k=top_k, skip=skip)
     else:
-        chats = get_chats_by_user_id(user_id=user_id)
+        chats = await get_chats_by_user_id(user_id=user_id)
+
+    await resolve_documents(chats)
 
     chat_history = []
 
@@ -59,98 +180,93 @@ async def generate_response(request: Request):
     data = await request.json()
     query = data["query"]
 
-    # FIXME: Uncomment this block to enable the RAG model
-    # response = rag_service.classify_question(message=query)
+    routed_reply = route_intent(query)
 
-    # if response == "kiểm tra hợp đồng":
-    #     return {"response": f"Đã gửi yêu cầu kiểm tra hợp đồng. Vui lòng chờ trong giây lát."}
-    
-    # if response == "xem lịch sử thanh toán":
-    #     return {"response": f"Đã gửi yêu cầu xem lịch sử thanh toán. Vui lòng chờ trong giây lát."}
+    if routed_reply is not None:
+        return {"response": routed_reply}
 
     user = request.state.user
     user_id = (user["id"])
+    new_trace_id(request.headers.get("X-Request-ID"))
 
-    chats = get_chats_by_user_id(user_id=user_id)
+    with stage("generate"):
+        chat_history, summary = await asyncio.gather(load_chat_history(user_id=user_id), load_summary(user_id=user_id))
 
-    chat_history = []
+        response = await get_rag_service().agenerate_response(collection_name=property_collection, query=query, chat_history=chat_history, summary=summary)
+        # source_documents=[document.metadata for document in response["source_documents"]]
 
-    for chat in chats:
-        chat_history.append({
-            # uuid for _id
-            "_id": str(uuid4()),
-            "human": chat["request"],
-            "ai": chat["response"],
-            "source_documents": chat["source_documents"],
-            "page_contents": chat["page_contents"]
-        })
-
-    response = rag_service.generate_response(collection_name=property_collection, query=query, chat_history=chat_history)
-    # source_documents=[document.metadata for document in response["source_documents"]]
-
-    chat_res = Chat(
-        user_id=user_id, 
-        request=query, 
-        response=response["result"], 
-        source_documents=response["source_documents"],
-        page_contents=response["page_contents"]
-    )
-    create_item(item=chat_res)
+        await save_chat(user_id=user_id, query=query, response=response)
 
     return {"response": response}
 
-@app.delete("/api/v1/chat-service/{collection_name}/{document_id}")
-async def delete_document(collection_name: str, document_id: str):
-    qdrant_repo.delete_document(collection_name=collection_name, doc_id=document_id)
+@app.post("/api/v1/chat-service/generate/stream")
+async def generate_response_stream(request: Request):
+    data = await request.json()
+    query = data["query"]
+    routed_reply = route_intent(query)
 
-    return {"message": "Document deleted successfully"}
+    if routed_reply is not None:
+        # Same answer as /generate, as a stream of one `end` event
+        response = {"query": query, "result": routed_reply, "source_documents": [], "slugs": [], "page_contents": []}
 
-@app.get("/api/v1/chat-service/health")
-async def health_check():
-    return {"status": "ok"}
+        return StreamingResponse(
+            iter([to_server_sent_event(event="end", data={"type": "end", "response": response})]),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
 
-def property_callback(message):
-    print("Received message: ", message)
+    user = request.state.user
+    user_id = (user["id"])
+    new_trace_id(request.headers.get("X-Request-ID"))
 
-    data = message.decode("utf-8")
-    data_dict = json.loads(data)
-    type = data_dict["type"]
-    data_dict = data_dict["data"]
+    chat_history, summary = await asyncio.gather(load_chat_history(user_id=user_id), load_summary(user_id=user_id))
 
-    if type == "PROPERTY_DELETED" or type == "PROPERTY_UPDATED":
-        qdrant_repo.delete_document(collection_name=property_collection, doc_id=data_dict["propertyId"])
+    async def event_stream():
+        try:
+            async for event in get_rag_service().astream_response(collection_name=property_collection, query=query, chat_history=chat_history, summary=summary):
+                if event["type"] == "end":
+                    # Save before the final event so a client closing the stream right after it can't skip the save
+                    await save_chat(user_id=user_id, query=query, response=event["response"])
 
-    if (type == "PROPERTY_UPDATED" and (data_dict["status"] == "ACTIVE" or data_dict["status"] == "UNAVAILABLE")):
-        data_dict["id"] = data_dict["propertyId"]
+                yield to_server_sent_event(event=event["type"], data=event)
+        except Exception as exc:
+            # The 200 headers are already sent, so the exception handlers can't answer anymore: end with an `error` event
+            logger.exception("Streaming response failed")
+            detail = str(exc) if isinstance(exc, GatewayOverloaded) else "Failed to generate a response"
 
-        conditions = "\n".join(f"{condition["type"]}: {condition["value"]}" for condition in data_dict["rentalConditions"])
-        attributes = {}
+            yield to_server_sent_event(event="error", data={"type": "error", "detail": detail})
 
-        for attr in data_dict["attributes"]:
-            if attr["type"] not in attributes:
-                attributes[attr["type"]] = []
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
-            attributes[attr["type"]].append(attr["name"])
+@app.delete("/api/v1/chat-service/{collection_name}/{document_id}")
+async def delete_document(collection_name: str, document_id: str):
+    await get_qdrant_repo().adelete_document(collection_name=collection_name, doc_id=document_id)
 
-        content = f"""Tiêu đề: {data_dict['title']}\nMô tả: {data_dict['description']}\nLoại nhà: {data_dict['type']["name"]}\nĐịa chỉ: {data_dict['address']["street"]}, {data_dict['address']["ward"]}, {data_dict['address']["district"]}, {data_dict['address']["city"]}\nChủ nhà: {data_dict['owner']['name']}\nEmail: {data_dict['owner']['email']}\nSố điện thoại: {data_dict['owner']['phoneNumber']}\n{conditions}\n{"\n".join(f"{k}: {', '.join(v)}" for k, v in attributes.items())}\nGiá: {data_dict['price']} (Slug: {data_dict['slug']})""";
+    return {"message": "Document deleted successfully"}
 
-        property_doc = to_document(data=data_dict, content=content, field_names=[
-            "id", "title", "description", "latitude", "longitude", "address", "attributes",
-            "images", "rentalConditions", "price", "owner", "slug", "type"
-        ])
+@app.get("/api/v1/chat-service/embedding-cache/stats")
+async def embedding_cache_stats():
+    return get_embedding_cache().stats()
 
-        # property_split_docs = split_document(property_doc)
-        embeddings = from_document(doc=property_doc)
+@app.get("/api/v1/chat-service/answer-cache/stats")
+async def answer_cache_stats():
+    answer_cache = get_answer_cache()
 
-        qdrant_repo.insert_documents(collection_name=property_collection, documents=[property_doc], embeddings=[embeddings])
+    return answer_cache.stats() if answer_cache else {"enabled": False}
 
+@app.get("/metrics")
+async def metrics():
+    body, content_type = metrics_response_body()
 
+    return Response(content=body, media_type=content_type)
 
-def worker():
-    rabbitmq_service.subscribe_to_queue(name="property-service-property-queue", exchange={
-        "name": "property-service-exchange",
-        "type": "fanout"
-    }, callback=property_callback)
+@app.get("/api/v1/chat-service/health")
+async def health_check():
+    if consumer["restarting"]:
+        return JSONResponse(status_code=503, content={"status": "degraded", "detail": "property consumer is restarting"})
 
-worker_thread = threading.Thread(target=worker)
-worker_thread.start()
\ No newline at end of file
+    return {"status": "ok"}
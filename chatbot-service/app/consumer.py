@@ -0,0 +1,63 @@
+"""Property ingestion as a process of its own: consumes the property events and upserts them into Qdrant.
+
+Every process consumes the same durable INGESTION_QUEUE, so running several of them makes them competing consumers
+and ingestion scales independently of the HTTP workers. Run the API with INGESTION_CONSUMER_ENABLED=false then.
+
+Run from `chatbot-service`: python -m app.consumer
+"""
+import asyncio
+import logging
+import signal
+from app.core.bootstrap import get_qdrant_repo, property_collection
+from app.core.config import settings
+from app.services.property_ingestion_service import PropertyIngestionService
+from app.services.rabbitmq_service import RabbitMQ
+from app.utils.executor import install_default_executor, run_blocking
+from app.utils.llm_gateway import bind_gateways
+
+logger = logging.getLogger(__name__)
+
+PROPERTY_EXCHANGE = {
+    "name": "property-service-exchange",
+    "type": "fanout"
+}
+
+async def consume_properties(rabbitmq: RabbitMQ, ingestion_service: PropertyIngestionService):
+    """Applies property events in batches until cancelled."""
+    async def callback(messages):
+        logger.debug("Received %d property messages", len(messages))
+
+        # Embedding and upserting block, so they run off the event loop
+        await run_blocking(ingestion_service.handle_batch, messages)
+
+    await rabbitmq.subscribe_to_queue_batched(
+        queue=settings.INGESTION_QUEUE,
+        exchange=PROPERTY_EXCHANGE,
+        callback=callback,
+        batch_size=settings.INGESTION_BATCH_SIZE,
+        batch_timeout=settings.INGESTION_BATCH_TIMEOUT_MS / 1000,
+        prefetch_count=settings.INGESTION_PREFETCH
+    )
+
+async def main():
+    install_default_executor()
+    bind_gateways()
+    # Stop on `docker stop` like on Ctrl+C, unacked messages go back to the queue for the other consumers
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+
+    # API answer caches live in the API processes, so they are not invalidated from here and expire by TTL instead
+    ingestion_service = await run_blocking(lambda: PropertyIngestionService(qdrant_repo=get_qdrant_repo(), collection_name=property_collection))
+    rabbitmq = RabbitMQ()
+
+    try:
+        await rabbitmq.connect()
+        logger.info("Consuming property events from '%s'", settings.INGESTION_QUEUE)
+        await consume_properties(rabbitmq, ingestion_service)
+    except asyncio.CancelledError:
+        logger.info("Stopping the property consumer")
+    finally:
+        await rabbitmq.close()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=settings.LOG_LEVEL, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    asyncio.run(main())
@@ -0,0 +1,90 @@
+"""Lazily built service singletons shared by the API (`app.api.main`) and the ingestion process (`app.consumer`).
+
+Nothing here runs at import: each getter builds its service, and what it depends on, on first call. The API's
+lifespan calls them concurrently through `warm_up`, so Qdrant round-trips, model loading, classifier training and
+chain building overlap instead of running one after the other.
+"""
+import asyncio
+import logging
+import os
+from app.core.config import settings
+from app.repositories.qdrant_repository import CollectionProfile, QdrantRepository, get_collection_profile
+from app.services.answer_cache_service import SemanticAnswerCache
+from app.services.property_ingestion_service import PropertyIngestionService
+from app.utils.embedding import get_embedding_size
+from app.utils.embedding_cache import EmbeddingCache
+from app.utils.executor import run_blocking
+from app.utils.lazy import lazy
+from app.utils.metrics import stage
+
+logger = logging.getLogger(__name__)
+
+property_collection = os.getenv("QDRANT_PROPERTY_COLLECTION")
+
+def get_property_collection_profile(name: str = None) -> CollectionProfile:
+    return get_collection_profile(
+        name or settings.QDRANT_COLLECTION_PROFILE,
+        hnsw_m=settings.QDRANT_HNSW_M,
+        hnsw_ef_construct=settings.QDRANT_HNSW_EF_CONSTRUCT,
+        hnsw_ef=settings.QDRANT_SEARCH_HNSW_EF,
+        oversampling=settings.QDRANT_SEARCH_OVERSAMPLING
+    )
+
+@lazy
+def get_qdrant_repo() -> QdrantRepository:
+    qdrant_repo = QdrantRepository()
+    # Before the services, they read the collection's schema to pick dense-only or hybrid retrieval
+    qdrant_repo.create_collection(
+        collection_name=property_collection,
+        vector_size=get_embedding_size(),
+        backfill_indexes=settings.QDRANT_BACKFILL_INDEXES,
+        profile=get_property_collection_profile()
+    )
+
+    return qdrant_repo
+
+@lazy
+def get_embedding_cache() -> EmbeddingCache:
+    # Opens (and creates) the SQLite file, so only once embeddings are first needed
+    return EmbeddingCache(
+        path=settings.EMBEDDING_CACHE_PATH if settings.EMBEDDING_CACHE_ENABLED else None,
+        max_size=settings.EMBEDDING_CACHE_SIZE
+    )
+
+@lazy
+def get_answer_cache() -> SemanticAnswerCache:
+    return SemanticAnswerCache(
+        max_size=settings.ANSWER_CACHE_SIZE,
+        ttl=settings.ANSWER_CACHE_TTL_SECONDS,
+        similarity_threshold=settings.ANSWER_CACHE_SIMILARITY
+    ) if settings.ANSWER_CACHE_ENABLED else None
+
+@lazy
+def get_rag_service():
+    # The API-only services are imported on first use, the ingestion process never loads the chains, the chat client or scikit-learn
+    from app.services.rag_service import RagService
+
+    return RagService(
+        qdrant_repo=get_qdrant_repo(),
+        collection_names=[property_collection],
+        answer_cache=get_answer_cache(),
+        search_params=get_property_collection_profile().search_params()
+    )
+
+@lazy
+def get_intent_classifier():
+    from app.services.intent_service import IntentClassifier
+
+    return IntentClassifier(min_confidence=settings.INTENT_MIN_CONFIDENCE) if settings.INTENT_ROUTING_ENABLED else None
+
+@lazy
+def get_property_ingestion_service() -> PropertyIngestionService:
+    # Answers cached by this process are invalidated when a property they cite changes
+    return PropertyIngestionService(qdrant_repo=get_qdrant_repo(), collection_name=property_collection, answer_cache=get_answer_cache())
+
+async def warm_up(*getters):
+    """Builds the services behind `getters` concurrently in the blocking pool."""
+    with stage("warm_up"):
+        await asyncio.gather(*(run_blocking(getter) for getter in getters))
+
+    logger.info("Warmed up %s", ", ".join(getter.__name__ for getter in getters))
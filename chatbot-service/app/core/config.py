@@ -1,7 +1,105 @@
 import os
+import dotenv
+
+dotenv.load_dotenv()
 
 class Settings:
     MONGO_URL: str = os.getenv("MONGO_URL", "mongodb://localhost:27017")
     DATABASE_NAME: str = os.getenv("DATABASE_NAME", "mydatabase")
+    # Max threads for the blocking calls that are still run off the event loop
+    BLOCKING_POOL_SIZE: int = int(os.getenv("BLOCKING_POOL_SIZE", "16"))
+
+    # Window of past turns replayed to the LLM on /generate, bounded by count and by tokens
+    CHAT_HISTORY_MAX_TURNS: int = int(os.getenv("CHAT_HISTORY_MAX_TURNS", "5"))
+    CHAT_HISTORY_MAX_TOKENS: int = int(os.getenv("CHAT_HISTORY_MAX_TOKENS", "4000"))
+    # Turns older than the window are folded into a rolling per-user summary
+    CHAT_SUMMARY_ENABLED: bool = os.getenv("CHAT_SUMMARY_ENABLED", "true").lower() == "true"
+    CHAT_SUMMARY_MAX_FOLD_TURNS: int = int(os.getenv("CHAT_SUMMARY_MAX_FOLD_TURNS", "20"))
+    # Retrieved and historic properties are deduplicated, shortened and packed into a token budget before the answer call
+    CONTEXT_PACKING_ENABLED: bool = os.getenv("CONTEXT_PACKING_ENABLED", "true").lower() == "true"
+    CONTEXT_MAX_TOKENS: int = int(os.getenv("CONTEXT_MAX_TOKENS", "2000"))
+    CONTEXT_DESCRIPTION_MAX_TOKENS: int = int(os.getenv("CONTEXT_DESCRIPTION_MAX_TOKENS", "80"))
+    # Owner name, email and phone of each property, the property page linked by its slug shows them anyway
+    CONTEXT_INCLUDE_OWNER_CONTACT: bool = os.getenv("CONTEXT_INCLUDE_OWNER_CONTACT", "false").lower() == "true"
+    # Cited documents resolved from the shared `chat_documents` store, kept in memory by content hash
+    CHAT_DOCUMENT_CACHE_SIZE: int = int(os.getenv("CHAT_DOCUMENT_CACHE_SIZE", "5000"))
+    # "auto" skips the question-rewriting LLM call when the query reads as self-contained, "always" rewrites whenever there is history
+    CONTEXTUALIZE_MODE: str = os.getenv("CONTEXTUALIZE_MODE", "auto")
+    # Contract and payment-history questions are answered by routing instead of the RAG chain, using the local intent classifier.
+    # Only predictions at or above INTENT_MIN_CONFIDENCE are routed. Off by default and not usable yet: the routed replies are
+    # placeholders that don't look anything up, see ROUTED_REPLIES
+    INTENT_ROUTING_ENABLED: bool = os.getenv("INTENT_ROUTING_ENABLED", "false").lower() == "true"
+    INTENT_MIN_CONFIDENCE: float = float(os.getenv("INTENT_MIN_CONFIDENCE", "0.8"))
+
+    # "gemini" (remote API) or "local" (sentence-transformers on CPU). Changing it needs a collection with the new vector size.
+    EMBEDDING_BACKEND: str = os.getenv("EMBEDDING_BACKEND", "gemini")
+    GEMINI_EMBEDDING_SIZE: int = int(os.getenv("GEMINI_EMBEDDING_SIZE", "768"))
+    LOCAL_EMBEDDING_MODEL: str = os.getenv("LOCAL_EMBEDDING_MODEL", "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2")
+    LOCAL_EMBEDDING_BATCH_SIZE: int = int(os.getenv("LOCAL_EMBEDDING_BATCH_SIZE", "32"))
+    LOCAL_EMBEDDING_MAX_WAIT_MS: int = int(os.getenv("LOCAL_EMBEDDING_MAX_WAIT_MS", "5"))
+    LOCAL_EMBEDDING_QUANTIZE: bool = os.getenv("LOCAL_EMBEDDING_QUANTIZE", "false").lower() == "true"
+    # e5-style models expect "query: " / "passage: " prefixes
+    LOCAL_EMBEDDING_QUERY_PREFIX: str = os.getenv("LOCAL_EMBEDDING_QUERY_PREFIX", "")
+    LOCAL_EMBEDDING_DOCUMENT_PREFIX: str = os.getenv("LOCAL_EMBEDDING_DOCUMENT_PREFIX", "")
+
+    # Paths served without a JWT. /metrics is not among them by default, add it for a scraper that can't send a token
+    AUTH_EXCLUDE_PATHS: list[str] = os.getenv("AUTH_EXCLUDE_PATHS", "/api/v1/chat-service/health").split(",")
+
+    # Embeddings keyed by hash of (model, text): in-memory LRU in front of a SQLite file
+    EMBEDDING_CACHE_ENABLED: bool = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+    EMBEDDING_CACHE_PATH: str = os.getenv("EMBEDDING_CACHE_PATH", ".cache/embeddings.sqlite3")
+    EMBEDDING_CACHE_SIZE: int = int(os.getenv("EMBEDDING_CACHE_SIZE", "10000"))
+
+    # Shared answers for first-turn questions, matched on the normalized query or a near-duplicate embedding
+    ANSWER_CACHE_ENABLED: bool = os.getenv("ANSWER_CACHE_ENABLED", "false").lower() == "true"
+    ANSWER_CACHE_SIZE: int = int(os.getenv("ANSWER_CACHE_SIZE", "1000"))
+    ANSWER_CACHE_TTL_SECONDS: int = int(os.getenv("ANSWER_CACHE_TTL_SECONDS", "600"))
+    ANSWER_CACHE_SIMILARITY: float = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.95"))
+
+    # Dense + sparse (BM25-style) retrieval fused with RRF, on collections that have sparse vectors
+    HYBRID_SEARCH_ENABLED: bool = os.getenv("HYBRID_SEARCH_ENABLED", "true").lower() == "true"
+    HYBRID_PREFETCH_K: int = int(os.getenv("HYBRID_PREFETCH_K", "20"))
+
+    # Which parts of the parsed query become hard Qdrant filters (price, location, type, bedrooms, amenities). Type, bedroom
+    # and amenity labels come from hand-written tables, so they are opt-in, and a search they empty is retried without them
+    QUERY_FILTER_FIELDS: list[str] = os.getenv("QUERY_FILTER_FIELDS", "price,location").split(",")
+
+    # Create missing payload indexes on an existing property collection at startup
+    QDRANT_BACKFILL_INDEXES: bool = os.getenv("QDRANT_BACKFILL_INDEXES", "false").lower() == "true"
+
+    # Storage profile of new property collections: default (float32 in RAM), scalar (int8) or binary quantization
+    QDRANT_COLLECTION_PROFILE: str = os.getenv("QDRANT_COLLECTION_PROFILE", "default")
+    # Overrides of the profile's HNSW build settings (new collections) and search settings (every query), 0 keeps the profile's
+    QDRANT_HNSW_M: int = int(os.getenv("QDRANT_HNSW_M", "0"))
+    QDRANT_HNSW_EF_CONSTRUCT: int = int(os.getenv("QDRANT_HNSW_EF_CONSTRUCT", "0"))
+    QDRANT_SEARCH_HNSW_EF: int = int(os.getenv("QDRANT_SEARCH_HNSW_EF", "0"))
+    QDRANT_SEARCH_OVERSAMPLING: float = float(os.getenv("QDRANT_SEARCH_OVERSAMPLING", "0"))
+
+    RABBIT_MQ_URL: str = os.getenv("RABBIT_MQ_URL")
+    # Publisher-confirm channels shared by concurrent publishers
+    RABBITMQ_CHANNEL_POOL_SIZE: int = int(os.getenv("RABBITMQ_CHANNEL_POOL_SIZE", "4"))
+
+    # Property events are embedded and upserted in batches of up to N messages or T milliseconds
+    INGESTION_QUEUE: str = os.getenv("INGESTION_QUEUE", "chatbot-service-property-queue")
+    INGESTION_BATCH_SIZE: int = int(os.getenv("INGESTION_BATCH_SIZE", "64"))
+    INGESTION_BATCH_TIMEOUT_MS: int = int(os.getenv("INGESTION_BATCH_TIMEOUT_MS", "500"))
+    INGESTION_PREFETCH: int = int(os.getenv("INGESTION_PREFETCH", "256"))
+    # Run the property consumer inside the API process. Turn off when ingestion runs as its own `python -m app.consumer` processes
+    INGESTION_CONSUMER_ENABLED: bool = os.getenv("INGESTION_CONSUMER_ENABLED", "true").lower() == "true"
+
+    # Gemini chat and embedding calls go through a gateway that shares identical in-flight calls, limits the request rate
+    # (halved on every 429), retries with jittered backoff and sheds calls beyond GATEWAY_MAX_QUEUE waiting ones
+    GATEWAY_ENABLED: bool = os.getenv("GATEWAY_ENABLED", "true").lower() == "true"
+    LLM_RATE_LIMIT: float = float(os.getenv("LLM_RATE_LIMIT", "10"))
+    LLM_MAX_CONCURRENCY: int = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+    EMBEDDING_RATE_LIMIT: float = float(os.getenv("EMBEDDING_RATE_LIMIT", "25"))
+    EMBEDDING_MAX_CONCURRENCY: int = int(os.getenv("EMBEDDING_MAX_CONCURRENCY", "16"))
+    GATEWAY_MAX_QUEUE: int = int(os.getenv("GATEWAY_MAX_QUEUE", "100"))
+    GATEWAY_QUEUE_TIMEOUT_SECONDS: float = float(os.getenv("GATEWAY_QUEUE_TIMEOUT_SECONDS", "10"))
+    GATEWAY_MAX_RETRIES: int = int(os.getenv("GATEWAY_MAX_RETRIES", "3"))
+
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    # Log every stage timing with the request's trace id (from X-Request-ID, or generated)
+    TRACE_LOGGING: bool = os.getenv("TRACE_LOGGING", "false").lower() == "true"
 
-settings = Settings()
\ No newline at end of file
+settings = Settings()
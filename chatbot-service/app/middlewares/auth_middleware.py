@@ -1,21 +1,35 @@
-from fastapi import Request, HTTPException
-from starlette.middleware.base import BaseHTTPMiddleware
-from app.utils.jwt import verify_token
+from fastapi import HTTPException
 from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Receive, Scope, Send
+from app.core.config import settings
+from app.utils.jwt import verify_token
+
+class JWTMiddleware:
+    """Pure ASGI JWT check. Unlike `BaseHTTPMiddleware` it doesn't wrap the response stream, so SSE responses pass through untouched."""
+
+    def __init__(self, app: ASGIApp, exclude_paths=None):
+        self.app = app
+        self.exclude_paths = set(settings.AUTH_EXCLUDE_PATHS if exclude_paths is None else exclude_paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["path"] in self.exclude_paths:
+            await self.app(scope, receive, send)
+            return
+
+        token = Headers(scope=scope).get("Authorization")
+
+        if not token:
+            await JSONResponse(status_code=401, content={"detail": "Authorization header missing"})(scope, receive, send)
+            return
+
+        try:
+            payload = verify_token(token.replace("Bearer ", ""))
+        except HTTPException as e:
+            await JSONResponse(status_code=e.status_code, content={"detail": e.detail})(scope, receive, send)
+            return
+
+        # `request.state` reads from scope["state"]
+        scope.setdefault("state", {})["user"] = payload
 
-class JWTMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        token = request.headers.get("Authorization")
-
-        if token:
-            try:
-                token = token.replace("Bearer ", "")
-                payload = verify_token(token)
-                request.state.user = payload  # Lưu payload vào state của request để sử dụng sau này
-            except HTTPException as e:
-                return JSONResponse(status_code=e.status_code, content={"detail": e.detail})
-        else:
-            return JSONResponse(status_code=401, content={"detail": "Authorization header missing"})
-        
-        response = await call_next(request)
-        return response
\ No newline at end of file
+        await self.app(scope, receive, send)
@@ -7,7 +7,7 @@ class Chat(BaseModel):
     user_id: str
     request: str
     response: str
-    source_documents: List
-    page_contents: List
+    # References ({id, hash, slug}) to the cited documents in the `chat_documents` store
+    documents: List
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
@@ -1,4 +1,5 @@
-from qdrant_client import QdrantClient, http
+from dataclasses import dataclass, replace
+from qdrant_client import AsyncQdrantClient, QdrantClient
 from qdrant_client.http import models
 import os
 import dotenv
@@ -6,49 +7,152 @@ import uuid
 
 dotenv.load_dotenv()
 
+# Fixed namespace so the same (document id, chunk) always maps to the same point
+POINT_ID_NAMESPACE = uuid.UUID("6f1c1b5e-3d8a-4c1e-9a57-2f0b8d4e7a10")
+
+def to_point_id(doc_id, chunk_index: int = 0) -> str:
+    return str(uuid.uuid5(POINT_ID_NAMESPACE, f"{doc_id}:{chunk_index}"))
+
+def to_point_ids(doc_ids, chunks: int = 1) -> list[str]:
+    return [to_point_id(doc_id, chunk_index) for doc_id in doc_ids for chunk_index in range(chunks)]
+
+# Payload fields used by filtered search and deletes, with the type their metadata is coerced to at ingestion
+PAYLOAD_INDEXES = {
+    "metadata.id": models.PayloadSchemaType.KEYWORD,
+    "metadata.price": models.PayloadSchemaType.FLOAT,
+    "metadata.address.city": models.PayloadSchemaType.KEYWORD,
+    "metadata.address.district": models.PayloadSchemaType.KEYWORD,
+    "metadata.type.name": models.PayloadSchemaType.KEYWORD,
+    "metadata.attributes[].name": models.PayloadSchemaType.KEYWORD,
+}
+
+# Lexical (BM25-style) vector stored next to the unnamed dense vector, see `app.utils.sparse`
+SPARSE_VECTOR_NAME = "text"
+
+@dataclass(frozen=True)
+class CollectionProfile:
+    """How a new collection stores and indexes its dense vectors, and how searches on it trade recall for speed.
+
+    `None` keeps Qdrant's default. The storage fields only apply when a collection is created; `hnsw_ef` and
+    `oversampling` apply to every search.
+    """
+
+    # "scalar" (int8, 4x smaller) or "binary" (1 bit per dimension, 32x smaller), kept in RAM for the HNSW search
+    quantization: str = None
+    # Keep the float32 originals on disk, they are only read to rescore the quantized candidates
+    on_disk: bool = None
+    hnsw_m: int = None
+    hnsw_ef_construct: int = None
+    hnsw_ef: int = None
+    # Quantized candidates fetched per result and rescored with the originals
+    oversampling: float = None
+
+    def vectors_config(self, vector_size: int) -> models.VectorParams:
+        return models.VectorParams(
+            size=vector_size,
+            distance=models.Distance.COSINE,
+            on_disk=self.on_disk,
+            hnsw_config=models.HnswConfigDiff(m=self.hnsw_m, ef_construct=self.hnsw_ef_construct) if self.hnsw_m or self.hnsw_ef_construct else None
+        )
+
+    def quantization_config(self):
+        if self.quantization == "scalar":
+            return models.ScalarQuantization(scalar=models.ScalarQuantizationConfig(type=models.ScalarType.INT8, quantile=0.99, always_ram=True))
+
+        if self.quantization == "binary":
+            return models.BinaryQuantization(binary=models.BinaryQuantizationConfig(always_ram=True))
+
+        return None
+
+    def search_params(self) -> models.SearchParams:
+        if self.hnsw_ef is None and self.oversampling is None:
+            return None
+
+        quantization = models.QuantizationSearchParams(rescore=True, oversampling=self.oversampling) if self.oversampling else None
+
+        return models.SearchParams(hnsw_ef=self.hnsw_ef, quantization=quantization)
+
+COLLECTION_PROFILES = {
+    # float32 vectors and HNSW graph in RAM
+    "default": CollectionProfile(),
+    "scalar": CollectionProfile(quantization="scalar", on_disk=True, oversampling=2.0),
+    # Binary quantization loses the most precision, so more candidates are rescored
+    "binary": CollectionProfile(quantization="binary", on_disk=True, oversampling=3.0),
+}
+
+def get_collection_profile(name: str = "default", **overrides) -> CollectionProfile:
+    """The named profile from `COLLECTION_PROFILES`, with the non-empty `overrides` (e.g. `hnsw_ef=128`) applied."""
+    if name not in COLLECTION_PROFILES:
+        raise ValueError(f"Unknown collection profile '{name}', expected one of {', '.join(COLLECTION_PROFILES)}")
+
+    return replace(COLLECTION_PROFILES[name], **{key: value for key, value in overrides.items() if value})
+
 class QdrantRepository:
-    def __init__(self):
+    def __init__(self, client: QdrantClient = None, async_client: AsyncQdrantClient = None):
         api_key = os.getenv("QDRANT_API_KEY")
         url = os.getenv("QDRANT_URL")
 
-        self.client = QdrantClient(url=url, api_key=api_key)
+        if client is None:
+            client = QdrantClient(url=url, api_key=api_key)
+            async_client = async_client or AsyncQdrantClient(url=url, api_key=api_key)
 
-    def create_collection(self, collection_name):
-        # vectors_config = http.models.VectorParams(
-        #     size=768, # Size of the vector
-        #     distance=http.models.Distance.COSINE
-        # )
+        self.client = client
+        self.async_client = async_client
 
-        # self.client.recreate_collection(
-        #     collection_name=collection_name,
-        #     vectors_config=vectors_config
-        # )
+    def create_collection(self, collection_name, vector_size: int = 768, backfill_indexes: bool = False, profile: CollectionProfile = COLLECTION_PROFILES["default"]):
         collections = self.client.get_collections().collections
-        if collection_name not in [col.name for col in collections]:
-            vectors_config = http.models.VectorParams(
-                size=768, 
-                distance=http.models.Distance.COSINE
-            )
-            self.client.recreate_collection(
+        # The property collection may be an alias switched over by the re-index script
+        aliases = self.client.get_aliases().aliases
+        if collection_name not in [col.name for col in collections] + [alias.alias_name for alias in aliases]:
+            self.client.create_collection(
                 collection_name=collection_name,
-                vectors_config=vectors_config
+                vectors_config=profile.vectors_config(vector_size),
+                sparse_vectors_config={SPARSE_VECTOR_NAME: models.SparseVectorParams(modifier=models.Modifier.IDF)},
+                quantization_config=profile.quantization_config()
             )
-            print(f"Collection '{collection_name}' created.")  # Indicate success
+            self.create_payload_indexes(collection_name)
+            print(f"Collection '{collection_name}' created with {profile}.")  # Indicate success
         else:
+            # Its storage settings stay as they were created, re-index into a new collection to change the profile
             print(f"Collection '{collection_name}' already exists.")
 
-    def insert_documents(self, collection_name, documents, embeddings):
+            existing_size = self.client.get_collection(collection_name=collection_name).config.params.vectors.size
+
+            if existing_size != vector_size:
+                raise ValueError(f"Collection '{collection_name}' has {existing_size}-dimensional vectors but the embedding model produces {vector_size}, re-index into a new collection")
+
+            if backfill_indexes:
+                self.create_payload_indexes(collection_name)
+
+    def create_payload_indexes(self, collection_name):
+        existing = self.client.get_collection(collection_name=collection_name).payload_schema
+
+        for field_name, field_schema in PAYLOAD_INDEXES.items():
+            if field_name not in existing:
+                self.client.create_payload_index(collection_name=collection_name, field_name=field_name, field_schema=field_schema, wait=True)
+                print(f"Payload index '{field_name}' created on '{collection_name}'.")
+
+    def has_sparse_vectors(self, collection_name):
+        sparse_vectors = self.client.get_collection(collection_name=collection_name).config.params.sparse_vectors
+
+        return bool(sparse_vectors) and SPARSE_VECTOR_NAME in sparse_vectors
+
+    def insert_documents(self, collection_name, documents, embeddings, sparse_embeddings=None):
+        if sparse_embeddings is not None:
+            embeddings = [{"": embedding, SPARSE_VECTOR_NAME: sparse_embedding} for embedding, sparse_embedding in zip(embeddings, sparse_embeddings)]
+
         self.client.upsert(
             collection_name=collection_name,
             points=[
-                {
-                    "id": uuid.uuid4().hex,
-                    "vector": embedding,
-                    "payload": {
+                models.PointStruct(
+                    # Re-inserting a document overwrites its points instead of adding duplicates
+                    id=to_point_id(doc.metadata["id"], doc.metadata.get("chunk_index", 0)) if doc.metadata.get("id") is not None else uuid.uuid4().hex,
+                    vector=embedding,
+                    payload={
                         "page_content": doc.page_content,
                         "metadata": doc.metadata, 
                     }
-                }
+                )
                 for i, (doc, embedding) in enumerate(zip(documents, embeddings))
             ]
         )
@@ -63,19 +167,44 @@ class QdrantRepository:
             top_k=top_k
         )
     
+    def hybrid_search(self, collection_name, dense_query, sparse_query, query_filter=None, top_k=5, prefetch_k=20, search_params=None):
+        return self.client.query_points(**self._hybrid_query(collection_name, dense_query, sparse_query, query_filter, top_k, prefetch_k, search_params)).points
+
+    async def ahybrid_search(self, collection_name, dense_query, sparse_query, query_filter=None, top_k=5, prefetch_k=20, search_params=None):
+        return (await self.async_client.query_points(**self._hybrid_query(collection_name, dense_query, sparse_query, query_filter, top_k, prefetch_k, search_params))).points
+
+    def _hybrid_query(self, collection_name, dense_query, sparse_query, query_filter, top_k, prefetch_k, search_params=None):
+        # `search_params` (HNSW ef, quantization rescoring) only concern the dense HNSW search
+        prefetch = [models.Prefetch(query=dense_query, filter=query_filter, limit=prefetch_k, params=search_params)]
+
+        if sparse_query.indices:
+            prefetch.append(models.Prefetch(query=sparse_query, using=SPARSE_VECTOR_NAME, filter=query_filter, limit=prefetch_k))
+
+        # Dense and lexical candidates are fetched in one request and fused server-side with reciprocal rank fusion
+        return {
+            "collection_name": collection_name,
+            "prefetch": prefetch,
+            "query": models.FusionQuery(fusion=models.Fusion.RRF),
+            "limit": top_k,
+            "with_payload": True,
+        }
+
     def delete_collection(self, collection_name):
         self.client.delete_collection(collection_name=collection_name)
 
-    def delete_document(self, collection_name, doc_id):
+    def delete_document(self, collection_name, doc_id, chunks: int = 1):
+        self.delete_documents(collection_name=collection_name, doc_ids=[doc_id], chunks=chunks)
+
+    def delete_documents(self, collection_name, doc_ids, chunks: int = 1):
         self.client.delete(
             collection_name=collection_name,
-            points_selector=models.Filter(
-                must=[
-                    models.FieldCondition(
-                        key="metadata.id",
-                        match=models.MatchValue(value=doc_id)
-                    )
-                ]
-            ),
+            points_selector=models.PointIdsList(points=to_point_ids(doc_ids, chunks)),
             wait=True
-        )
\ No newline at end of file
+        )
+
+    async def adelete_document(self, collection_name, doc_id, chunks: int = 1):
+        await self.async_client.delete(
+            collection_name=collection_name,
+            points_selector=models.PointIdsList(points=to_point_ids([doc_id], chunks)),
+            wait=True
+        )
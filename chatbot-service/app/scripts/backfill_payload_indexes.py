@@ -0,0 +1,50 @@
+"""Creates the payload indexes from `PAYLOAD_INDEXES` on an existing collection and coerces stored metadata to the indexed types.
+
+Points ingested before coercion may hold e.g. a string `price`, which a FLOAT index does not match.
+
+Run from `chatbot-service`: python -m app.scripts.backfill_payload_indexes [--collection NAME] [--batch-size N]
+"""
+import argparse
+import os
+import dotenv
+from app.repositories.qdrant_repository import QdrantRepository
+from app.utils.document import coerce_property_metadata
+
+dotenv.load_dotenv()
+
+def backfill(qdrant_repo: QdrantRepository, collection_name: str, batch_size: int = 256):
+    offset = None
+    updated = 0
+
+    while True:
+        points, offset = qdrant_repo.client.scroll(collection_name=collection_name, limit=batch_size, offset=offset, with_payload=["metadata"])
+
+        for point in points:
+            metadata = (point.payload or {}).get("metadata")
+
+            if not metadata:
+                continue
+
+            coerced = coerce_property_metadata(dict(metadata))
+
+            if coerced != metadata:
+                qdrant_repo.client.set_payload(collection_name=collection_name, payload={"metadata": coerced}, points=[point.id])
+                updated += 1
+
+        if offset is None:
+            break
+
+    print(f"Coerced metadata of {updated} points in '{collection_name}'")
+
+    qdrant_repo.create_payload_indexes(collection_name)
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill payload indexes and typed metadata on a Qdrant collection")
+    parser.add_argument("--collection", default=os.getenv("QDRANT_PROPERTY_COLLECTION"))
+    parser.add_argument("--batch-size", type=int, default=256)
+    args = parser.parse_args()
+
+    backfill(QdrantRepository(), collection_name=args.collection, batch_size=args.batch_size)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Rewrites chat records that embed full copies of their cited documents to compact references (see `to_references`).
+
+The copies move to the shared `chat_documents` store, one entry per distinct content, and the chat keeps
+`documents: [{id, hash, slug}]`. Documents are stored before the chat is rewritten and only chats that still have
+inline copies are selected, so the migration can be interrupted and re-run safely.
+
+Run from `chatbot-service`: python -m app.scripts.migrate_chat_documents [--batch-size N] [--dry-run]
+"""
+import argparse
+import dotenv
+from pymongo import MongoClient, UpdateOne
+from app.core.config import settings
+from app.services.chat_document_service import to_references
+
+dotenv.load_dotenv()
+
+def collection_size(db, name: str) -> int:
+    return db.command("collstats", name)["size"] if name in db.list_collection_names() else 0
+
+def migrate(db, batch_size: int = 500, dry_run: bool = False):
+    chats, documents = db["chat"], db["chat_documents"]
+    before = collection_size(db, "chat") + collection_size(db, "chat_documents")
+    migrated = 0
+
+    while True:
+        # Migrated chats drop out of the query, so each round reads the next batch (a dry run has to skip past them)
+        batch = list(chats.find(
+            {"source_documents": {"$exists": True}},
+            {"_id": 1, "source_documents": 1, "page_contents": 1}
+        ).sort("_id", 1).skip(migrated if dry_run else 0).limit(batch_size))
+
+        if not batch:
+            break
+
+        chat_updates = []
+        stored = {}
+
+        for chat in batch:
+            references, chat_documents = to_references(chat.get("source_documents") or [], chat.get("page_contents") or [])
+            stored.update(chat_documents)
+            chat_updates.append(UpdateOne(
+                {"_id": chat["_id"]},
+                {"$set": {"documents": references}, "$unset": {"source_documents": "", "page_contents": ""}}
+            ))
+
+        if not dry_run:
+            if stored:
+                documents.bulk_write(
+                    [UpdateOne({"_id": digest}, {"$setOnInsert": document}, upsert=True) for digest, document in stored.items()],
+                    ordered=False
+                )
+
+            chats.bulk_write(chat_updates, ordered=False)
+
+        migrated += len(batch)
+        print(f"\r{migrated} chats", end="", flush=True)
+
+    print(f"\n{'Would migrate' if dry_run else 'Migrated'} {migrated} chats")
+
+    if not dry_run:
+        after = collection_size(db, "chat") + collection_size(db, "chat_documents")
+        print(f"chat + chat_documents: {before / 1e6:.1f} MB -> {after / 1e6:.1f} MB (uncompressed BSON)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Move cited documents out of chat records into the shared chat_documents store")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    migrate(MongoClient(settings.MONGO_URL)[settings.DATABASE_NAME], batch_size=args.batch_size, dry_run=args.dry_run)
+
+if __name__ == "__main__":
+    main()
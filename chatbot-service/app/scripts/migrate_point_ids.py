@@ -0,0 +1,69 @@
+"""Rewrites a collection's points to deterministic ids derived from `metadata.id` (see `to_point_id`).
+
+Points are upserted under their new id and the old point is deleted afterwards, so the migration can be
+re-run safely. Duplicates left behind by the old delete-then-insert flow collapse into one point.
+
+Run from `chatbot-service`: python -m app.scripts.migrate_point_ids [--collection NAME] [--batch-size N] [--dry-run]
+"""
+import argparse
+import os
+import dotenv
+from qdrant_client.http import models
+from app.repositories.qdrant_repository import QdrantRepository, to_point_id
+
+dotenv.load_dotenv()
+
+def migrate(qdrant_repo: QdrantRepository, collection_name: str, batch_size: int = 256, dry_run: bool = False):
+    offset = None
+    migrated = 0
+    skipped = 0
+
+    while True:
+        points, offset = qdrant_repo.client.scroll(
+            collection_name=collection_name,
+            limit=batch_size,
+            offset=offset,
+            with_payload=True,
+            with_vectors=True
+        )
+
+        new_points = []
+        old_ids = []
+
+        for point in points:
+            metadata = (point.payload or {}).get("metadata") or {}
+
+            if metadata.get("id") is None:
+                skipped += 1
+                continue
+
+            point_id = to_point_id(metadata["id"], metadata.get("chunk_index", 0))
+
+            if str(point.id) == point_id:
+                continue
+
+            new_points.append(models.PointStruct(id=point_id, vector=point.vector, payload=point.payload))
+            old_ids.append(point.id)
+
+        if new_points and not dry_run:
+            qdrant_repo.client.upsert(collection_name=collection_name, points=new_points, wait=True)
+            qdrant_repo.client.delete(collection_name=collection_name, points_selector=models.PointIdsList(points=old_ids), wait=True)
+
+        migrated += len(new_points)
+
+        if offset is None:
+            break
+
+    print(f"{'Would migrate' if dry_run else 'Migrated'} {migrated} points in '{collection_name}', skipped {skipped} without metadata.id")
+
+def main():
+    parser = argparse.ArgumentParser(description="Rewrite a Qdrant collection to deterministic point ids")
+    parser.add_argument("--collection", default=os.getenv("QDRANT_PROPERTY_COLLECTION"))
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    migrate(QdrantRepository(), collection_name=args.collection, batch_size=args.batch_size, dry_run=args.dry_run)
+
+if __name__ == "__main__":
+    main()
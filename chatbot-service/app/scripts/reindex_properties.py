@@ -0,0 +1,191 @@
+"""Bulk re-index of the property collection from a dump, into a shadow collection that an alias is switched to.
+
+Reads a JSON array or JSON Lines (e.g. `mongoexport` of the estate manager's Property collection), builds the same
+documents as the RabbitMQ consumer, embeds and upserts them in concurrent batches and records finished batches in a
+checkpoint file. Records without a property id are skipped: the point id must be the one later PROPERTY_UPDATED and
+PROPERTY_DELETED events resolve to. Re-running with the same --target, --source and --batch-size resumes where it stopped;
+point ids are deterministic, so a batch that is redone simply overwrites itself. Once every batch is in, --alias is
+moved to the new collection in one atomic alias update. --alias must not be an existing collection, which is checked
+before anything is embedded.
+
+Run from `chatbot-service`:
+    python -m app.scripts.reindex_properties --source properties.jsonl --alias properties [--target properties-v2]
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from qdrant_client.http import models
+from app.core.bootstrap import get_property_collection_profile
+from app.core.config import settings
+from app.repositories.qdrant_repository import COLLECTION_PROFILES, QdrantRepository
+from app.services.property_ingestion_service import INDEXED_STATUSES, PropertyIngestionService
+from app.utils.document import to_property_document
+from app.utils.embedding import get_embedding_size
+
+CHECKPOINT_DIR = ".cache/reindex"
+
+def read_records(path: str) -> list[dict]:
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+
+    if text.lstrip().startswith("["):
+        return json.loads(text)
+
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+def property_id(record: dict):
+    """The `propertyId` events carry. The estate manager stores it as `_id`, so that is where a `mongoexport` has it."""
+    _id = record.get("_id")
+
+    # An ObjectId (`{"$oid": "..."}` in mongoexport) is not a property id
+    return record.get("propertyId") or (_id if isinstance(_id, str) else None)
+
+def to_property_data(record: dict) -> dict:
+    """Fills a dump record into the shape of a PROPERTY_UPDATED event, so it goes through `to_property_document` unchanged."""
+    address = record.get("address") or {key: record.get(key, "") for key in ("street", "ward", "district", "city")}
+    owner = record.get("owner") or {}
+
+    return {
+        **record,
+        "id": property_id(record),
+        "address": address,
+        "owner": {"name": owner.get("name", ""), "email": owner.get("email", ""), "phoneNumber": owner.get("phoneNumber", "")},
+        "type": record.get("type") or {"name": ""},
+        "rentalConditions": record.get("rentalConditions") or record.get("conditions") or [],
+        "attributes": record.get("attributes") or [],
+        "slug": record.get("slug", ""),
+    }
+
+def load_checkpoint(path: str) -> dict:
+    if not os.path.exists(path):
+        return {"done": []}
+
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def save_checkpoint(path: str, checkpoint: dict):
+    # Write then rename, so an interrupted run never leaves a truncated checkpoint
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f)
+
+    os.replace(f"{path}.tmp", path)
+
+def load_checkpoint_for(path: str, source: str, batch_size: int) -> dict:
+    checkpoint = load_checkpoint(path)
+
+    # Batch indices only mean the same documents for the same dump cut the same way
+    if checkpoint["done"] and (checkpoint.get("source"), checkpoint.get("batch_size")) != (source, batch_size):
+        raise SystemExit(
+            f"Checkpoint {path} was written for --source {checkpoint.get('source')} --batch-size {checkpoint.get('batch_size')}. "
+            f"Re-run with those, or with a new --target."
+        )
+
+    return checkpoint
+
+def check_alias(qdrant_repo: QdrantRepository, alias: str) -> bool:
+    """Fails if `alias` is a real collection, which an alias can't replace. Returns whether the alias already exists."""
+    collections = [collection.name for collection in qdrant_repo.client.get_collections().collections]
+
+    if alias in collections:
+        raise SystemExit(f"'{alias}' is a collection, not an alias. Pick a new alias name and point QDRANT_PROPERTY_COLLECTION at it.")
+
+    return alias in [existing.alias_name for existing in qdrant_repo.client.get_aliases().aliases]
+
+def switch_alias(qdrant_repo: QdrantRepository, alias: str, target: str, alias_exists: bool):
+    operations = []
+
+    if alias_exists:
+        operations.append(models.DeleteAliasOperation(delete_alias=models.DeleteAlias(alias_name=alias)))
+
+    operations.append(models.CreateAliasOperation(create_alias=models.CreateAlias(collection_name=target, alias_name=alias)))
+
+    # Both operations are applied together, readers never see the alias missing
+    qdrant_repo.client.update_collection_aliases(change_aliases_operations=operations)
+
+def reindex(source: str, alias: str, target: str, batch_size: int, concurrency: int, profile: str = None):
+    qdrant_repo = QdrantRepository()
+    # Checked before any embedding is paid for, not once every batch is in
+    alias_exists = check_alias(qdrant_repo, alias=alias)
+    records = read_records(source)
+    documents = []
+    skipped = 0
+
+    for record in records:
+        if record.get("status", "ACTIVE") not in INDEXED_STATUSES or record.get("deleted", False):
+            continue
+
+        if not property_id(record):
+            skipped += 1
+            continue
+
+        documents.append(to_property_document(to_property_data(record)))
+
+    if skipped:
+        print(f"Skipped {skipped} records without a propertyId or _id")
+
+    # An empty collection must never take over the alias
+    if not documents:
+        raise SystemExit(f"No documents to index in {source}, alias '{alias}' left unchanged")
+
+    batches = [documents[i:i + batch_size] for i in range(0, len(documents), batch_size)]
+
+    os.makedirs(CHECKPOINT_DIR, exist_ok=True)
+    checkpoint_path = os.path.join(CHECKPOINT_DIR, f"{target}.json")
+    checkpoint = load_checkpoint_for(checkpoint_path, source=source, batch_size=batch_size)
+    done = set(checkpoint["done"])
+    lock = threading.Lock()
+
+    qdrant_repo.create_collection(collection_name=target, vector_size=get_embedding_size(), profile=get_property_collection_profile(profile))
+    ingestion_service = PropertyIngestionService(qdrant_repo=qdrant_repo, collection_name=target)
+    pending = [i for i in range(len(batches)) if i not in done]
+
+    print(f"{len(documents)} documents in {len(batches)} batches, {len(batches) - len(pending)} already done, indexing into '{target}'")
+
+    def index_batch(i):
+        ingestion_service.index_documents(batches[i])
+
+        with lock:
+            done.add(i)
+            save_checkpoint(checkpoint_path, {"source": source, "batch_size": batch_size, "done": sorted(done)})
+
+        return len(batches[i])
+
+    start = time.perf_counter()
+    indexed = 0
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for future in as_completed([pool.submit(index_batch, i) for i in pending]):
+            indexed += future.result()
+            elapsed = time.perf_counter() - start
+            print(f"\r{indexed}/{sum(len(batches[i]) for i in pending)} docs, {indexed / elapsed:.1f} docs/s", end="", flush=True)
+
+    elapsed = time.perf_counter() - start
+    print(f"\nIndexed {indexed} documents in {elapsed:.1f} s ({indexed / elapsed if elapsed else 0:.1f} docs/s)")
+
+    switch_alias(qdrant_repo, alias=alias, target=target, alias_exists=alias_exists)
+
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+
+    print(f"Alias '{alias}' now points to '{target}'")
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-index properties from a JSON/JSONL dump into a shadow collection and switch an alias to it")
+    parser.add_argument("--source", required=True, help="JSON array or JSON Lines file of properties")
+    parser.add_argument("--alias", default=os.getenv("QDRANT_PROPERTY_COLLECTION"), help="Alias the service reads from")
+    parser.add_argument("--target", help="Shadow collection name, reuse it to resume an interrupted run")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--profile", choices=list(COLLECTION_PROFILES), default=settings.QDRANT_COLLECTION_PROFILE, help="Storage profile of the new collection")
+    args = parser.parse_args()
+
+    target = args.target or f"{args.alias}-{datetime.now():%Y%m%d%H%M%S}"
+
+    reindex(source=args.source, alias=args.alias, target=target, batch_size=args.batch_size, concurrency=args.concurrency, profile=args.profile)
+
+if __name__ == "__main__":
+    main()
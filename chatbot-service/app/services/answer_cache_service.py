@@ -0,0 +1,106 @@
+import re
+import threading
+import unicodedata
+import numpy as np
+from cachetools import TTLCache
+
+def normalize_query(query: str) -> str:
+    query = unicodedata.normalize("NFC", query).lower()
+    query = re.sub(r"[^\w\s]", " ", query)
+
+    return " ".join(query.split())
+
+class SemanticAnswerCache:
+    """TTL/LRU cache of first-turn answers, matched on the normalized query or a near-duplicate query embedding.
+
+    Entries only match within the same `scope` (collection and parsed filter), so "dưới 5 triệu" never
+    reuses an answer for "dưới 10 triệu" however close the embeddings are.
+    """
+
+    def __init__(self, max_size: int = 1000, ttl: float = 600, similarity_threshold: float = 0.95):
+        self.entries = TTLCache(maxsize=max_size, ttl=ttl)
+        self.similarity_threshold = similarity_threshold
+        # Properties can change from the ingestion thread
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+
+    def get_exact(self, scope: str, query: str):
+        with self.lock:
+            entry = self.entries.get((scope, normalize_query(query)))
+            return self._hit(entry)
+
+    def get_similar(self, scope: str, vector: list[float]):
+        vector = self._unit(vector)
+
+        with self.lock:
+            self.entries.expire()
+            best, best_score = None, self.similarity_threshold
+
+            for (entry_scope, _), entry in self.entries.items():
+                if entry_scope != scope:
+                    continue
+
+                score = float(np.dot(entry["vector"], vector))
+
+                if score >= best_score:
+                    best, best_score = entry, score
+
+            if best is not None:
+                self.near_hits += 1
+
+            return self._hit(best)
+
+    def set(self, scope: str, query: str, vector: list[float], response: dict, elapsed: float):
+        with self.lock:
+            self.entries[(scope, normalize_query(query))] = {
+                "vector": self._unit(vector),
+                "response": response,
+                "property_ids": {document.get("id") for document in response["source_documents"]},
+                "slugs": set(response["slugs"]),
+                "elapsed": elapsed,
+            }
+
+    def invalidate(self, property_ids=(), slugs=()):
+        property_ids, slugs = set(property_ids), set(slugs)
+
+        with self.lock:
+            stale = [key for key, entry in self.entries.items() if entry["property_ids"] & property_ids or entry["slugs"] & slugs]
+
+            for key in stale:
+                del self.entries[key]
+
+        return len(stale)
+
+    def record_miss(self):
+        with self.lock:
+            self.misses += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+
+        return {
+            "hits": self.hits,
+            "near_duplicate_hits": self.near_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "saved_seconds": round(self.saved_seconds, 3),
+            "size": len(self.entries),
+        }
+
+    def _hit(self, entry):
+        if entry is None:
+            return None
+
+        self.hits += 1
+        self.saved_seconds += entry["elapsed"]
+
+        return entry["response"]
+
+    def _unit(self, vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+
+        return vector / norm if norm else vector
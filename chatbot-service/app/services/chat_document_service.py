@@ -0,0 +1,68 @@
+import hashlib
+import json
+from cachetools import LRUCache
+from pymongo import UpdateOne
+from app.core.config import settings
+from app.services.chat_service import db
+
+# Cited documents, stored once per distinct content and referenced from chat records by digest
+collection = db["chat_documents"]
+
+# Entries are immutable (the key is a digest of the content), so the cache never needs invalidating
+_cache = LRUCache(maxsize=settings.CHAT_DOCUMENT_CACHE_SIZE)
+
+def content_hash(metadata: dict, page_content: str) -> str:
+    content = json.dumps([metadata, page_content], sort_keys=True, ensure_ascii=False, default=str)
+
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()[:32]
+
+def to_references(source_documents: list[dict], page_contents: list[str]) -> tuple[list[dict], dict]:
+    """Splits cited documents into the compact references kept on the chat record and the documents keyed by digest."""
+    references = []
+    documents = {}
+
+    for metadata, page_content in zip(source_documents, page_contents):
+        digest = content_hash(metadata, page_content)
+        references.append({"id": metadata.get("id"), "hash": digest, "slug": metadata.get("slug")})
+        documents[digest] = {"metadata": metadata, "page_content": page_content}
+
+    return references, documents
+
+async def save_documents(source_documents: list[dict], page_contents: list[str]) -> list[dict]:
+    references, documents = to_references(source_documents, page_contents)
+    # A cached digest is already stored
+    missing = {digest: document for digest, document in documents.items() if digest not in _cache}
+
+    if missing:
+        await collection.bulk_write(
+            [UpdateOne({"_id": digest}, {"$setOnInsert": document}, upsert=True) for digest, document in missing.items()],
+            ordered=False
+        )
+        _cache.update(missing)
+
+    return references
+
+async def resolve_documents(chats: list[dict]):
+    """Fills `source_documents` and `page_contents` of chats stored with references, with one query for all uncached hashes.
+
+    Chats saved before references were introduced keep their inline copies.
+    """
+    hashes = {reference["hash"] for chat in chats for reference in chat.get("documents") or []}
+    # Collected locally, a long history could evict its own entries from the LRU before they are read
+    documents = {digest: _cache[digest] for digest in hashes if digest in _cache}
+    missing = [digest for digest in hashes if digest not in documents]
+
+    if missing:
+        async for document in collection.find({"_id": {"$in": missing}}):
+            documents[document["_id"]] = _cache[document["_id"]] = {"metadata": document["metadata"], "page_content": document["page_content"]}
+
+    for chat in chats:
+        if "documents" not in chat:
+            continue
+
+        # A document missing from the store (e.g. removed by hand) drops out of the history rather than failing the request
+        resolved = [documents.get(reference["hash"]) for reference in chat.pop("documents")]
+        chat["source_documents"] = [document["metadata"] for document in resolved if document]
+        chat["page_contents"] = [document["page_content"] for document in resolved if document]
+
+    return chats
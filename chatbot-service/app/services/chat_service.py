@@ -1,35 +1,45 @@
-from pymongo import MongoClient
+from motor.motor_asyncio import AsyncIOMotorClient
 from app.core.config import settings
 from app.models.chat_model import Chat
 from datetime import datetime
 
-client = MongoClient(settings.MONGO_URL)
+client = AsyncIOMotorClient(settings.MONGO_URL)
 db = client[settings.DATABASE_NAME]
 collection = db["chat"]
 
-def create_item(item: Chat):
+# Fields needed to replay a turn to the LLM. Chats not yet migrated to document references still have inline copies.
+CHAT_HISTORY_PROJECTION = {"_id": 0, "request": 1, "response": 1, "documents": 1, "source_documents": 1, "page_contents": 1}
+
+async def create_indexes():
+    await collection.create_index([("user_id", 1), ("updated_at", -1)])
+
+async def create_item(item: Chat):
     item.created_at = datetime.now()
     item.updated_at = datetime.now()
 
-    result = collection.insert_one(item.dict())
+    result = await collection.insert_one(item.dict())
     return str(result.inserted_id)
 
-def get_item(item_id: str):
-    return collection.find_one({"_id": item_id})
+async def get_item(item_id: str):
+    return await collection.find_one({"_id": item_id})
+
+async def update_item(item_id: str, item: Chat):
+    await collection.update_one({"_id": item_id}, {"$set": item.dict()})
+    return await get_item(item_id)
+
+async def delete_item(item_id: str):
+    return (await collection.delete_one({"_id": item_id})).deleted_count
 
-def update_item(item_id: str, item: Chat):
-    collection.update_one({"_id": item_id}, {"$set": item.dict()})
-    return get_item(item_id)
+async def list_items():
+    return await collection.find().to_list(length=None)
 
-def delete_item(item_id: str):
-    return collection.delete_one({"_id": item_id}).deleted_count
+async def get_chats_by_user_id(user_id: str, top_k: int = None, projection: dict = None):
+    cursor = collection.find({"user_id": user_id}, projection).sort("updated_at", -1)
 
-def list_items():
-    return list(collection.find())
+    if top_k is not None:
+        cursor = cursor.limit(top_k)
 
-def get_chats_by_user_id(user_id: str, top_k: int = 5):
-    # return list(collection.find({"user_id": user_id}).sort("updated_at", -1).limit(top_k))
-    return list(collection.find({"user_id": user_id}).sort("updated_at", -1))
+    return await cursor.to_list(length=top_k)
 
-def get_chats_by_user_id_and_pagination(user_id: str, top_k: int = 20, skip: int = 0):
-    return list(collection.find({"user_id": user_id}).sort("updated_at", -1).skip(skip).limit(top_k))
\ No newline at end of file
+async def get_chats_by_user_id_and_pagination(user_id: str, top_k: int = 20, skip: int = 0):
+    return await collection.find({"user_id": user_id}).sort("updated_at", -1).skip(skip).limit(top_k).to_list(length=top_k)
@@ -0,0 +1,75 @@
+import json
+import os
+import unicodedata
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import make_pipeline, make_union
+from app.utils.sparse import strip_diacritics
+
+# Same labels as `sys_prompt_question_classification`
+INTENT_SEARCH = "tìm kiếm nhà"
+INTENT_CONTRACT = "kiểm tra hợp đồng"
+INTENT_PAYMENT_HISTORY = "xem lịch sử thanh toán"
+INTENT_UNKNOWN = "không rõ ràng"
+
+# Replies of the intents answered without the RAG chain. Placeholders: nothing looks the contract or the payments up
+# yet, which is why INTENT_ROUTING_ENABLED is off by default
+ROUTED_REPLIES = {
+    INTENT_CONTRACT: "Đã gửi yêu cầu kiểm tra hợp đồng. Vui lòng chờ trong giây lát.",
+    INTENT_PAYMENT_HISTORY: "Đã gửi yêu cầu xem lịch sử thanh toán. Vui lòng chờ trong giây lát.",
+}
+
+INTENTS_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "intents.jsonl")
+
+def load_intent_examples(path: str = INTENTS_PATH) -> tuple[list[str], list[str]]:
+    texts, labels = [], []
+
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                example = json.loads(line)
+                texts.append(example["text"])
+                labels.append(example["label"])
+
+    return texts, labels
+
+def normalize_text(text: str) -> str:
+    return unicodedata.normalize("NFC", text).lower().strip()
+
+def build_intent_model():
+    # Word n-grams carry the keywords ("hợp đồng", "thanh toán"), character n-grams cope with typos and teencode
+    return make_pipeline(
+        make_union(
+            TfidfVectorizer(analyzer="word", ngram_range=(1, 2), sublinear_tf=True),
+            TfidfVectorizer(analyzer="char_wb", ngram_range=(2, 4), sublinear_tf=True)
+        ),
+        LogisticRegression(C=10, max_iter=1000)
+    )
+
+class IntentClassifier:
+    """TF-IDF + logistic regression over the labelled examples in `app/data/intents.jsonl`, trained on construction.
+
+    Predictions below `min_confidence` fall back to `INTENT_UNKNOWN`, which is routed to the RAG chain like a search.
+    """
+
+    def __init__(self, texts: list[str] = None, labels: list[str] = None, min_confidence: float = 0.8):
+        if texts is None:
+            texts, labels = load_intent_examples()
+
+        self.min_confidence = min_confidence
+        self.model = build_intent_model()
+
+        # Each example is also learnt without diacritics, users often type that way
+        normalized = [normalize_text(text) for text in texts]
+        self.model.fit(normalized + [strip_diacritics(text) for text in normalized], labels + labels)
+
+    def predict(self, message: str) -> tuple[str, float]:
+        probabilities = self.model.predict_proba([normalize_text(message)])[0]
+        best = probabilities.argmax()
+
+        return self.model.classes_[best], float(probabilities[best])
+
+    def classify(self, message: str) -> str:
+        label, confidence = self.predict(message)
+
+        return label if confidence >= self.min_confidence else INTENT_UNKNOWN
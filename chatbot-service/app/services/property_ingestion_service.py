@@ -0,0 +1,69 @@
+import json
+from app.repositories.qdrant_repository import QdrantRepository
+from app.services.answer_cache_service import SemanticAnswerCache
+from app.utils.document import to_property_document
+from app.utils.embedding import from_documents
+from app.utils.metrics import stage
+from app.utils.sparse import to_sparse_document
+
+PROPERTY_UPDATED = "PROPERTY_UPDATED"
+PROPERTY_DELETED = "PROPERTY_DELETED"
+INDEXED_STATUSES = ("ACTIVE", "UNAVAILABLE")
+
+class PropertyIngestionService:
+    """Applies property events from the property service to the Qdrant property collection."""
+
+    def __init__(self, qdrant_repo: QdrantRepository, collection_name: str, embed_documents=from_documents, answer_cache: SemanticAnswerCache = None):
+        self.qdrant_repo = qdrant_repo
+        self.collection_name = collection_name
+        self.embed_documents = embed_documents
+        self.answer_cache = answer_cache
+        self.sparse_vectors = qdrant_repo.has_sparse_vectors(collection_name)
+
+    def handle_message(self, message: bytes):
+        self.handle_batch([message])
+
+    def handle_batch(self, messages: list[bytes]):
+        # Only the last event of each property in the batch matters
+        events = {}
+
+        for message in messages:
+            event = json.loads(message.decode("utf-8"))
+
+            if event["type"] in (PROPERTY_UPDATED, PROPERTY_DELETED):
+                events[event["data"]["propertyId"]] = event
+
+        if not events:
+            return
+
+        documents = []
+        removed_ids = []
+
+        for property_id, event in events.items():
+            data = event["data"]
+
+            if event["type"] == PROPERTY_UPDATED and data["status"] in INDEXED_STATUSES:
+                data["id"] = property_id
+                documents.append(to_property_document(data))
+            else:
+                removed_ids.append(property_id)
+
+        # Point ids are derived from the property id, so an update is a single overwriting upsert
+        if removed_ids:
+            with stage("ingestion_delete"):
+                self.qdrant_repo.delete_documents(collection_name=self.collection_name, doc_ids=removed_ids)
+
+        if documents:
+            self.index_documents(documents)
+
+        # Cached answers citing a changed property would show stale details
+        if self.answer_cache is not None:
+            self.answer_cache.invalidate(property_ids=events.keys(), slugs=[event["data"].get("slug") for event in events.values()])
+
+    def index_documents(self, documents):
+        with stage("ingestion_embed"):
+            embeddings = self.embed_documents(documents)
+            sparse_embeddings = [to_sparse_document(doc.page_content) for doc in documents] if self.sparse_vectors else None
+
+        with stage("ingestion_upsert"):
+            self.qdrant_repo.insert_documents(collection_name=self.collection_name, documents=documents, embeddings=embeddings, sparse_embeddings=sparse_embeddings)
@@ -1,81 +1,170 @@
-import pika
+import asyncio
 import json
-import os
-from typing import Dict, Optional, Callable
+import logging
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+import aio_pika
+from aio_pika.abc import AbstractChannel, AbstractExchange, AbstractIncomingMessage, AbstractRobustConnection
+from aio_pika.pool import Pool
+from app.core.config import settings
+from app.utils.metrics import INGESTION_BATCH_SIZE, INGESTION_QUEUE_LAG_SECONDS, INGESTION_UNTIMED_MESSAGES, stage
+
+logger = logging.getLogger(__name__)
+
+def to_message(message: Dict) -> aio_pika.Message:
+    # The timestamp lets consumers measure queue lag
+    return aio_pika.Message(body=json.dumps(message).encode("utf-8"), content_type="application/json", timestamp=time.time())
+
+async def consume_in_batches(messages: asyncio.Queue, callback: Callable[[List[bytes]], Awaitable[None]], batch_size: int, batch_timeout: float):
+    """Passes up to `batch_size` bodies from `messages` (or what arrived within `batch_timeout` seconds of the first) to `callback`.
+
+    Messages are acked only once `callback` returns. If the batch fails, its messages are retried one by one so a single
+    bad message doesn't hold back the others; a failing message is requeued once, then rejected. A `None` in `messages`
+    stops the loop after the current batch.
+    """
+    loop = asyncio.get_running_loop()
+    stopped = False
+
+    async def settle(message: AbstractIncomingMessage, ack: bool, **kwargs):
+        # After a reconnect the delivery tag belongs to a closed channel and settling raises. The broker redelivers
+        # unacked messages on the new channel anyway, so the failure is logged and the loop goes on
+        try:
+            await (message.ack(**kwargs) if ack else message.nack(**kwargs))
+        except Exception as e:
+            logger.warning("Could not %s message %s, the broker will redeliver it: %r", "ack" if ack else "nack", message.delivery_tag, e)
+
+    async def flush(batch: List[AbstractIncomingMessage]):
+        INGESTION_BATCH_SIZE.observe(len(batch))
+
+        try:
+            with stage("ingestion_batch"):
+                await callback([message.body for message in batch])
+        except Exception as e:
+            logger.warning("Batch of %d messages failed, retrying one by one: %r", len(batch), e)
+        else:
+            await settle(batch[-1], ack=True, multiple=True)
+            return
+
+        for message in batch:
+            try:
+                await callback([message.body])
+            except Exception as e:
+                logger.warning("%s message: %r", "Rejecting" if message.redelivered else "Requeuing", e)
+                await settle(message, ack=False, requeue=not message.redelivered)
+            else:
+                await settle(message, ack=True)
+
+    while not stopped:
+        message = await messages.get()
+
+        if message is None:
+            break
+
+        batch = [message]
+        deadline = loop.time() + batch_timeout
+
+        while len(batch) < batch_size:
+            try:
+                message = await asyncio.wait_for(messages.get(), timeout=max(deadline - loop.time(), 0))
+            except asyncio.TimeoutError:
+                break
+
+            if message is None:
+                stopped = True
+                break
+
+            batch.append(message)
+
+        for message in batch:
+            # Producers older than the estate manager's timestamped publish send none, and have no lag to report
+            if message.timestamp is None:
+                INGESTION_UNTIMED_MESSAGES.inc()
+                continue
+
+            INGESTION_QUEUE_LAG_SECONDS.observe(max(time.time() - message.timestamp.timestamp(), 0))
+
+        await flush(batch)
 
 class RabbitMQ:
-    _instance: Optional['RabbitMQ'] = None
-    _connection: Optional[pika.BlockingConnection] = None
-    _channels: Dict[str, pika.channel.Channel]
-
-    def __init__(self):
-        self._channels = {}
-
-    @classmethod
-    def get_instance(cls) -> 'RabbitMQ':
-        if cls._instance is None:
-            cls._instance = RabbitMQ()
-        return cls._instance
-
-    def connect(self) -> pika.BlockingConnection:
-        if not self._connection:
-            self._connection = pika.BlockingConnection(
-                pika.URLParameters(os.getenv("RABBIT_MQ_URL"))
-            )
-            # FIXME: Remove this print statement
-            print("RabbitMQ connected")
+    """asyncio RabbitMQ client on one robust connection, which reconnects and restores channels, queues and consumers.
+
+    Publishing goes through a pool of channels in publisher-confirm mode; `publish_many` pipelines a batch on one
+    channel and waits for all of its confirms at once instead of one round-trip per message.
+    """
+
+    def __init__(self, url: str = None, channel_pool_size: int = None, connect=aio_pika.connect_robust):
+        self.url = url or settings.RABBIT_MQ_URL
+        self.channel_pool_size = channel_pool_size or settings.RABBITMQ_CHANNEL_POOL_SIZE
+        self._connect = connect
+        self._connection: Optional[AbstractRobustConnection] = None
+        self._channel_pool: Optional[Pool] = None
+        self._exchanges: Dict[str, AbstractExchange] = {}
+
+    async def connect(self) -> AbstractRobustConnection:
+        if self._connection is None:
+            self._connection = await self._connect(self.url)
+            self._channel_pool = Pool(self._create_channel, max_size=self.channel_pool_size)
+            logger.info("RabbitMQ connected")
+
         return self._connection
 
-    def create_channel(self, name: str, exchange: Optional[Dict[str, str]] = None) -> pika.channel.Channel:
-        if name not in self._channels:
-            connection = self.connect()
-            channel = connection.channel()
-            
-            if exchange:
-                channel.exchange_declare(exchange=exchange['name'], exchange_type=exchange['type'], durable=False)
-            else:
-                channel.queue_declare(queue=name, durable=False)
-            
-            self._channels[name] = channel
-        return self._channels[name]
+    async def close(self):
+        if self._channel_pool is not None:
+            await self._channel_pool.close()
+
+        if self._connection is not None:
+            await self._connection.close()
+
+        self._connection = None
+        self._channel_pool = None
+        self._exchanges = {}
+
+    async def _create_channel(self) -> AbstractChannel:
+        return await self._connection.channel(publisher_confirms=True)
 
-    def send_to_queue(self, queue: str, message: Dict):
-        if queue not in self._channels:
-            self.create_channel(name=queue)
+    async def _get_exchange(self, channel: AbstractChannel, exchange: Optional[Dict[str, str]]) -> AbstractExchange:
+        if exchange is None:
+            return channel.default_exchange
 
-        print(f'Sending to queue: {queue}')
-        print(f'Message: {message}')
+        # Exchange objects are bound to the channel that declared them
+        key = f"{id(channel)}:{exchange['name']}"
 
-        self._channels[queue].basic_publish(
-            exchange='', routing_key=queue, body=json.dumps(message)
-        )
+        if key not in self._exchanges:
+            self._exchanges[key] = await channel.declare_exchange(exchange['name'], type=exchange['type'], durable=False)
 
-    def consume_queue(self, queue: str, callback: Callable[[pika.spec.Basic.Deliver, pika.spec.BasicProperties, bytes], None]):
-        if queue not in self._channels:
-            self.create_channel(name=queue)
+        return self._exchanges[key]
 
-        self._channels[queue].basic_consume(queue=queue, on_message_callback=callback, auto_ack=True)
+    async def publish_many(self, messages: List[Dict], exchange: Optional[Dict[str, str]] = None, routing_key: str = ""):
+        """Publishes `messages` and returns once the broker has confirmed all of them. Raises if any is nacked or returned."""
+        await self.connect()
 
-    def publish_in_queue(self, name: str, exchange: Dict[str, str], message: Dict):
-        if name not in self._channels:
-            self.create_channel(name=name, exchange=exchange)
+        async with self._channel_pool.acquire() as channel:
+            target = await self._get_exchange(channel, exchange)
+            await asyncio.gather(*(target.publish(to_message(message), routing_key=routing_key) for message in messages))
 
-        self._channels[name].basic_publish(
-            exchange=exchange['name'], routing_key='', body=json.dumps(message)
-        )
+    async def send_to_queue(self, queue: str, message: Dict):
+        await self.publish_many([message], routing_key=queue)
 
-    def subscribe_to_queue(self, name: str, exchange: Dict[str, str], callback: Callable[[pika.spec.Basic.Deliver, pika.spec.BasicProperties, bytes], None]):
-        if name not in self._channels:
-            self.create_channel(name=name, exchange=exchange)
+    async def publish_in_queue(self, exchange: Dict[str, str], message: Dict):
+        await self.publish_many([message], exchange=exchange)
 
-        def wrapped_callback(ch, method, properties, body):
-            callback(body)
+    async def subscribe_to_queue_batched(self, queue: str, exchange: Dict[str, str], callback: Callable[[List[bytes]], Awaitable[None]], batch_size: int, batch_timeout: float, prefetch_count: int):
+        """Consumes `queue`, bound to `exchange`, in batches until cancelled. The consumer has its own channel, outside the publish pool."""
+        connection = await self.connect()
+        channel = await connection.channel()
+        await channel.set_qos(prefetch_count=prefetch_count)
 
-        result = self._channels[name].queue_declare(queue='', exclusive=True)
-        queue_name = result.method.queue
+        target = await channel.declare_exchange(exchange['name'], type=exchange['type'], durable=False)
+        # A named durable queue keeps unacked messages across restarts and lets several consumers share the load
+        declared_queue = await channel.declare_queue(queue, durable=True)
+        await declared_queue.bind(target)
 
-        self._channels[name].queue_bind(exchange=exchange['name'], queue=queue_name)
-        
-        self._channels[name].basic_consume(queue=queue_name, on_message_callback=wrapped_callback, auto_ack=True)
+        messages = asyncio.Queue()
+        consumer_tag = await declared_queue.consume(messages.put)
 
-        self._channels[name].start_consuming()
+        try:
+            await consume_in_batches(messages, callback=callback, batch_size=batch_size, batch_timeout=batch_timeout)
+        finally:
+            if not channel.is_closed:
+                await declared_queue.cancel(consumer_tag)
+                await channel.close()
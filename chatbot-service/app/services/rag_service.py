@@ -1,69 +1,57 @@
 from app.repositories.qdrant_repository import QdrantRepository
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
+from app.utils.embedding import get_embeddings
 from langchain_qdrant import Qdrant
 from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain.prompts import PromptTemplate
-from langchain.chains import RetrievalQA
 from langchain.schema import HumanMessage, SystemMessage
-from qdrant_client.http import models as qdrant_models
-from app.utils.preprocess_currency import preprocess_currency
+from app.utils.attribution import attribute_documents
+from app.utils.context_packer import format_history_context, pack_context
+from app.utils.query_parser import RELAXED_FILTER_FIELDS, parse_query
+from app.services.answer_cache_service import SemanticAnswerCache
+from app.utils.dense_retriever import DenseQdrantRetriever
+from app.utils.hybrid_retriever import HybridQdrantRetriever
+from app.utils.relaxed_filter_retriever import RelaxedFilterRetriever
+from app.utils.gateway_models import GatewayChatModel
+from app.utils.lazy import lazy
+from app.utils.llm_gateway import get_llm_gateway
+from app.utils.metrics import CONTEXTUALIZE_DECISIONS, CONTEXTUALIZE_SAVED_SECONDS, mean_stage_seconds, metrics_callback_handler, stage
+from app.utils.standalone_query import is_standalone_query
+from app.core.config import settings
 from app.utils.product_info import document_to_product_info, format_product_infos
 import os
 import dotenv
-import re
-from langchain.chains import create_history_aware_retriever
+import logging
+import time
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain.chains import create_history_aware_retriever, create_retrieval_chain
+from langchain.chains import create_retrieval_chain
 from langchain.chains.combine_documents import create_stuff_documents_chain
 from langchain_community.chat_message_histories import ChatMessageHistory
 from langchain_core.runnables.history import RunnableWithMessageHistory
 from langchain.schema.retriever import BaseRetriever
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.runnables import ConfigurableField, ConfigurableFieldSpec, Runnable, RunnableBranch
+from langchain.docstore.document import Document
 
 # TODO: Chính tả, emoji, lịch sử trò chuyện
 
 dotenv.load_dotenv()
 
-embeddings = GoogleGenerativeAIEmbeddings(
-    model=os.getenv("EMBEDDING_MODEL", "models/embedding-001"),
-    google_api_key=os.getenv("GOOGLE_API_KEY")  # Replace with your actual API key
-)
-
-llm = ChatGoogleGenerativeAI(
-    model=os.getenv("GOOGLE_MODEL", "gemini-pro"), 
-    google_api_key=os.getenv("GOOGLE_API_KEY"), 
-    temperature=0.9, 
-    max_tokens=1024, 
-    convert_system_message_to_human=True
-)
-
-# FIXME Change tên web
-sys_prompt = """
-Bạn là một trợ lý đắc lực, chuyên cung cấp thông tin và hỗ trợ về ứng dụng công nghệ blockchain trong phát triển hệ thống cho thuê nhà và hợp đồng thông minh của Công ty Gigalogy. 
+logger = logging.getLogger(__name__)
 
-Bạn CHỈ được phép sử dụng các thông tin được cung cấp trong phần "Thông tin bất động sản" của CONTEXT và lịch sử trò chuyện để trả lời câu hỏi của người dùng. **Nếu không có đủ thông tin để trả lời hoặc câu hỏi không liên quan đến CONTEXT, hãy ưu tiên xem xét lịch sử trò chuyện để đưa ra câu trả lời phù hợp. Nếu vẫn không thể trả lời, hãy gợi ý một vài câu hỏi khác liên quan đến các dịch vụ của Gigalogy để hỗ trợ người dùng tốt hơn.**
+@lazy
+def get_llm():
+    # Built on first use rather than at import
+    llm = ChatGoogleGenerativeAI(
+        model=os.getenv("GOOGLE_MODEL", "gemini-pro"), 
+        google_api_key=os.getenv("GOOGLE_API_KEY"), 
+        temperature=0.9, 
+        max_tokens=1024, 
+        convert_system_message_to_human=True,
+        # A single attempt, the gateway does the retrying
+        max_retries=1 if settings.GATEWAY_ENABLED else 6
+    )
 
-CONTEXT sẽ bao gồm hai phần:
-
-* **Lịch sử trò chuyện:** Ghi lại các tương tác trước đó giữa bạn và người dùng, mỗi cặp câu hỏi-trả lời được phân tách bằng dấu '--'. Bạn có thể sử dụng thông tin này để hiểu ngữ cảnh và đưa ra câu trả lời phù hợp hơn.
-* **Thông tin bất động sản:** Cung cấp danh sách các bất động sản cho thuê, mỗi bất động sản có các thông tin sau:
-    * **title:** Tiêu đề của bất động sản.
-    * **description:** Mô tả chi tiết về bất động sản.
-    * **prices:** Giá của bất động sản.
-    * **address:** Địa chỉ của bất động sản, bao gồm đường, phường/xã, quận/huyện, thành phố.
-    * **conditions:** Các điều kiện thuê (nếu có).
-    * **attributes:** Các tiện ích của bất động sản (nếu có).
-    * **slug:** Slug của bất động sản.
-
-Nhiệm vụ chính của bạn là:
-
-* **Tìm kiếm nhà:** Giúp người dùng tìm kiếm nhà cho thuê phù hợp dựa trên các tiêu chí như vị trí, giá cả, tiện ích, điều kiện thuê...
-* **Đưa ra thông tin chi tiết:** Cung cấp thông tin chi tiết về các bất động sản (tiêu đề, mô tả, giá, địa chỉ, tiện ích...), các điều khoản trong hợp đồng thuê, lợi ích của việc sử dụng hợp đồng thông minh và công nghệ blockchain. **Nếu câu trả lời liên quan đến một bất động sản cụ thể, hãy đảm bảo đưa slug của bất động sản đó vào cuối câu trả lời, đặt trong dấu ngoặc đơn. Ví dụ: (Slug: can-ho-cao-cap-quan-1)**
-* **Hỗ trợ chung:** Giải đáp các thắc mắc khác liên quan đến quy trình thuê nhà, hợp đồng thông minh, thanh toán bằng tiền điện tử, công nghệ blockchain,...
-
-**Hãy luôn xem xét lịch sử trò chuyện để hiểu ngữ cảnh của câu hỏi hiện tại và đưa ra câu trả lời hoặc gợi ý phù hợp hơn.** 
-
-{context}
-"""
+    return GatewayChatModel(llm=llm, gateway=get_llm_gateway()) if settings.GATEWAY_ENABLED else llm
 
 qa_system_prompt = """Bạn là một trợ lý đắc lực, chuyên cung cấp thông tin và hỗ trợ về ứng dụng công nghệ blockchain trong phát triển hệ thống cho thuê nhà và hợp đồng thông minh của SmartRent. \
 Sử dụng các phần ngữ cảnh sau đây để trả lời câu hỏi. \
@@ -107,12 +95,6 @@ Bạn sẽ nhận được một câu hỏi từ người dùng liên quan đế
 **Bây giờ, hãy phân loại câu hỏi sau:**
 """
 
-instruction = """CONTEXT:\n\n {context}\n\nQuery: {question}\n"""
-
-prompt_template = sys_prompt + instruction
-
-QA_prompt = PromptTemplate(template=prompt_template, input_variables=["context", "question"])
-
 ### Contextualize question ###
 contextualize_q_system_prompt = """Given a chat history and the latest user question \
 which might reference context in the chat history, formulate a standalone question \
@@ -126,149 +108,300 @@ contextualize_q_prompt = ChatPromptTemplate.from_messages(
     ]
 )
 
+### Summarize conversation ###
+summarize_conversation_prompt = ChatPromptTemplate.from_messages(
+    [
+        ("system", """Bạn tóm tắt cuộc trò chuyện giữa người dùng và trợ lý tìm nhà cho thuê SmartRent. \
+Kết hợp bản tóm tắt hiện có với các lượt trò chuyện mới thành một bản tóm tắt duy nhất, tối đa 150 từ. \
+Giữ lại nhu cầu của người dùng (khu vực, giá, loại nhà, tiện ích) và slug của các bất động sản đã được nhắc đến. \
+Chỉ trả về bản tóm tắt."""),
+        ("human", "Bản tóm tắt hiện có:\n{summary}\n\nCác lượt trò chuyện mới:\n{turns}"),
+    ]
+)
+
+### Answer question ###
+# `history_context` holds the summary and the property contents cited earlier in the conversation
+qa_prompt = ChatPromptTemplate.from_messages(
+    [
+        ("system", qa_system_prompt + "{history_context}"),
+        MessagesPlaceholder("chat_history"),
+        ("human", "{input}"),
+    ]
+)
+
+RETRIEVER_TOP_K = 5
+
+class ContextPackStep(Runnable[dict, dict]):
+    """Runs `pack` on the inputs of the answer chain.
+
+    A plain Runnable rather than a RunnableLambda: LangChain serializes the chain on every call, which for a lambda
+    means reading and parsing its source.
+    """
+
+    name = "context_pack"
+
+    def __init__(self, pack):
+        self.pack = pack
+
+    def invoke(self, input: dict, config=None, **kwargs) -> dict:
+        return self._call_with_config(self.pack, input, config)
+
+    async def ainvoke(self, input: dict, config=None, **kwargs) -> dict:
+        # CPU-only and short, not worth a hop to the executor
+        return self.invoke(input, config)
+
+def classify_question_with_llm(llm, message: str) -> str:
+    # Requests are routed with the local `IntentClassifier`, this is the reference it is benchmarked against
+    messages = [SystemMessage(content=sys_prompt_question_classification)]
+    messages.append(HumanMessage(content=message))
+
+    llm_res = llm.invoke(messages)
+
+    return llm_res.content.strip()
+
 class RagService:
-    def __init__(self, qdrant_repo: QdrantRepository, collection_names):
+    def __init__(self, qdrant_repo: QdrantRepository, collection_names, llm=None, embeddings=None, answer_cache: SemanticAnswerCache = None, search_params=None):
         self.qdrant_repo = qdrant_repo
+        # Qdrant `SearchParams` (HNSW ef, quantization oversampling) for every retrieval, see `CollectionProfile`
+        self.search_params = search_params
+        self.llm = llm or get_llm()
+        self.embeddings = embeddings or get_embeddings()
+        self.answer_cache = answer_cache
         self.vector_stores = {}
-        self.qa_chains = {}
+        self.rag_chains = {}
+        self.conversational_chains = {}
+        self.summarize_chain = summarize_conversation_prompt | self.llm.with_config(tags=["summarize"])
 
         for collection_name in collection_names:
             self.vector_stores[collection_name] = Qdrant(
                 client=self.qdrant_repo.client,
+                async_client=self.qdrant_repo.async_client,
                 collection_name=collection_name,
-                embeddings=embeddings
+                embeddings=self.embeddings
             )
 
-            self.qa_chains[collection_name] = RetrievalQA.from_chain_type(
-                llm=llm,
-                chain_type="stuff", 
-                retriever=self.vector_stores[collection_name].as_retriever(search_kwargs={"k":3}),
-                return_source_documents=True,
-                chain_type_kwargs={"prompt":QA_prompt}
+            self.rag_chains[collection_name] = self._build_rag_chain(self._build_retriever(collection_name))
+            self.conversational_chains[collection_name] = self._build_conversational_chain(self.rag_chains[collection_name])
+
+    def _build_retriever(self, collection_name: str):
+        # Collections created before sparse vectors were added stay dense-only until they are re-indexed
+        if settings.HYBRID_SEARCH_ENABLED and self.qdrant_repo.has_sparse_vectors(collection_name):
+            retriever = HybridQdrantRetriever(
+                qdrant_repo=self.qdrant_repo,
+                collection_name=collection_name,
+                embeddings=self.embeddings,
+                search_kwargs={"k": RETRIEVER_TOP_K},
+                prefetch_k=settings.HYBRID_PREFETCH_K
             )
+        else:
+            retriever = DenseQdrantRetriever(vector_store=self.vector_stores[collection_name], search_kwargs={"k": RETRIEVER_TOP_K})
 
-    def generate_response(self, collection_name: str, query: str, chat_history: list[dict] = []):
-        price_range_match = re.search(r"từ ((\d+(?:\.\d+)?)\s*(?:triệu)?\s*(?:đồng)?) đến ((\d+(?:\.\d+)?)\s*(?:triệu)?\s*(?:đồng)?)", query, re.IGNORECASE)
-        min_price_match = re.search(r"(?:trên|lớn hơn|cao hơn)\s+((\d+(?:\.\d+)?)\s*(?:triệu)?\s*(?:đồng)?)", query, re.IGNORECASE)
-        max_price_match = re.search(r"(?:dưới|nhỏ hơn|thấp hơn|bé hơn)\s+((\d+(?:\.\d+)?)\s*(?:triệu)?\s*(?:đồng)?)", query, re.IGNORECASE)
-        approx_price_match = re.search(r"(?:khoảng|tầm)\s+((\d+(?:\.\d+)?)\s*(?:triệu)?\s*(?:đồng)?)", query, re.IGNORECASE)
-
-        min_price = None
-        max_price = None
-
-        if approx_price_match:
-            approx_price = self._normalize_price(preprocess_currency(query=query, match=approx_price_match.group(1)))
-            tolerance = 0.2
-            min_price = approx_price * (1 - tolerance)
-            max_price = approx_price * (1 + tolerance)
-        elif price_range_match:
-            min_price = self._normalize_price(preprocess_currency(query=query, match=price_range_match.group(1)))
-            max_price = self._normalize_price(preprocess_currency(query=query, match=price_range_match.group(3)))
-        elif min_price_match:
-            min_price = self._normalize_price(preprocess_currency(query=query, match=min_price_match.group(1)))
-        elif max_price_match:
-            max_price = self._normalize_price(preprocess_currency(query=query, match=max_price_match.group(1)))
-        
-        must_filter = []
-        if min_price is not None:
-            must_filter.append(qdrant_models.FieldCondition(
-                key="metadata.price",
-                range=qdrant_models.Range(
-                    gte=min_price
-                )
-            ))
-        if max_price is not None:
-            must_filter.append(qdrant_models.FieldCondition(
-                key="metadata.price",
-                range=qdrant_models.Range(
-                    lte=max_price
-                )
-            ))
-
-        retriever = self.vector_stores[collection_name].as_retriever(search_kwargs={
-            "k": 5, 
-            "filter": qdrant_models.Filter(must=must_filter)
-        })
-
-        history_docs = []
-        for chat in chat_history:
-            if 'source_documents' in chat:
-                for doc in chat['source_documents']:
-                    if doc not in history_docs:
-                        history_docs.append(doc)
-        
-        history_aware_retriever = create_history_aware_retriever(
-            llm, retriever, contextualize_q_prompt
+        # The query filter changes on every request, so both sets of `search_kwargs` are resolved from the run config
+        return RelaxedFilterRetriever(retriever=retriever, search_kwargs={"k": RETRIEVER_TOP_K}).configurable_fields(
+            search_kwargs=ConfigurableField(id="search_kwargs"),
+            relaxed_search_kwargs=ConfigurableField(id="relaxed_search_kwargs")
         )
 
-        context = '\n'
+    def _build_rag_chain(self, retriever):
+        history_aware_retriever = self._build_history_aware_retriever(retriever)
 
-        for chat in chat_history:
-            for page_content in chat['page_contents']:
-                context += page_content + '\n'
+        # The tags tell the two LLM calls apart in the stage metrics
+        question_answer_chain = create_stuff_documents_chain(self.llm.with_config(tags=["answer"]), qa_prompt)
+        # Only the prompt gets the packed contents, the chain's `context` keeps the retrieved documents for attribution
+        return create_retrieval_chain(history_aware_retriever, ContextPackStep(self._pack_context) | question_answer_chain)
 
-        prompt = qa_system_prompt + context
+    def _pack_context(self, inputs: dict) -> dict:
+        history_documents = inputs["history_documents"]
 
-        qa_prompt = ChatPromptTemplate.from_messages(
-            [
-                ("system", prompt),
-                MessagesPlaceholder("chat_history"),
-                ("human", "{input}"),
-            ]
-        )
+        if not settings.CONTEXT_PACKING_ENABLED:
+            return {**inputs, "history_context": format_history_context(inputs["summary"], [page_content for _, page_content in history_documents])}
 
-        question_answer_chain = create_stuff_documents_chain(llm, qa_prompt)
-        rag_chain = create_retrieval_chain(history_aware_retriever, question_answer_chain)
+        with stage("context_pack"):
+            retrieved, history_contents = pack_context(
+                retrieved=[(document.metadata, document.page_content) for document in inputs["context"]],
+                history=history_documents[::-1],
+                max_tokens=settings.CONTEXT_MAX_TOKENS,
+                description_tokens=settings.CONTEXT_DESCRIPTION_MAX_TOKENS,
+                include_contact=settings.CONTEXT_INCLUDE_OWNER_CONTACT
+            )
 
-        chat_history_item = ChatMessageHistory()
+        return {
+            **inputs,
+            "context": [Document(page_content=content, metadata=metadata) for metadata, content in retrieved],
+            "history_context": format_history_context(inputs["summary"], history_contents)
+        }
 
-        for chat in chat_history:
-            chat_history_item.add_message({
-                "role": "human",
-                "content": chat['human'],
-            })
-            chat_history_item.add_message({
-                "role": "ai",
-                "content": chat['ai'],
-            })
+    def _build_history_aware_retriever(self, retriever):
+        # Same shape as `create_history_aware_retriever`, but self-contained queries skip the rewriting LLM call
+        rewrite = contextualize_q_prompt | self.llm.with_config(tags=["contextualize_question"]) | StrOutputParser() | retriever
+
+        return RunnableBranch(
+            (self._skip_contextualize, (lambda x: x["input"]) | retriever),
+            rewrite
+        ).with_config(run_name="chat_retriever_chain")
+
+    def _skip_contextualize(self, inputs: dict) -> bool:
+        if not inputs.get("chat_history"):
+            return True
+
+        if settings.CONTEXTUALIZE_MODE == "always" or not is_standalone_query(inputs["input"]):
+            CONTEXTUALIZE_DECISIONS.labels(decision="rewrite").inc()
+            logger.info("Contextualize: rewriting follow-up query %r", inputs["input"])
+            return False
 
-        def get_session_history():
-            return chat_history_item
+        saved = mean_stage_seconds("contextualize_question")
+        CONTEXTUALIZE_DECISIONS.labels(decision="skip").inc()
+        CONTEXTUALIZE_SAVED_SECONDS.inc(saved)
+        logger.info("Contextualize: skipped for standalone query %r, ~%.0f ms saved", inputs["input"], saved * 1000)
 
-        conversational_rag_chain = RunnableWithMessageHistory(
+        return True
+
+    def _build_conversational_chain(self, rag_chain):
+        # The per-request ChatMessageHistory is passed in through `configurable.message_history`
+        return RunnableWithMessageHistory(
             rag_chain,
-            get_session_history,
+            lambda message_history: message_history,
             input_messages_key="input",
             history_messages_key="chat_history",
             output_messages_key="answer",
+            history_factory_config=[
+                ConfigurableFieldSpec(
+                    id="message_history",
+                    annotation=BaseChatMessageHistory,
+                    name="Message history",
+                    description="Chat history of the current user.",
+                    default=None,
+                    is_shared=True,
+                ),
+            ],
         )
 
-        result = conversational_rag_chain.invoke(
-            {"input": query},
-            config={"configurable": {"session_id": "1"}}
-        )
+    def generate_response(self, collection_name: str, query: str, chat_history: list[dict] = [], summary: str = None):
+        inputs, config = self._prepare_run(query=query, chat_history=chat_history, summary=summary)
+        result = self.conversational_chains[collection_name].invoke(inputs, config=config)
+
+        return self._to_response(query=query, result=result, chat_history=chat_history)
+
+    async def agenerate_response(self, collection_name: str, query: str, chat_history: list[dict] = [], summary: str = None):
+        cache_scope = self._answer_cache_scope(collection_name=collection_name, query=query, chat_history=chat_history, summary=summary)
+
+        if cache_scope:
+            cached, query_vector = await self._aget_cached_answer(scope=cache_scope, query=query)
+
+            if cached:
+                return {**cached, "query": query}
+
+        start = time.perf_counter()
+        inputs, config = self._prepare_run(query=query, chat_history=chat_history, summary=summary)
+        result = await self.conversational_chains[collection_name].ainvoke(inputs, config=config)
+        response = self._to_response(query=query, result=result, chat_history=chat_history)
+
+        if cache_scope:
+            self.answer_cache.set(scope=cache_scope, query=query, vector=query_vector, response=response, elapsed=time.perf_counter() - start)
+
+        return response
+
+    async def astream_response(self, collection_name: str, query: str, chat_history: list[dict] = [], summary: str = None):
+        cache_scope = self._answer_cache_scope(collection_name=collection_name, query=query, chat_history=chat_history, summary=summary)
+
+        if cache_scope:
+            cached, query_vector = await self._aget_cached_answer(scope=cache_scope, query=query)
+
+            if cached:
+                yield {"type": "token", "content": cached["result"]}
+                yield {"type": "end", "response": {**cached, "query": query}}
+                return
+
+        start = time.perf_counter()
+        inputs, config = self._prepare_run(query=query, chat_history=chat_history, summary=summary)
+        inputs["chat_history"] = config["configurable"]["message_history"].messages
+        result = {"context": [], "answer": ""}
+
+        # RunnableWithMessageHistory (langchain-core 0.2) runs its history listener on the wrong run when
+        # streaming and logs KeyError('answer'), so the inner chain is streamed with the history passed in directly
+        async for chunk in self.rag_chains[collection_name].astream(inputs, config=config):
+            if "context" in chunk:
+                result["context"] = chunk["context"]
+
+            if "answer" in chunk:
+                result["answer"] += chunk["answer"]
+                yield {"type": "token", "content": chunk["answer"]}
+
+        response = self._to_response(query=query, result=result, chat_history=chat_history)
+
+        if cache_scope:
+            self.answer_cache.set(scope=cache_scope, query=query, vector=query_vector, response=response, elapsed=time.perf_counter() - start)
+
+        yield {"type": "end", "response": response}
+
+    def _answer_cache_scope(self, collection_name: str, query: str, chat_history: list[dict], summary: str = None):
+        # Only first-turn answers are shared, later turns depend on the user's own conversation
+        if self.answer_cache is None or chat_history or summary:
+            return None
+
+        return f"{collection_name}:{parse_query(query)!r}"
+
+    async def _aget_cached_answer(self, scope: str, query: str):
+        cached = self.answer_cache.get_exact(scope=scope, query=query)
 
-        properties = []
-        slugs = []
-        page_contents = []
+        if cached:
+            return cached, None
 
-        for item in result['context']:
-            property = item.metadata
+        # The embedding cache makes the retriever's own embedding of this query free
+        query_vector = await self.embeddings.aembed_query(query)
+        cached = self.answer_cache.get_similar(scope=scope, vector=query_vector)
 
-            if property['slug'] in result['answer'] and property['slug'] not in slugs:
-                properties.append(property)
-                page_contents.append(item.page_content)
-                slugs.append(property['slug'])
+        if not cached:
+            self.answer_cache.record_miss()
 
+        return cached, query_vector
 
-        for i in range(len(chat_history)):
-            documents = chat_history[i]['source_documents']
+    async def asummarize_conversation(self, summary: str, chat_history: list[dict]):
+        turns = "\n--\n".join(f"Người dùng: {chat['human']}\nTrợ lý: {chat['ai']}" for chat in chat_history)
+        llm_res = await self.summarize_chain.ainvoke({"summary": summary or "(chưa có)", "turns": turns}, config={"callbacks": [metrics_callback_handler]})
 
-            for j in range(len(documents)):
-                if documents[j]['slug'] in result['answer'] and documents[j]['slug'] not in slugs:
-                    properties.append(documents[j])
-                    page_contents.append(chat_history[i]['page_contents'][j])
-                    slugs.append(documents[j]['slug'])
+        return llm_res.content
+
+    def _prepare_run(self, query: str, chat_history: list[dict], summary: str = None):
+        # Price, location, type, bedrooms and amenities become payload filters, the rest is left to semantic search
+        parsed_query = parse_query(query)
+        search_kwargs = {
+            "k": RETRIEVER_TOP_K, 
+            "filter": parsed_query.to_filter(fields=settings.QUERY_FILTER_FIELDS)
+        }
+
+        if self.search_params is not None:
+            search_kwargs["search_params"] = self.search_params
+
+        relaxed_filter = parsed_query.to_filter(fields=[name for name in settings.QUERY_FILTER_FIELDS if name in RELAXED_FILTER_FIELDS])
+        # Only worth a retry when the full filter has conditions the relaxed one drops
+        relaxed_search_kwargs = {**search_kwargs, "filter": relaxed_filter} if len(relaxed_filter.must) < len(search_kwargs["filter"].must) else None
+
+        chat_history_item = ChatMessageHistory()
+
+        for chat in chat_history:
+            chat_history_item.add_message({
+                "role": "human",
+                "content": chat['human'],
+            })
+            chat_history_item.add_message({
+                "role": "ai",
+                "content": chat['ai'],
+            })
+
+        # Properties cited earlier in the conversation, oldest first, packed with the retrieved ones by `_pack_context`
+        history_documents = [document for chat in chat_history for document in zip(chat['source_documents'], chat['page_contents'])]
+        inputs = {"input": query, "summary": summary, "history_documents": history_documents}
+        config = {
+            "configurable": {"search_kwargs": search_kwargs, "relaxed_search_kwargs": relaxed_search_kwargs, "message_history": chat_history_item},
+            "callbacks": [metrics_callback_handler]
+        }
+
+        return inputs, config
+
+    def _to_response(self, query: str, result: dict, chat_history: list[dict]):
+        with stage("slug_attribution"):
+            properties, page_contents, slugs = attribute_documents(answer=result['answer'], context_documents=result['context'], chat_history=chat_history)
 
         return {
             "query": query,
@@ -279,17 +412,4 @@ class RagService:
         }
     
     def classify_question(self, message: str):
-        messages = [SystemMessage(content=sys_prompt_question_classification)]
-        messages.append(HumanMessage(content=message))
-
-        llm_res = llm.invoke(messages)
-
-        return llm_res.content
-    
-    def _normalize_price(self, price_str):
-        price_str = price_str.lower().replace(".", "").replace(",", "")
-        if "triệu" in price_str or "triệu đồng" in price_str:
-            return int(price_str.replace("triệu đồng", "").replace("triệu", "").strip()) * 1000000
-        if "đồng" in price_str:
-            return int(price_str.replace("đồng", "").strip())
-        return int(price_str)
+        return classify_question_with_llm(self.llm, message)
@@ -0,0 +1,88 @@
+import asyncio
+import logging
+import weakref
+from datetime import datetime
+from app.services.chat_document_service import resolve_documents
+from app.services.chat_service import CHAT_HISTORY_PROJECTION, collection as chat_collection, db
+from app.core.config import settings
+from app.utils.chat_history import trim_chat_history
+
+logger = logging.getLogger(__name__)
+
+collection = db["chat_summary"]
+
+# Updates for the same user are serialized so two folds can't overwrite each other
+_locks = weakref.WeakValueDictionary()
+_background_tasks = set()
+
+async def create_indexes():
+    await collection.create_index("user_id", unique=True)
+
+async def get_summary(user_id: str):
+    summary = await collection.find_one({"user_id": user_id}, {"_id": 0, "summary": 1})
+
+    return summary["summary"] if summary else None
+
+async def oldest_replayed_chat(user_id: str):
+    """`updated_at` of the oldest chat `load_chat_history` replays, trimmed the same way, or None when it replays none."""
+    if settings.CHAT_HISTORY_MAX_TURNS <= 0:
+        return None
+
+    include_page_contents = not settings.CONTEXT_PACKING_ENABLED
+    projection = {**CHAT_HISTORY_PROJECTION, "updated_at": 1} if include_page_contents else {"_id": 0, "request": 1, "response": 1, "updated_at": 1}
+    chats = await chat_collection.find({"user_id": user_id}, projection).sort("updated_at", -1) \
+        .limit(settings.CHAT_HISTORY_MAX_TURNS).to_list(length=settings.CHAT_HISTORY_MAX_TURNS)
+
+    if include_page_contents:
+        await resolve_documents(chats)
+
+    window = trim_chat_history(
+        [{"human": chat["request"], "ai": chat["response"], "page_contents": chat.get("page_contents") or [], "updated_at": chat["updated_at"]} for chat in reversed(chats)],
+        max_turns=settings.CHAT_HISTORY_MAX_TURNS, max_tokens=settings.CHAT_HISTORY_MAX_TOKENS, include_page_contents=include_page_contents
+    )
+
+    return window[0]["updated_at"] if window else None
+
+async def update_summary(user_id: str, summarize):
+    lock = _locks.get(user_id)
+
+    if lock is None:
+        lock = _locks[user_id] = asyncio.Lock()
+
+    async with lock:
+        summary = await collection.find_one({"user_id": user_id}) or {}
+        summarized_until = summary.get("summarized_until", datetime.min)
+
+        # Every chat older than the replayed window is folded in, whether it fell out by turn count or by tokens
+        replayed_from = await oldest_replayed_chat(user_id)
+        updated_at = {"$gt": summarized_until} if replayed_from is None else {"$gt": summarized_until, "$lt": replayed_from}
+
+        chats = await chat_collection.find(
+            {"user_id": user_id, "updated_at": updated_at},
+            {"_id": 0, "request": 1, "response": 1, "updated_at": 1}
+        ).sort("updated_at", 1).limit(settings.CHAT_SUMMARY_MAX_FOLD_TURNS).to_list(length=settings.CHAT_SUMMARY_MAX_FOLD_TURNS)
+
+        if not chats:
+            return
+
+        new_summary = await summarize(summary.get("summary"), [{"human": chat["request"], "ai": chat["response"]} for chat in chats])
+
+        await collection.update_one(
+            {"user_id": user_id},
+            {"$set": {"summary": new_summary, "summarized_until": chats[-1]["updated_at"], "updated_at": datetime.now()}},
+            upsert=True
+        )
+
+def schedule_summary_update(user_id: str, summarize):
+    task = asyncio.create_task(update_summary(user_id=user_id, summarize=summarize))
+
+    # Keep a reference until the task is done, the event loop only holds weak ones
+    _background_tasks.add(task)
+    task.add_done_callback(lambda task: _on_summary_update_done(task, user_id))
+
+def _on_summary_update_done(task: asyncio.Task, user_id: str):
+    _background_tasks.discard(task)
+
+    # Nobody awaits the task, so its error would otherwise only surface as "exception was never retrieved"
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("Summary update failed for user %s", user_id, exc_info=task.exception())
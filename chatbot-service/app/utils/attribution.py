@@ -0,0 +1,48 @@
+import re
+
+# "(Slug: a)" / "(Slug: a, b)" markers as the prompts ask for, plus bare kebab-case slugs the LLM sometimes writes inline
+SLUG_PATTERN = re.compile(r"slug:\s*(?P<marker>[^)\n]+)|(?P<bare>\b[a-z0-9]+(?:-[a-z0-9]+)+\b)", re.IGNORECASE)
+MARKER_SEPARATOR = re.compile(r"[\s,;]+")
+
+def extract_slugs(answer: str) -> list[str]:
+    """Slugs cited in `answer`, deduplicated in order of first citation."""
+    slugs = {}
+
+    for match in SLUG_PATTERN.finditer(answer):
+        for slug in MARKER_SEPARATOR.split(match["marker"]) if match["marker"] else [match["bare"]]:
+            slug = slug.strip(" .`'\"*")
+
+            if slug:
+                slugs.setdefault(slug, None)
+
+    return list(slugs)
+
+def attribute_documents(answer: str, context_documents: list, chat_history: list[dict]):
+    """Resolves the slugs cited in `answer` to the retrieved documents, or to documents cited earlier in the history.
+
+    Returns (properties, page_contents, slugs) in citation order. The freshly retrieved copy of a document wins over
+    a historic one, and a recent turn over an older one.
+    """
+    slugs = extract_slugs(answer)
+    pending = set(slugs)
+    index = {}
+
+    def candidates():
+        for document in context_documents:
+            yield document.metadata, document.page_content
+
+        for chat in reversed(chat_history):
+            yield from zip(chat["source_documents"], chat["page_contents"])
+
+    # Only the cited slugs are indexed, and the walk stops once all of them are found
+    for metadata, page_content in candidates() if pending else ():
+        if metadata["slug"] in pending:
+            index[metadata["slug"]] = (metadata, page_content)
+            pending.discard(metadata["slug"])
+
+            if not pending:
+                break
+
+    cited = [(slug, index[slug]) for slug in slugs if slug in index]
+
+    return [metadata for _, (metadata, _) in cited], [page_content for _, (_, page_content) in cited], [slug for slug, _ in cited]
@@ -0,0 +1,24 @@
+from app.utils.tokens import count_tokens
+
+def count_turn_tokens(chat: dict, include_page_contents: bool = True) -> int:
+    tokens = count_tokens(chat["human"]) + count_tokens(chat["ai"])
+
+    return tokens + sum(count_tokens(page_content) for page_content in chat["page_contents"]) if include_page_contents else tokens
+
+# Keep the most recent turns (chat_history is oldest first) that fit in both limits. With context packing on, the
+# cited page contents get their own budget (CONTEXT_MAX_TOKENS) and shouldn't push whole turns out of this one.
+def trim_chat_history(chat_history: list[dict], max_turns: int, max_tokens: int, include_page_contents: bool = True) -> list[dict]:
+    window = []
+    total_tokens = 0
+
+    for chat in reversed(chat_history[-max_turns:] if max_turns > 0 else []):
+        total_tokens += count_turn_tokens(chat, include_page_contents=include_page_contents)
+
+        if total_tokens > max_tokens:
+            break
+
+        window.append(chat)
+
+    window.reverse()
+
+    return window
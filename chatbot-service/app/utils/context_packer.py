@@ -0,0 +1,133 @@
+from dataclasses import dataclass
+from app.utils.metrics import CONTEXT_DOCUMENTS, CONTEXT_TOKENS
+from app.utils.tokens import count_tokens, get_encoding
+
+def shorten(text: str, max_tokens: int) -> str:
+    """`text` cut to its first `max_tokens` tokens, with an ellipsis when something was cut."""
+    encoding = get_encoding()
+    tokens = encoding.encode(text, disallowed_special=())
+
+    if len(tokens) <= max_tokens:
+        return text
+
+    # A cut inside a multi-byte character decodes to U+FFFD
+    return encoding.decode(tokens[:max_tokens]).rstrip("�").rstrip() + "…"
+
+def format_price(price):
+    # Prices are stored as floats (see `coerce_property_metadata`)
+    return int(price) if isinstance(price, float) and price.is_integer() else price
+
+def to_packed_content(metadata: dict, page_content: str, detailed: bool, description_tokens: int, include_contact: bool) -> str:
+    """Compact property text rebuilt from the metadata, always ending with the "(Slug: x)" marker the answer cites.
+
+    `detailed` keeps the shortened description, the rental conditions and the attributes, otherwise only the title,
+    type, address and price are left. Documents without property metadata keep their page content.
+    """
+    slug = metadata.get("slug")
+
+    if not metadata.get("title"):
+        content = page_content if detailed else shorten(page_content, description_tokens)
+
+        return content if not slug or f"Slug: {slug}" in content else f"{content} (Slug: {slug})"
+
+    address = metadata.get("address") or {}
+    lines = [f"Tiêu đề: {metadata['title']}"]
+
+    if detailed and metadata.get("description") and description_tokens > 0:
+        lines.append(f"Mô tả: {shorten(' '.join(metadata['description'].split()), description_tokens)}")
+
+    if (metadata.get("type") or {}).get("name"):
+        lines.append(f"Loại nhà: {metadata['type']['name']}")
+
+    lines.append("Địa chỉ: " + ", ".join(str(address[part]) for part in ("street", "ward", "district", "city") if address.get(part)))
+
+    if include_contact and metadata.get("owner"):
+        owner = metadata["owner"]
+        lines.append("Chủ nhà: " + ", ".join(str(owner[field]) for field in ("name", "email", "phoneNumber") if owner.get(field)))
+
+    if detailed:
+        if metadata.get("rentalConditions"):
+            lines.append("; ".join(f"{condition['type']}: {condition['value']}" for condition in metadata["rentalConditions"]))
+
+        attributes = {}
+
+        for attr in metadata.get("attributes") or []:
+            attributes.setdefault(attr["type"], []).append(attr["name"])
+
+        lines.extend(f"{k}: {', '.join(v)}" for k, v in attributes.items())
+
+    lines.append(f"Giá: {format_price(metadata.get('price'))} (Slug: {slug})")
+
+    return "\n".join(lines)
+
+@dataclass
+class PackedDocument:
+    metadata: dict
+    page_content: str
+    content: str
+    tokens: int
+
+def pack_context(retrieved: list[tuple[dict, str]], history: list[tuple[dict, str]], max_tokens: int, description_tokens: int, include_contact: bool = False):
+    """Packs retrieved and historic properties, given as (metadata, page_content), into `max_tokens` tokens.
+
+    Retrieved properties come first in retrieval order, then historic ones, which should be passed most recent first.
+    A property seen before (same id, or slug) is skipped. The retrieved properties are packed first without
+    description, conditions and attributes, so detail never crowds out a slug, then their detailed versions replace
+    the short ones in order as long as they fit. The historic properties get what is left, the same way.
+
+    Returns the packed (metadata, content) of the retrieved properties and the packed contents of the historic ones.
+    """
+    seen = set()
+    remaining = max_tokens
+    packed = {True: [], False: []}
+
+    def render(metadata: dict, page_content: str, detailed: bool):
+        content = to_packed_content(metadata, page_content, detailed=detailed, description_tokens=description_tokens, include_contact=include_contact)
+
+        return content, count_tokens(content)
+
+    for is_retrieved, documents in ((True, retrieved), (False, history)):
+        tier = packed[is_retrieved]
+
+        for metadata, page_content in documents:
+            key = metadata.get("id") or metadata.get("slug") or page_content
+
+            if key in seen:
+                CONTEXT_DOCUMENTS.labels(outcome="duplicate").inc()
+                continue
+
+            seen.add(key)
+            content, tokens = render(metadata, page_content, detailed=False)
+
+            if tokens > remaining:
+                CONTEXT_DOCUMENTS.labels(outcome="dropped").inc()
+                continue
+
+            remaining -= tokens
+            tier.append(PackedDocument(metadata=metadata, page_content=page_content, content=content, tokens=tokens))
+
+        for document in tier:
+            content, tokens = render(document.metadata, document.page_content, detailed=True)
+
+            if tokens - document.tokens > remaining:
+                CONTEXT_DOCUMENTS.labels(outcome="shortened").inc()
+                continue
+
+            remaining -= tokens - document.tokens
+            document.content, document.tokens = content, tokens
+            CONTEXT_DOCUMENTS.labels(outcome="full").inc()
+
+    CONTEXT_TOKENS.observe(max_tokens - remaining)
+
+    return [(document.metadata, document.content) for document in packed[True]], [document.content for document in packed[False]]
+
+def format_history_context(summary: str, page_contents: list[str]) -> str:
+    context = '\n'
+
+    if summary:
+        context += f"Tóm tắt cuộc trò chuyện trước đó: {summary}\n"
+
+    for page_content in page_contents:
+        context += page_content + '\n'
+
+    return context
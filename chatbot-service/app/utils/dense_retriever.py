@@ -0,0 +1,27 @@
+from typing import Any
+from langchain.docstore.document import Document
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.retrievers import BaseRetriever
+from app.utils.metrics import stage
+
+class DenseQdrantRetriever(BaseRetriever):
+    """Dense-only retriever over a langchain `Qdrant` vector store, the same search as `vector_store.as_retriever()`.
+
+    The query is embedded first and the search timed on its own, so `qdrant_search` is reported on dense-only
+    collections as it is by `HybridQdrantRetriever`. Takes the same `search_kwargs` (`k`, `filter`, `search_params`).
+    """
+
+    vector_store: Any
+    search_kwargs: dict = {}
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> list[Document]:
+        dense_query = self.vector_store.embeddings.embed_query(query)
+
+        with stage("qdrant_search"):
+            return self.vector_store.similarity_search_by_vector(dense_query, **self.search_kwargs)
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun) -> list[Document]:
+        dense_query = await self.vector_store.embeddings.aembed_query(query)
+
+        with stage("qdrant_search"):
+            return await self.vector_store.asimilarity_search_by_vector(dense_query, **self.search_kwargs)
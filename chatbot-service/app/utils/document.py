@@ -1,4 +1,10 @@
 from langchain.docstore.document import Document
+from app.utils.query_parser import parse_number
+
+PROPERTY_FIELD_NAMES = [
+    "id", "title", "description", "latitude", "longitude", "address", "attributes",
+    "images", "rentalConditions", "price", "owner", "slug", "type"
+]
 
 def to_document(data, content, field_names):
     doc = Document(
@@ -9,4 +15,50 @@ def to_document(data, content, field_names):
     return doc
 
 def to_documents(data, content, field_names):
-    return [to_document(d, content, field_names) for d in data]
\ No newline at end of file
+    return [to_document(d, content, field_names) for d in data]
+
+def to_property_content(data):
+    conditions = "\n".join(f"{condition['type']}: {condition['value']}" for condition in data["rentalConditions"])
+    attributes = {}
+
+    for attr in data["attributes"]:
+        if attr["type"] not in attributes:
+            attributes[attr["type"]] = []
+
+        attributes[attr["type"]].append(attr["name"])
+
+    attribute_lines = "\n".join(f"{k}: {', '.join(v)}" for k, v in attributes.items())
+
+    return f"""Tiêu đề: {data['title']}\nMô tả: {data['description']}\nLoại nhà: {data['type']["name"]}\nĐịa chỉ: {data['address']["street"]}, {data['address']["ward"]}, {data['address']["district"]}, {data['address']["city"]}\nChủ nhà: {data['owner']['name']}\nEmail: {data['owner']['email']}\nSố điện thoại: {data['owner']['phoneNumber']}\n{conditions}\n{attribute_lines}\nGiá: {data['price']} (Slug: {data['slug']})"""
+
+def to_number(value):
+    if value is None or isinstance(value, (int, float)):
+        return value
+
+    try:
+        # Same separators as prices typed in queries, so stored prices and parsed ranges agree
+        return parse_number(str(value).strip())
+    except ValueError:
+        return None
+
+def to_keyword(value):
+    return str(value).strip() if value is not None else None
+
+# Matches the payload index types declared in `QdrantRepository.create_payload_indexes`
+def coerce_property_metadata(metadata):
+    metadata["id"] = to_keyword(metadata.get("id"))
+    metadata["price"] = to_number(metadata.get("price"))
+
+    if metadata.get("address"):
+        metadata["address"] = {**metadata["address"], "city": to_keyword(metadata["address"].get("city")), "district": to_keyword(metadata["address"].get("district"))}
+
+    if metadata.get("type"):
+        metadata["type"] = {**metadata["type"], "name": to_keyword(metadata["type"].get("name"))}
+
+    return metadata
+
+def to_property_document(data):
+    doc = to_document(data=data, content=to_property_content(data), field_names=PROPERTY_FIELD_NAMES)
+    coerce_property_metadata(doc.metadata)
+
+    return doc
@@ -1,19 +1,65 @@
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
+from app.core.config import settings
+from app.utils.embedding_cache import CachedEmbeddings
+from app.utils.lazy import lazy
 import os
 import dotenv
 
 dotenv.load_dotenv()
 
+def create_embeddings():
+    """Returns (embeddings client, model name, vector size) for the configured EMBEDDING_BACKEND."""
+    if settings.EMBEDDING_BACKEND == "local":
+        from app.utils.local_embedding import LocalEmbeddings
+
+        model = settings.LOCAL_EMBEDDING_MODEL
+        local_embeddings = LocalEmbeddings(
+            model_name=model,
+            batch_size=settings.LOCAL_EMBEDDING_BATCH_SIZE,
+            max_wait_ms=settings.LOCAL_EMBEDDING_MAX_WAIT_MS,
+            quantize=settings.LOCAL_EMBEDDING_QUANTIZE,
+            query_prefix=settings.LOCAL_EMBEDDING_QUERY_PREFIX,
+            document_prefix=settings.LOCAL_EMBEDDING_DOCUMENT_PREFIX
+        )
+
+        return local_embeddings, f"{model}{':int8' if settings.LOCAL_EMBEDDING_QUANTIZE else ''}", local_embeddings.dimension
+
+    if settings.EMBEDDING_BACKEND == "gemini":
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
+        model = os.getenv("EMBEDDING_MODEL", "models/embedding-001")
+        gemini_embeddings = GoogleGenerativeAIEmbeddings(
+            model=model,
+            google_api_key=os.getenv("GOOGLE_API_KEY")  # Replace with your actual API key
+        )
+
+        if settings.GATEWAY_ENABLED:
+            from app.utils.gateway_models import GatewayEmbeddings
+            from app.utils.llm_gateway import get_embedding_gateway
+
+            gemini_embeddings = GatewayEmbeddings(gemini_embeddings, gateway=get_embedding_gateway())
+
+        return gemini_embeddings, model, settings.GEMINI_EMBEDDING_SIZE
+
+    raise ValueError(f"Unknown EMBEDDING_BACKEND '{settings.EMBEDDING_BACKEND}', expected 'gemini' or 'local'")
+
+# Built on first use, so importing this module neither loads a local model nor creates a Gemini client
+get_embedding_backend = lazy(create_embeddings)
+
+def get_embedding_size() -> int:
+    return get_embedding_backend()[2]
+
+@lazy
+def get_embeddings() -> CachedEmbeddings:
+    # Shared by ingestion (`from_documents`) and the query side of the vector store in `RagService`
+    from app.core.bootstrap import get_embedding_cache
+
+    backend_embeddings, embedding_model, _ = get_embedding_backend()
+
+    return CachedEmbeddings(backend_embeddings, model=embedding_model, cache=get_embedding_cache())
+
 def from_document(doc):
     return from_documents([doc])[0]
 
 def from_documents(docs):
-    embeddingsModel = GoogleGenerativeAIEmbeddings(
-        model=os.getenv("EMBEDDING_MODEL", "models/embedding-001"),
-        google_api_key=os.getenv("GOOGLE_API_KEY")  # Replace with your actual API key
-    )
-
     # Generate embeddings
-    embeddings = embeddingsModel.embed_documents([doc.page_content for doc in docs])
-
-    return embeddings
\ No newline at end of file
+    return get_embeddings().embed_documents([doc.page_content for doc in docs])
@@ -0,0 +1,136 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from cachetools import LRUCache
+from langchain_core.embeddings import Embeddings
+from app.utils.executor import run_blocking
+from app.utils.metrics import stage
+
+def cache_key(model: str, text: str) -> str:
+    return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+class EmbeddingCache:
+    """Two-tier (in-memory LRU + SQLite) store of embeddings keyed by `cache_key`."""
+
+    def __init__(self, path: str = None, max_size: int = 10000):
+        self.memory = LRUCache(maxsize=max_size)
+        self.connection = None
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self.connection = sqlite3.connect(path, check_same_thread=False)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector TEXT NOT NULL)")
+            self.connection.commit()
+
+    def get_many(self, keys: list[str]) -> dict:
+        found = {}
+        missing = []
+
+        with self.lock:
+            for key in keys:
+                vector = self.memory.get(key)
+
+                if vector is None:
+                    missing.append(key)
+                else:
+                    found[key] = vector
+
+            if missing and self.connection is not None:
+                placeholders = ",".join("?" * len(missing))
+                rows = self.connection.execute(f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", missing).fetchall()
+
+                for key, vector in rows:
+                    found[key] = self.memory[key] = json.loads(vector)
+                    self.disk_hits += 1
+
+            self.hits += len(found)
+            self.misses += len(set(keys) - found.keys())
+
+        return found
+
+    def set_many(self, items: dict):
+        with self.lock:
+            self.memory.update(items)
+
+            if self.connection is not None:
+                self.connection.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                    [(key, json.dumps(vector)) for key, vector in items.items()]
+                )
+                self.connection.commit()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "memory_size": len(self.memory),
+        }
+
+class CachedEmbeddings(Embeddings):
+    """Wraps an `Embeddings` client so identical (model, text) pairs are only sent to the API once."""
+
+    def __init__(self, embeddings: Embeddings, model: str, cache: EmbeddingCache):
+        self.embeddings = embeddings
+        self.cache = cache
+        # Gemini embeds documents and queries with different task types, so they get separate keys
+        self.document_model = f"{model}:document"
+        self.query_model = f"{model}:query"
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        keys = [cache_key(self.document_model, text) for text in texts]
+        found = self.cache.get_many(keys)
+        missing = {key: text for key, text in zip(keys, texts) if key not in found}
+
+        if missing:
+            vectors = self.embeddings.embed_documents(list(missing.values()))
+            computed = dict(zip(missing.keys(), vectors))
+            self.cache.set_many(computed)
+            found.update(computed)
+
+        return [found[key] for key in keys]
+
+    def embed_query(self, text: str) -> list[float]:
+        key = cache_key(self.query_model, text)
+        found = self.cache.get_many([key])
+
+        if key not in found:
+            with stage("embed_query"):
+                found[key] = self.embeddings.embed_query(text)
+            self.cache.set_many({key: found[key]})
+
+        return found[key]
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        keys = [cache_key(self.document_model, text) for text in texts]
+        found = await run_blocking(self.cache.get_many, keys)
+        missing = {key: text for key, text in zip(keys, texts) if key not in found}
+
+        if missing:
+            vectors = await self.embeddings.aembed_documents(list(missing.values()))
+            computed = dict(zip(missing.keys(), vectors))
+            await run_blocking(self.cache.set_many, computed)
+            found.update(computed)
+
+        return [found[key] for key in keys]
+
+    async def aembed_query(self, text: str) -> list[float]:
+        key = cache_key(self.query_model, text)
+        found = await run_blocking(self.cache.get_many, [key])
+
+        if key not in found:
+            with stage("embed_query"):
+                found[key] = await self.embeddings.aembed_query(text)
+            await run_blocking(self.cache.set_many, {key: found[key]})
+
+        return found[key]
@@ -0,0 +1,14 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from app.core.config import settings
+
+executor = ThreadPoolExecutor(max_workers=settings.BLOCKING_POOL_SIZE, thread_name_prefix="blocking")
+
+def install_default_executor():
+    # LangChain runs sync fallbacks through `loop.run_in_executor(None, ...)`, so bound those too
+    asyncio.get_running_loop().set_default_executor(executor)
+
+async def run_blocking(func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, functools.partial(func, *args, **kwargs))
@@ -0,0 +1,63 @@
+from typing import Any, AsyncIterator, List, Optional
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from app.utils.llm_gateway import LLMGateway
+
+class GatewayChatModel(BaseChatModel):
+    """Chat model that sends the calls of `llm` through `gateway`.
+
+    Identical concurrent prompts share one call. Streams are rate limited but not shared, since every caller needs its
+    own tokens.
+    """
+
+    llm: BaseChatModel
+    gateway: Any
+
+    @property
+    def _llm_type(self) -> str:
+        return self.llm._llm_type
+
+    @property
+    def _identifying_params(self) -> dict:
+        return self.llm._identifying_params
+
+    def _key(self, messages: List[BaseMessage], stop: Optional[List[str]], kwargs: dict):
+        return repr(([(message.type, message.content) for message in messages], stop, sorted(kwargs.items())))
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs) -> ChatResult:
+        return self.gateway.call_sync(lambda: self.llm._generate(messages, stop=stop, **kwargs))
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Optional[AsyncCallbackManagerForLLMRun] = None, **kwargs) -> ChatResult:
+        return await self.gateway.call(self._key(messages, stop, kwargs), lambda: self.llm._agenerate(messages, stop=stop, **kwargs))
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Optional[AsyncCallbackManagerForLLMRun] = None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        await self.gateway.acquire()
+
+        try:
+            # The outer `astream` reports each chunk to the callbacks, so the inner model gets no run manager
+            async for chunk in self.llm._astream(messages, stop=stop, **kwargs):
+                yield chunk
+        finally:
+            self.gateway.release()
+
+class GatewayEmbeddings(Embeddings):
+    """Embeddings whose calls to `embeddings` go through `gateway`, identical concurrent async calls share one."""
+
+    def __init__(self, embeddings: Embeddings, gateway: LLMGateway):
+        self.embeddings = embeddings
+        self.gateway = gateway
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self.gateway.call_sync(lambda: self.embeddings.embed_documents(texts))
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.gateway.call_sync(lambda: self.embeddings.embed_query(text))
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        return await self.gateway.call(("documents", tuple(texts)), lambda: self.embeddings.aembed_documents(texts))
+
+    async def aembed_query(self, text: str) -> list[float]:
+        return await self.gateway.call(("query", text), lambda: self.embeddings.aembed_query(text))
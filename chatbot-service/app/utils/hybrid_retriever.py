@@ -0,0 +1,55 @@
+from typing import Any
+from langchain.docstore.document import Document
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.retrievers import BaseRetriever
+from app.utils.metrics import stage
+from app.utils.sparse import to_sparse_query
+
+class HybridQdrantRetriever(BaseRetriever):
+    """Dense + sparse retriever over a collection with `SPARSE_VECTOR_NAME` vectors, fused with RRF in one Qdrant query.
+
+    Takes the same `search_kwargs` (`k`, `filter`, `search_params`) as `Qdrant.as_retriever`, so it can be swapped into the chain.
+    """
+
+    qdrant_repo: Any
+    collection_name: str
+    embeddings: Any
+    search_kwargs: dict = {}
+    # Candidates taken from each of the dense and sparse searches before fusion
+    prefetch_k: int = 20
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> list[Document]:
+        dense_query = self.embeddings.embed_query(query)
+
+        with stage("qdrant_search"):
+            points = self.qdrant_repo.hybrid_search(
+                collection_name=self.collection_name,
+                dense_query=dense_query,
+                sparse_query=to_sparse_query(query),
+                query_filter=self.search_kwargs.get("filter"),
+                top_k=self.search_kwargs.get("k", 4),
+                prefetch_k=self.prefetch_k,
+                search_params=self.search_kwargs.get("search_params")
+            )
+
+        return [self._to_document(point) for point in points]
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun) -> list[Document]:
+        dense_query = await self.embeddings.aembed_query(query)
+
+        with stage("qdrant_search"):
+            points = await self.qdrant_repo.ahybrid_search(
+                collection_name=self.collection_name,
+                dense_query=dense_query,
+                sparse_query=to_sparse_query(query),
+                query_filter=self.search_kwargs.get("filter"),
+                top_k=self.search_kwargs.get("k", 4),
+                prefetch_k=self.prefetch_k,
+                search_params=self.search_kwargs.get("search_params")
+            )
+
+        return [self._to_document(point) for point in points]
+
+    def _to_document(self, point) -> Document:
+        # Same payload layout as the langchain `Qdrant` vector store
+        return Document(page_content=point.payload["page_content"], metadata=point.payload["metadata"])
@@ -0,0 +1,25 @@
+import functools
+import threading
+
+_UNSET = object()
+
+def lazy(factory):
+    """Turns a zero-argument factory into a getter that builds its value on first call and returns it afterwards.
+
+    Safe to call from several threads at once (as the startup warm-up does): the factory runs exactly once.
+    """
+    value = _UNSET
+    lock = threading.Lock()
+
+    @functools.wraps(factory)
+    def get():
+        nonlocal value
+
+        if value is _UNSET:
+            with lock:
+                if value is _UNSET:
+                    value = factory()
+
+        return value
+
+    return get
@@ -0,0 +1,254 @@
+import asyncio
+import logging
+import random
+import time
+from typing import Awaitable, Callable, Hashable, TypeVar
+from app.core.config import settings
+from app.utils.lazy import lazy
+from app.utils.metrics import GATEWAY_EVENTS, GATEWAY_RATE
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# HTTP statuses and google.api_core exception names worth retrying, 429 / ResourceExhausted also slow the gateway down
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+THROTTLED_ERRORS = {"ResourceExhausted", "TooManyRequests"}
+RETRYABLE_ERRORS = THROTTLED_ERRORS | {"ServiceUnavailable", "InternalServerError", "DeadlineExceeded", "BadGateway", "GatewayTimeout"}
+
+class GatewayOverloaded(Exception):
+    """A call was shed: the gateway's wait queue was full, or the call waited longer than `queue_timeout`."""
+
+def _status_code(error: Exception):
+    code = getattr(error, "code", None)
+
+    return code if isinstance(code, int) else getattr(error, "status_code", None)
+
+def is_throttled(error: Exception) -> bool:
+    return _status_code(error) == 429 or type(error).__name__ in THROTTLED_ERRORS
+
+def is_retryable(error: Exception) -> bool:
+    return (
+        _status_code(error) in RETRYABLE_STATUS_CODES
+        or type(error).__name__ in RETRYABLE_ERRORS
+        or isinstance(error, (asyncio.TimeoutError, ConnectionError))
+    )
+
+class TokenBucket:
+    """Allows `rate` calls per second on average and bursts of up to `burst` calls. Used from one event loop."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def take(self):
+        while True:
+            self._refill()
+
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+class LLMGateway:
+    """Front for a rate-limited backend (Gemini chat or embeddings), shared by every caller in the process.
+
+    - Identical concurrent calls (same `key`) share one backend call (single flight).
+    - Calls start at most at `rate` per second and `max_concurrency` at a time. The rate halves on each 429 and
+      climbs back by a tenth of `rate` per success.
+    - Failed calls that are worth retrying are retried up to `max_retries` times with jittered exponential backoff.
+    - At most `max_queue` calls wait for a slot, each for at most `queue_timeout` seconds. Beyond that, calls fail
+      fast with `GatewayOverloaded` instead of piling up behind the rate limit.
+    """
+
+    def __init__(self, name: str, rate: float, burst: int, max_concurrency: int, max_queue: int, queue_timeout: float,
+                 max_retries: int = 3, backoff_base: float = 0.5, backoff_max: float = 8.0):
+        self.name = name
+        self.max_rate = rate
+        self.min_rate = rate / 16
+        self.bucket = TokenBucket(rate=rate, burst=burst)
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._loop = None
+        GATEWAY_RATE.labels(gateway=name).set(rate)
+
+    def bind(self, loop: asyncio.AbstractEventLoop = None):
+        """Attaches the gateway to `loop` (the running one by default), which also admits calls from worker threads."""
+        loop = loop or asyncio.get_running_loop()
+
+        if loop is not self._loop:
+            # asyncio primitives belong to one loop, so they are made per loop
+            self._loop = loop
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+            self._waiting = 0
+            self._in_flight = {}
+
+    async def call(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        """Returns `await func()`, or the result of the identical call (same `key`) already in flight."""
+        self.bind()
+
+        if key in self._in_flight:
+            GATEWAY_EVENTS.labels(gateway=self.name, event="coalesced").inc()
+            # Shielded, so one caller going away doesn't cancel the call for the others
+            return await asyncio.shield(self._in_flight[key])
+
+        future = asyncio.ensure_future(self._call_with_retries(func))
+        self._in_flight[key] = future
+        future.add_done_callback(lambda _: self._forget(key, future))
+
+        return await asyncio.shield(future)
+
+    def _forget(self, key: Hashable, future: asyncio.Future):
+        self._in_flight.pop(key, None)
+
+        # Marks the error as retrieved when every caller has already gone away
+        if not future.cancelled():
+            future.exception()
+
+    def call_sync(self, func: Callable[[], T]) -> T:
+        """Blocking `func()` from a worker thread, admitted through the bound loop. Not coalesced.
+
+        Without a running bound loop to coordinate with (scripts), or on the loop's own thread, it is only retried.
+        """
+        loop = self._loop
+
+        try:
+            on_loop = asyncio.get_running_loop() is loop
+        except RuntimeError:
+            on_loop = False
+
+        admitted = loop is not None and loop.is_running() and not on_loop
+
+        for attempt in range(self.max_retries + 1):
+            if admitted:
+                asyncio.run_coroutine_threadsafe(self.acquire(), loop).result()
+
+            try:
+                result = func()
+            except Exception as e:
+                if not self._should_retry(e, attempt):
+                    raise
+            else:
+                self._on_success()
+                return result
+            finally:
+                if admitted:
+                    loop.call_soon_threadsafe(self.release)
+
+            time.sleep(self._backoff(attempt))
+
+    async def _call_with_retries(self, func: Callable[[], Awaitable[T]]) -> T:
+        for attempt in range(self.max_retries + 1):
+            await self.acquire()
+
+            try:
+                result = await func()
+            except Exception as e:
+                if not self._should_retry(e, attempt):
+                    raise
+            else:
+                self._on_success()
+                return result
+            finally:
+                self.release()
+
+            await asyncio.sleep(self._backoff(attempt))
+
+    async def acquire(self):
+        """Waits for a call slot and a rate token, or raises `GatewayOverloaded`. Pair with `release`."""
+        self.bind()
+
+        if self._waiting >= self.max_queue:
+            GATEWAY_EVENTS.labels(gateway=self.name, event="shed").inc()
+            raise GatewayOverloaded(f"{self.name} gateway queue is full ({self.max_queue} waiting)")
+
+        self._waiting += 1
+
+        try:
+            await asyncio.wait_for(self._take_slot(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            GATEWAY_EVENTS.labels(gateway=self.name, event="shed").inc()
+            raise GatewayOverloaded(f"{self.name} gateway: no slot within {self.queue_timeout:g} s")
+        finally:
+            self._waiting -= 1
+
+        GATEWAY_EVENTS.labels(gateway=self.name, event="called").inc()
+
+    async def _take_slot(self):
+        await self._slots.acquire()
+
+        try:
+            await self.bucket.take()
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self):
+        self._slots.release()
+
+    def _should_retry(self, error: Exception, attempt: int) -> bool:
+        if is_throttled(error):
+            GATEWAY_EVENTS.labels(gateway=self.name, event="throttled").inc()
+            self._set_rate(self.bucket.rate / 2)
+
+        if attempt >= self.max_retries or not is_retryable(error):
+            return False
+
+        GATEWAY_EVENTS.labels(gateway=self.name, event="retried").inc()
+        logger.warning("%s gateway: retrying after %r (attempt %d of %d)", self.name, error, attempt + 1, self.max_retries)
+
+        return True
+
+    def _on_success(self):
+        if self.bucket.rate < self.max_rate:
+            self._set_rate(self.bucket.rate + self.max_rate / 10)
+
+    def _set_rate(self, rate: float):
+        self.bucket.rate = min(max(rate, self.min_rate), self.max_rate)
+        GATEWAY_RATE.labels(gateway=self.name).set(self.bucket.rate)
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter, so callers throttled together don't come back together
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+@lazy
+def get_llm_gateway() -> LLMGateway:
+    return LLMGateway(
+        name="llm",
+        rate=settings.LLM_RATE_LIMIT,
+        burst=settings.LLM_MAX_CONCURRENCY,
+        max_concurrency=settings.LLM_MAX_CONCURRENCY,
+        max_queue=settings.GATEWAY_MAX_QUEUE,
+        queue_timeout=settings.GATEWAY_QUEUE_TIMEOUT_SECONDS,
+        max_retries=settings.GATEWAY_MAX_RETRIES
+    )
+
+@lazy
+def get_embedding_gateway() -> LLMGateway:
+    return LLMGateway(
+        name="embedding",
+        rate=settings.EMBEDDING_RATE_LIMIT,
+        burst=settings.EMBEDDING_MAX_CONCURRENCY,
+        max_concurrency=settings.EMBEDDING_MAX_CONCURRENCY,
+        max_queue=settings.GATEWAY_MAX_QUEUE,
+        queue_timeout=settings.GATEWAY_QUEUE_TIMEOUT_SECONDS,
+        max_retries=settings.GATEWAY_MAX_RETRIES
+    )
+
+def bind_gateways():
+    """Binds the gateways to the running loop, so calls from worker threads (ingestion) are admitted through them too."""
+    if settings.GATEWAY_ENABLED:
+        get_llm_gateway().bind()
+        get_embedding_gateway().bind()
@@ -0,0 +1,90 @@
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from langchain_core.embeddings import Embeddings
+
+class LocalEmbeddings(Embeddings):
+    """sentence-transformers model loaded once and run on CPU by a single worker thread.
+
+    Concurrent callers enqueue their texts; the worker groups whatever arrives within `max_wait_ms`
+    (up to `batch_size` texts) into one `encode` call, which is much cheaper per text than encoding alone.
+    """
+
+    def __init__(self, model_name: str, batch_size: int = 32, max_wait_ms: int = 5, quantize: bool = False, device: str = "cpu", query_prefix: str = "", document_prefix: str = ""):
+        # Heavy imports, only paid when the local backend is selected
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(model_name, device=device)
+
+        if quantize:
+            # Dynamic int8 quantization of the Linear layers, smaller and faster on CPU for a small accuracy cost
+            self.model = torch.quantization.quantize_dynamic(self.model, {torch.nn.Linear}, dtype=torch.qint8)
+
+        self.dimension = self.model.get_sentence_embedding_dimension()
+        self.batch_size = batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.query_prefix = query_prefix
+        self.document_prefix = document_prefix
+        self.requests = queue.Queue()
+        self.worker = threading.Thread(target=self._run, name="local-embeddings", daemon=True)
+        self.worker.start()
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self._submit([self.document_prefix + text for text in texts]).result()
+
+    def embed_query(self, text: str) -> list[float]:
+        return self._submit([self.query_prefix + text]).result()[0]
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        return await asyncio.wrap_future(self._submit([self.document_prefix + text for text in texts]))
+
+    async def aembed_query(self, text: str) -> list[float]:
+        return (await asyncio.wrap_future(self._submit([self.query_prefix + text])))[0]
+
+    def encode(self, texts: list[str], batch_size: int = None) -> list[list[float]]:
+        return self.model.encode(texts, batch_size=batch_size or self.batch_size, normalize_embeddings=True, convert_to_numpy=True).tolist()
+
+    def _submit(self, texts: list[str]) -> Future:
+        future = Future()
+
+        if not texts:
+            future.set_result([])
+        else:
+            self.requests.put((texts, future))
+
+        return future
+
+    def _run(self):
+        while True:
+            pending = [self.requests.get()]
+            count = len(pending[0][0])
+            deadline = time.monotonic() + self.max_wait
+
+            while count < self.batch_size:
+                remaining = deadline - time.monotonic()
+
+                if remaining <= 0:
+                    break
+
+                try:
+                    pending.append(self.requests.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+                count += len(pending[-1][0])
+
+            try:
+                vectors = self.encode([text for texts, _ in pending for text in texts])
+            except Exception as e:
+                for _, future in pending:
+                    future.set_exception(e)
+                continue
+
+            offset = 0
+
+            for texts, future in pending:
+                future.set_result(vectors[offset:offset + len(texts)])
+                offset += len(texts)
@@ -0,0 +1,122 @@
+import contextvars
+import logging
+import time
+import uuid
+from contextlib import contextmanager
+from langchain_core.callbacks import BaseCallbackHandler
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Gauge, Histogram, generate_latest
+from app.core.config import settings
+from app.utils.tokens import count_tokens
+
+logger = logging.getLogger(__name__)
+
+# Set per request so stage timings in the logs can be grouped by request
+trace_id_var = contextvars.ContextVar("trace_id", default=None)
+
+STAGE_SECONDS = Histogram(
+    "chatbot_stage_seconds", "Time spent in each stage of the chat and ingestion pipelines", ["stage"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+LLM_TOKENS = Counter("chatbot_llm_tokens_total", "LLM tokens by call and kind (prompt or completion)", ["call", "kind"])
+RETRIEVED_DOCUMENTS = Histogram("chatbot_retrieved_documents", "Documents returned per retrieval", buckets=(0, 1, 2, 3, 5, 10, 20))
+RETRIEVAL_FILTER_FALLBACKS = Counter("chatbot_retrieval_filter_fallbacks_total", "Searches that found nothing under the full query filter and were retried with only price and location")
+INGESTION_QUEUE_LAG_SECONDS = Histogram(
+    "chatbot_ingestion_queue_lag_seconds", "Time between publishing a property event and consuming it",
+    buckets=(0.1, 0.5, 1, 5, 10, 30, 60, 300, 900)
+)
+INGESTION_UNTIMED_MESSAGES = Counter("chatbot_ingestion_untimed_messages_total", "Property events consumed without an AMQP timestamp, left out of the queue lag")
+CONTEXTUALIZE_DECISIONS = Counter("chatbot_contextualize_decisions_total", "Queries with history sent to the rewriting LLM call or searched as is", ["decision"])
+CONTEXTUALIZE_SAVED_SECONDS = Counter("chatbot_contextualize_saved_seconds_total", "Estimated LLM time saved by skipped rewrites, at the mean rewrite latency")
+INGESTION_BATCH_SIZE = Histogram("chatbot_ingestion_batch_size", "Messages per ingestion batch", buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256))
+GATEWAY_EVENTS = Counter(
+    "chatbot_gateway_events_total", "Gemini gateway calls by outcome (called, coalesced, retried, throttled, shed)", ["gateway", "event"]
+)
+CONTEXT_TOKENS = Histogram("chatbot_context_tokens", "Property context tokens per answer after packing", buckets=(100, 250, 500, 1000, 2000, 4000, 8000))
+CONTEXT_DOCUMENTS = Counter("chatbot_context_documents_total", "Properties offered to the context packer by outcome (full, shortened, duplicate, dropped)", ["outcome"])
+GATEWAY_RATE = Gauge("chatbot_gateway_rate_per_second", "Current adaptive request rate of each Gemini gateway", ["gateway"])
+
+def new_trace_id(trace_id: str = None) -> str:
+    trace_id = trace_id or uuid.uuid4().hex
+    trace_id_var.set(trace_id)
+
+    return trace_id
+
+def observe_stage(name: str, seconds: float):
+    STAGE_SECONDS.labels(stage=name).observe(seconds)
+
+    if settings.TRACE_LOGGING:
+        logger.info("trace_id=%s stage=%s duration_ms=%.1f", trace_id_var.get(), name, seconds * 1000)
+
+@contextmanager
+def stage(name: str):
+    start = time.perf_counter()
+
+    try:
+        yield
+    finally:
+        observe_stage(name, time.perf_counter() - start)
+
+def mean_stage_seconds(name: str) -> float:
+    count = REGISTRY.get_sample_value("chatbot_stage_seconds_count", {"stage": name})
+
+    return REGISTRY.get_sample_value("chatbot_stage_seconds_sum", {"stage": name}) / count if count else 0.0
+
+def metrics_response_body():
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """Times LLM calls and retrievals inside the LangChain chains and counts their tokens and documents.
+
+    LLM calls are told apart by the tag the chain gives them (see `LLM_STAGE_TAGS`).
+    """
+
+    # Called on the event loop directly, it only does bookkeeping
+    run_inline = True
+
+    def __init__(self):
+        self.runs = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, tags=None, **kwargs):
+        call = next((tag for tag in tags or [] if tag in LLM_STAGE_TAGS), "llm")
+        prompt_tokens = sum(count_tokens(message.content) for batch in messages for message in batch if isinstance(message.content, str))
+        self.runs[run_id] = (call, time.perf_counter(), prompt_tokens)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        if run_id not in self.runs:
+            return
+
+        call, start, prompt_tokens = self.runs.pop(run_id)
+        observe_stage(call, time.perf_counter() - start)
+
+        generation = response.generations[0][0] if response.generations and response.generations[0] else None
+        usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+
+        # Gemini doesn't always report usage, fall back to the local estimate
+        if usage:
+            prompt_tokens, completion_tokens = usage["input_tokens"], usage["output_tokens"]
+        else:
+            completion_tokens = count_tokens(generation.text) if generation else 0
+
+        LLM_TOKENS.labels(call=call, kind="prompt").inc(prompt_tokens)
+        LLM_TOKENS.labels(call=call, kind="completion").inc(completion_tokens)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self.runs.pop(run_id, None)
+
+    def on_retriever_start(self, serialized, query, *, run_id, **kwargs):
+        self.runs[run_id] = ("retrieve", time.perf_counter(), 0)
+
+    def on_retriever_end(self, documents, *, run_id, **kwargs):
+        if run_id not in self.runs:
+            return
+
+        _, start, _ = self.runs.pop(run_id)
+        observe_stage("retrieve", time.perf_counter() - start)
+        RETRIEVED_DOCUMENTS.observe(len(documents))
+
+    def on_retriever_error(self, error, *, run_id, **kwargs):
+        self.runs.pop(run_id, None)
+
+LLM_STAGE_TAGS = ("contextualize_question", "answer", "summarize")
+
+metrics_callback_handler = MetricsCallbackHandler()
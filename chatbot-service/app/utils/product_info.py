@@ -1,3 +1,7 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
 def document_to_product_info(product):
     attributes_dict = {
         'Amenity': [],
@@ -27,7 +31,7 @@ def document_to_product_info(product):
     })
 
 def format_product_infos(product_infos):
-    print(product_infos)
+    logger.debug("Formatting %d product infos", len(product_infos))
 
     return "\n\n".join([
             f"**Tiêu đề:** {p['title']}\n"
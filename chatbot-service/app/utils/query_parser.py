@@ -0,0 +1,209 @@
+import re
+import unicodedata
+from dataclasses import dataclass, field
+from qdrant_client.http import models as qdrant_models
+
+# Spoken phrase -> values stored in the property payload. Keys are lowercase and may hold several spellings.
+CITIES = {
+    "hồ chí minh|tp hcm|tp.hcm|tphcm|hcm|sài gòn|saigon": ["Hồ Chí Minh"],
+    "hà nội": ["Hà Nội"],
+    "đà nẵng": ["Đà Nẵng"],
+    "cần thơ": ["Cần Thơ"],
+    "hải phòng": ["Hải Phòng"],
+}
+
+DISTRICTS = {
+    "bình thạnh": ["Bình Thạnh"],
+    "gò vấp": ["Gò Vấp"],
+    "tân bình": ["Tân Bình"],
+    "tân phú": ["Tân Phú"],
+    "phú nhuận": ["Phú Nhuận"],
+    "bình tân": ["Bình Tân"],
+    "thủ đức": ["Thủ Đức", "Thành phố Thủ Đức"],
+    "nhà bè": ["Nhà Bè"],
+    "hóc môn": ["Hóc Môn"],
+    "bình chánh": ["Bình Chánh"],
+    "củ chi": ["Củ Chi"],
+    "cần giờ": ["Cần Giờ"],
+    "ba đình": ["Ba Đình"],
+    "hoàn kiếm": ["Hoàn Kiếm"],
+    "cầu giấy": ["Cầu Giấy"],
+    "đống đa": ["Đống Đa"],
+    "hai bà trưng": ["Hai Bà Trưng"],
+    "tây hồ": ["Tây Hồ"],
+    "thanh xuân": ["Thanh Xuân"],
+    "hải châu": ["Hải Châu"],
+    "sơn trà": ["Sơn Trà"],
+}
+
+PROPERTY_TYPES = {
+    "căn hộ dịch vụ": ["Căn hộ dịch vụ"],
+    "căn hộ|chung cư": ["Căn hộ", "Chung cư", "Căn hộ chung cư"],
+    "phòng trọ|nhà trọ": ["Phòng trọ"],
+    "nhà nguyên căn|nhà riêng": ["Nhà nguyên căn", "Nhà riêng"],
+    "nhà phố": ["Nhà phố"],
+    "biệt thự": ["Biệt thự"],
+    "văn phòng": ["Văn phòng"],
+    "mặt bằng": ["Mặt bằng"],
+}
+
+AMENITIES = {
+    "máy lạnh|điều hòa|điều hoà": ["Máy lạnh", "Điều hòa"],
+    "wifi|internet": ["Wifi", "Internet"],
+    "thang máy": ["Thang máy"],
+    "hồ bơi|bể bơi": ["Hồ bơi", "Bể bơi"],
+    "chỗ để xe|bãi đỗ xe|bãi xe|giữ xe|hầm xe": ["Chỗ để xe", "Bãi đỗ xe"],
+    "máy giặt": ["Máy giặt"],
+    "tủ lạnh": ["Tủ lạnh"],
+    "ban công": ["Ban công"],
+    "gym|phòng tập": ["Phòng gym", "Gym"],
+    "bảo vệ|an ninh": ["Bảo vệ", "An ninh 24/7"],
+}
+
+# Relative tolerance for "khoảng"/"tầm" prices
+APPROX_PRICE_TOLERANCE = 0.2
+
+UNITS = {"tỷ": 1_000_000_000, "tỉ": 1_000_000_000, "triệu": 1_000_000, "tr": 1_000_000, "củ": 1_000_000, "k": 1_000, "nghìn": 1_000, "ngàn": 1_000, "đồng": 1, "đ": 1, "vnđ": 1, "vnd": 1}
+
+FILTER_FIELDS = ("price", "location", "type", "bedrooms", "amenities")
+# Parsed from numbers and place names, which match the payload reliably, unlike the labels of the other fields
+RELAXED_FILTER_FIELDS = ("price", "location")
+
+def _alternation(table):
+    # Longest phrases first so "căn hộ dịch vụ" wins over "căn hộ"
+    phrases = sorted((phrase for key in table for phrase in key.split("|")), key=len, reverse=True)
+    return "|".join(re.escape(phrase) for phrase in phrases)
+
+def _lookup(table):
+    return {phrase: values for key, values in table.items() for phrase in key.split("|")}
+
+_NUMBER = r"\d{1,3}(?:[.,]\d{3})+(?!\d)|\d+(?:[.,]\d+)?"
+_UNIT = "|".join(sorted((re.escape(unit) for unit in UNITS), key=len, reverse=True))
+# Numbers followed by an area, room or distance unit are not prices
+_NOT_PRICE = r"(?!\s*(?:m2|m²|mét|phòng|pn|người|km|phút))"
+
+def _amount(name):
+    return rf"(?P<{name}>{_NUMBER})\s*(?P<{name}_unit>{_UNIT})?\b{_NOT_PRICE}"
+
+# One compiled alternation, scanned once per query. Order matters: ranges before their open-ended prefixes.
+QUERY_PATTERN = re.compile(
+    "|".join([
+        rf"(?:từ\s+)?{_amount('range_from')}\s*(?:đến|tới|-|~)\s*{_amount('range_to')}",
+        rf"(?:dưới|nhỏ hơn|thấp hơn|bé hơn|không quá|tối đa|max)\s+{_amount('max')}",
+        rf"(?:trên|lớn hơn|cao hơn|từ|tối thiểu|min)\s+{_amount('min')}",
+        rf"(?:khoảng|tầm|cỡ|chừng|giá)\s+{_amount('approx')}",
+        r"(?P<bedrooms>\d+)\s*(?:phòng ngủ|pn)\b",
+        r"\b(?:quận|q\.?)\s*(?P<district_number>\d{1,2})\b",
+        rf"\b(?P<district>{_alternation(DISTRICTS)})\b",
+        rf"\b(?P<city>{_alternation(CITIES)})\b",
+        rf"\b(?P<type>{_alternation(PROPERTY_TYPES)})\b",
+        rf"\b(?P<amenity>{_alternation(AMENITIES)})\b",
+    ]),
+    re.IGNORECASE
+)
+
+_DISTRICTS = _lookup(DISTRICTS)
+_CITIES = _lookup(CITIES)
+_PROPERTY_TYPES = _lookup(PROPERTY_TYPES)
+_AMENITIES = _lookup(AMENITIES)
+
+@dataclass
+class ParsedQuery:
+    min_price: float = None
+    max_price: float = None
+    cities: list[str] = field(default_factory=list)
+    districts: list[str] = field(default_factory=list)
+    types: list[str] = field(default_factory=list)
+    bedrooms: int = None
+    amenities: list[list[str]] = field(default_factory=list)
+
+    def to_filter(self, fields=FILTER_FIELDS) -> qdrant_models.Filter:
+        must = []
+
+        if "price" in fields and (self.min_price is not None or self.max_price is not None):
+            must.append(qdrant_models.FieldCondition(key="metadata.price", range=qdrant_models.Range(gte=self.min_price, lte=self.max_price)))
+
+        if "location" in fields and self.cities:
+            must.append(qdrant_models.FieldCondition(key="metadata.address.city", match=qdrant_models.MatchAny(any=self.cities)))
+
+        if "location" in fields and self.districts:
+            must.append(qdrant_models.FieldCondition(key="metadata.address.district", match=qdrant_models.MatchAny(any=self.districts)))
+
+        if "type" in fields and self.types:
+            must.append(qdrant_models.FieldCondition(key="metadata.type.name", match=qdrant_models.MatchAny(any=self.types)))
+
+        if "bedrooms" in fields and self.bedrooms is not None:
+            must.append(qdrant_models.NestedCondition(nested=qdrant_models.Nested(
+                key="metadata.rentalConditions",
+                filter=qdrant_models.Filter(must=[
+                    qdrant_models.FieldCondition(key="type", match=qdrant_models.MatchValue(value="Phòng ngủ")),
+                    qdrant_models.FieldCondition(key="value", match=qdrant_models.MatchValue(value=str(self.bedrooms))),
+                ])
+            )))
+
+        if "amenities" in fields:
+            for names in self.amenities:
+                must.append(qdrant_models.FieldCondition(key="metadata.attributes[].name", match=qdrant_models.MatchAny(any=names)))
+
+        return qdrant_models.Filter(must=must)
+
+def parse_number(number: str) -> float:
+    """"13.000.000" and "13,000,000" are thousands-separated, "13,5" and "13.5" are decimals. Raises ValueError otherwise."""
+    if re.fullmatch(r"\d{1,3}(?:[.,]\d{3})+", number):
+        return float(re.sub(r"[.,]", "", number))
+
+    return float(number.replace(",", "."))
+
+def parse_amount(number: str, unit: str = None) -> float:
+    value = parse_number(number)
+
+    if unit:
+        return value * UNITS[unit.lower()]
+
+    # Rents are quoted in millions, a bare "dưới 10" means 10 triệu
+    return value * 1_000_000 if value < 1000 else value
+
+def _add(values: list, new_values: list):
+    for value in new_values:
+        if value not in values:
+            values.append(value)
+
+def parse_query(query: str) -> ParsedQuery:
+    parsed = ParsedQuery()
+    # Composed form, so "quận" typed with combining marks still matches
+    text = unicodedata.normalize("NFC", query).lower()
+
+    for match in QUERY_PATTERN.finditer(text):
+        group = match.lastgroup
+        groups = match.groupdict()
+
+        if groups["range_from"]:
+            # "từ 5 đến 10 triệu": the unit of the upper bound applies to both
+            unit = groups["range_to_unit"]
+            parsed.min_price = parse_amount(groups["range_from"], groups["range_from_unit"] or unit)
+            parsed.max_price = parse_amount(groups["range_to"], unit)
+        elif groups["max"]:
+            parsed.max_price = parse_amount(groups["max"], groups["max_unit"])
+        elif groups["min"]:
+            parsed.min_price = parse_amount(groups["min"], groups["min_unit"])
+        elif groups["approx"]:
+            price = parse_amount(groups["approx"], groups["approx_unit"])
+            parsed.min_price = price * (1 - APPROX_PRICE_TOLERANCE)
+            parsed.max_price = price * (1 + APPROX_PRICE_TOLERANCE)
+        elif groups["bedrooms"]:
+            parsed.bedrooms = int(groups["bedrooms"])
+        elif groups["district_number"]:
+            _add(parsed.districts, [f"Quận {int(groups['district_number'])}"])
+        elif group == "district":
+            _add(parsed.districts, _DISTRICTS[groups["district"]])
+        elif group == "city":
+            _add(parsed.cities, _CITIES[groups["city"]])
+        elif group == "type":
+            _add(parsed.types, _PROPERTY_TYPES[groups["type"]])
+        elif group == "amenity":
+            names = _AMENITIES[groups["amenity"]]
+
+            if names not in parsed.amenities:
+                parsed.amenities.append(names)
+
+    return parsed
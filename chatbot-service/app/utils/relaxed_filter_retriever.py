@@ -0,0 +1,49 @@
+import logging
+from typing import Optional
+from langchain.docstore.document import Document
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.retrievers import BaseRetriever
+from app.utils.metrics import RETRIEVAL_FILTER_FALLBACKS
+
+logger = logging.getLogger(__name__)
+
+class RelaxedFilterRetriever(BaseRetriever):
+    """Searches with `search_kwargs`, and again with `relaxed_search_kwargs` when that finds nothing.
+
+    Type, bedroom and amenity labels come from hand-written tables, and one that doesn't match the payload must not
+    empty the retrieval, so the relaxed search only keeps the price and location conditions. `retriever` is any
+    retriever taking `search_kwargs` (`DenseQdrantRetriever`, `HybridQdrantRetriever`); it runs inside this retriever's
+    run, so a search is traced and timed once even when it is retried.
+    """
+
+    retriever: BaseRetriever
+    search_kwargs: dict = {}
+    relaxed_search_kwargs: Optional[dict] = None
+
+    def _with_search_kwargs(self, search_kwargs: dict) -> BaseRetriever:
+        return self.retriever.copy(update={"search_kwargs": search_kwargs})
+
+    def _should_relax(self, documents: list[Document]) -> bool:
+        if documents or self.relaxed_search_kwargs is None:
+            return False
+
+        RETRIEVAL_FILTER_FALLBACKS.inc()
+        logger.info("No hits under the full query filter, retrying with price and location only")
+
+        return True
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> list[Document]:
+        documents = self._with_search_kwargs(self.search_kwargs)._get_relevant_documents(query, run_manager=run_manager)
+
+        if self._should_relax(documents):
+            documents = self._with_search_kwargs(self.relaxed_search_kwargs)._get_relevant_documents(query, run_manager=run_manager)
+
+        return documents
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun) -> list[Document]:
+        documents = await self._with_search_kwargs(self.search_kwargs)._aget_relevant_documents(query, run_manager=run_manager)
+
+        if self._should_relax(documents):
+            documents = await self._with_search_kwargs(self.relaxed_search_kwargs)._aget_relevant_documents(query, run_manager=run_manager)
+
+        return documents
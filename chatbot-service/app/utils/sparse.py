@@ -0,0 +1,45 @@
+import hashlib
+import re
+import unicodedata
+from collections import Counter
+from qdrant_client.http import models
+
+# BM25 term-frequency saturation; IDF is applied by Qdrant (`Modifier.IDF` on the sparse vector)
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Rough token count of a property content string, stands in for the corpus average length
+BM25_AVG_DOC_LENGTH = 256
+
+def strip_diacritics(text: str) -> str:
+    text = unicodedata.normalize("NFD", text.replace("đ", "d").replace("Đ", "D"))
+    return "".join(char for char in text if unicodedata.category(char) != "Mn")
+
+def tokenize(text: str) -> list[str]:
+    """Vietnamese-aware lexical tokens: syllables plus syllable bigrams (most Vietnamese words and names span two
+    syllables, e.g. "thảo điền"), each also without diacritics so "Thao Dien" matches "Thảo Điền"."""
+    syllables = re.findall(r"\w+", unicodedata.normalize("NFC", text).lower())
+    tokens = syllables + [f"{first} {second}" for first, second in zip(syllables, syllables[1:])]
+
+    return tokens + [stripped for stripped in map(strip_diacritics, tokens) if stripped not in tokens]
+
+def token_index(token: str) -> int:
+    return int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=4).digest(), "little") & 0x7FFFFFFF
+
+def _to_sparse_vector(weights: dict) -> models.SparseVector:
+    merged = Counter()
+
+    # Hash collisions are merged rather than sent as duplicate indices
+    for token, weight in weights.items():
+        merged[token_index(token)] += weight
+
+    return models.SparseVector(indices=list(merged.keys()), values=list(merged.values()))
+
+def to_sparse_document(text: str) -> models.SparseVector:
+    counts = Counter(tokenize(text))
+    length = sum(counts.values())
+    norm = BM25_K1 * (1 - BM25_B + BM25_B * length / BM25_AVG_DOC_LENGTH)
+
+    return _to_sparse_vector({token: count * (BM25_K1 + 1) / (count + norm) for token, count in counts.items()})
+
+def to_sparse_query(text: str) -> models.SparseVector:
+    return _to_sparse_vector({token: 1.0 for token in set(tokenize(text))})
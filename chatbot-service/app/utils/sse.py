@@ -0,0 +1,4 @@
+import json
+
+def to_server_sent_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
@@ -0,0 +1,46 @@
+import re
+import unicodedata
+from app.utils.query_parser import parse_query
+
+# Pronouns, demonstratives and ordinals pointing at something said earlier ("căn đó", "cái thứ hai", "nó")
+REFERENCE_PATTERN = re.compile(
+    r"\b(?:căn|cái|chỗ|nhà|phòng|căn hộ|chung cư|bất động sản|tin|bài)\s+"
+    r"(?:đó|đấy|này|kia|ấy|trên|vừa rồi|vừa nãy|lúc nãy|hồi nãy|bạn vừa|bạn gửi|bạn nói|thứ\s+\w+|số\s+\d+|đầu tiên|cuối cùng)\b"
+    r"|\b(?:nó|chúng nó|ở đó|ở đấy|đó|đấy|kia|như trên|ở trên|phía trên|vừa rồi|vừa nãy|lúc nãy|hồi nãy)\b"
+    r"|\b(?:mấy|những|các|hai|ba|\d+)\s+(?:căn|cái|chỗ)\b(?!\s+(?:hộ|nhà))"
+    r"|\b(?:so sánh|căn nào|cái nào|chỗ nào)\b",
+    re.IGNORECASE
+)
+
+# Messages that only make sense as a continuation of the previous turn ("còn quận 7 thì sao?", "rẻ hơn nữa")
+CONTINUATION_PATTERN = re.compile(
+    r"^\W*(?:còn|vậy|thế|thì|và|với|nhưng|hay là|hoặc|ok|oke|được|rồi|thêm)\b"
+    r"|\b(?:thì sao|thế nào rồi|nữa)\W*$"
+    r"|\bhơn\W*$",
+    re.IGNORECASE
+)
+
+# What is being asked about: a kind of property or a general topic of the service. "chủ nhà" names the owner, not a property.
+SUBJECT_PATTERN = re.compile(
+    r"(?<!chủ )\b(?:nhà|phòng|căn hộ|chung cư|biệt thự|văn phòng|mặt bằng|bất động sản)\b"
+    r"|\b(?:hợp đồng thông minh|blockchain|tiền điện tử|smartrent|ví điện tử|quy trình thuê|thuê nhà)\b",
+    re.IGNORECASE
+)
+
+def is_standalone_query(query: str) -> bool:
+    """Whether `query` can be searched without the chat history.
+
+    Only returns True on positive evidence (a subject and no reference to earlier turns), so anything unclear,
+    including queries typed without diacritics, is left to the contextualize LLM call.
+    """
+    text = unicodedata.normalize("NFC", query).lower().strip()
+
+    if REFERENCE_PATTERN.search(text) or CONTINUATION_PATTERN.search(text):
+        return False
+
+    if SUBJECT_PATTERN.search(text):
+        return True
+
+    parsed = parse_query(text)
+
+    return bool(parsed.cities or parsed.districts or parsed.types)
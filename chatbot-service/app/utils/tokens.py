@@ -0,0 +1,10 @@
+import functools
+import tiktoken
+
+@functools.lru_cache(maxsize=1)
+def get_encoding():
+    # Gemini does not ship a local tokenizer, cl100k_base is close enough for budgeting
+    return tiktoken.get_encoding("cl100k_base")
+
+def count_tokens(text: str) -> int:
+    return len(get_encoding().encode(text, disallowed_special=()))
@@ -0,0 +1,55 @@
+"""Hit rate and latency saved by the semantic answer cache on a workload of repeated first-turn questions.
+
+Uses the stubbed LLM (fixed latency) and in-memory Qdrant. The fake embeddings are hash-based, so only
+normalized duplicates (case, punctuation, spacing) hit here; near-duplicate hits need a real embedding model.
+
+Run from `chatbot-service`: python -m benchmarks.answer_cache
+"""
+import asyncio
+import random
+import time
+from benchmarks.stubs import COLLECTION_NAME, fake_embeddings, make_llm, make_qdrant_repo
+from app.services.answer_cache_service import SemanticAnswerCache
+from app.services.rag_service import RagService
+from app.utils.executor import install_default_executor
+
+REQUESTS = 300
+LLM_LATENCY = 0.1
+QUERIES = [
+    "căn hộ quận 1 dưới 10 triệu",
+    "Căn hộ quận 1 dưới 10 triệu?",
+    "phòng trọ gần đại học bách khoa",
+    "Phòng trọ gần Đại học Bách Khoa!",
+    "nhà nguyên căn thủ đức từ 5 đến 10 triệu",
+    "căn hộ 2 phòng ngủ quận 7 có hồ bơi",
+    "chung cư bình thạnh khoảng 12 triệu",
+    "CĂN HỘ QUẬN 1   DƯỚI 10 TRIỆU",
+]
+
+async def run_workload(rag_service: RagService, queries):
+    start = time.perf_counter()
+    for query in queries:
+        await rag_service.agenerate_response(collection_name=COLLECTION_NAME, query=query, chat_history=[])
+    return time.perf_counter() - start
+
+async def run():
+    install_default_executor()
+    random.seed(0)
+    # Popular questions dominate, like real traffic
+    queries = random.choices(QUERIES, weights=[8, 4, 6, 3, 3, 2, 2, 1], k=REQUESTS)
+    qdrant_repo = make_qdrant_repo()
+
+    uncached = RagService(qdrant_repo=qdrant_repo, collection_names=[COLLECTION_NAME], llm=make_llm(latency=LLM_LATENCY), embeddings=fake_embeddings)
+    uncached_s = await run_workload(uncached, queries)
+
+    answer_cache = SemanticAnswerCache(max_size=1000, ttl=600, similarity_threshold=0.95)
+    cached = RagService(qdrant_repo=qdrant_repo, collection_names=[COLLECTION_NAME], llm=make_llm(latency=LLM_LATENCY), embeddings=fake_embeddings, answer_cache=answer_cache)
+    cached_s = await run_workload(cached, queries)
+
+    print(f"{REQUESTS} first-turn requests, stub LLM latency {LLM_LATENCY * 1000:.0f} ms per call")
+    print(f"Without cache: {uncached_s:.2f} s ({uncached_s / REQUESTS * 1000:.1f} ms per request)")
+    print(f"With cache: {cached_s:.2f} s ({cached_s / REQUESTS * 1000:.1f} ms per request)")
+    print(f"Cache stats: {answer_cache.stats()}")
+
+if __name__ == "__main__":
+    asyncio.run(run())
@@ -0,0 +1,73 @@
+"""Requests per second on a trivial endpoint: no auth, the old BaseHTTPMiddleware JWT check, and the pure ASGI
+middleware. Requests go in-process through httpx's ASGI transport.
+
+Run from `chatbot-service`: python -m benchmarks.auth_middleware
+"""
+import os
+
+os.environ.setdefault("JWT_ACCESS_SECRET", "benchmark-secret")
+
+import asyncio
+import time
+import httpx
+import jwt
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse
+from starlette.middleware.base import BaseHTTPMiddleware
+from app.middlewares.auth_middleware import JWTMiddleware
+from app.utils.jwt import verify_token
+
+REQUESTS = 3000
+CONCURRENCY = 50
+
+class BaseHTTPJWTMiddleware(BaseHTTPMiddleware):
+    # The previous implementation, kept here for comparison
+    async def dispatch(self, request: Request, call_next):
+        token = request.headers.get("Authorization")
+
+        if not token:
+            return JSONResponse(status_code=401, content={"detail": "Authorization header missing"})
+
+        try:
+            request.state.user = verify_token(token.replace("Bearer ", ""))
+        except HTTPException as e:
+            return JSONResponse(status_code=e.status_code, content={"detail": e.detail})
+
+        return await call_next(request)
+
+def make_app(middleware=None, **options):
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping(request: Request):
+        return {"user": getattr(request.state, "user", {}).get("id")}
+
+    if middleware:
+        app.add_middleware(middleware, **options)
+
+    return app
+
+async def measure(label, app, token):
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://benchmark") as client:
+        async def one_request():
+            async with semaphore:
+                response = await client.get("/ping", headers={"Authorization": f"Bearer {token}"})
+                assert response.status_code == 200, response.text
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one_request() for _ in range(REQUESTS)))
+        elapsed = time.perf_counter() - start
+
+    print(f"{label:<40} {REQUESTS / elapsed:8.0f} req/s")
+
+async def run():
+    token = jwt.encode({"id": "benchmark-user", "exp": int(time.time()) + 3600}, os.environ["JWT_ACCESS_SECRET"], algorithm="HS256")
+
+    await measure("No auth middleware", make_app(), token)
+    await measure("BaseHTTPMiddleware (before)", make_app(BaseHTTPJWTMiddleware), token)
+    await measure("Pure ASGI middleware", make_app(JWTMiddleware), token)
+
+if __name__ == "__main__":
+    asyncio.run(run())
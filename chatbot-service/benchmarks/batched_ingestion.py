@@ -0,0 +1,52 @@
+"""Ingestion throughput of property events: one message at a time vs. the batching consumer.
+
+Uses a local broker stand-in (`FakeBroker`), fake embeddings with a fixed per-call latency and an
+in-memory Qdrant collection.
+
+Run from `chatbot-service`: python -m benchmarks.batched_ingestion
+"""
+import asyncio
+import time
+from benchmarks.stubs import COLLECTION_NAME, FakeBroker, SlowFakeEmbeddings, make_property_event, make_qdrant_repo
+from app.core.config import settings
+from app.services.property_ingestion_service import PropertyIngestionService
+from app.services.rabbitmq_service import consume_in_batches
+
+MESSAGES = 500
+EMBEDDING_LATENCY = 0.05
+
+def make_service():
+    embeddings = SlowFakeEmbeddings(size=768, latency=EMBEDDING_LATENCY)
+
+    return PropertyIngestionService(
+        qdrant_repo=make_qdrant_repo(documents=0),
+        collection_name=COLLECTION_NAME,
+        embed_documents=lambda docs: embeddings.embed_documents([doc.page_content for doc in docs])
+    )
+
+async def run_consumer(batch_size: int):
+    service = make_service()
+    broker = FakeBroker()
+
+    for i in range(MESSAGES):
+        broker.deliver(make_property_event(i))
+    broker.stop()
+
+    async def callback(messages):
+        await asyncio.to_thread(service.handle_batch, messages)
+
+    start = time.perf_counter()
+    await consume_in_batches(broker.messages, callback=callback, batch_size=batch_size, batch_timeout=settings.INGESTION_BATCH_TIMEOUT_MS / 1000)
+    elapsed = time.perf_counter() - start
+
+    points = service.qdrant_repo.client.count(collection_name=COLLECTION_NAME).count
+    print(f"batch_size={batch_size:>3}: {MESSAGES / elapsed:8.1f} msg/s, {elapsed:.2f} s, acked {broker.acked}/{MESSAGES}, {points} points")
+
+async def run():
+    print(f"{MESSAGES} PROPERTY_UPDATED events, stub embedding latency {EMBEDDING_LATENCY * 1000:.0f} ms per call")
+
+    for batch_size in (1, 16, settings.INGESTION_BATCH_SIZE):
+        await run_consumer(batch_size)
+
+if __name__ == "__main__":
+    asyncio.run(run())
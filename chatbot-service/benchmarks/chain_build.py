@@ -0,0 +1,100 @@
+"""Per-request latency of building the conversational RAG chain and then invoking it (what `generate_response` used
+to do) vs. invoking the chain `RagService` builds once per collection, with a stubbed LLM and in-memory Qdrant.
+
+Both paths search with the same filter and history and report to the same callbacks, so what differs is the
+construction. Runs alternate between the two and the medians are compared.
+
+Run from `chatbot-service`: python -m benchmarks.chain_build
+"""
+import statistics
+import time
+from benchmarks.stubs import COLLECTION_NAME, fake_embeddings, make_chat_history, make_llm, make_qdrant_repo
+from app.services.rag_service import RagService, contextualize_q_prompt, qa_system_prompt
+from langchain.chains import create_history_aware_retriever, create_retrieval_chain
+from langchain.chains.combine_documents import create_stuff_documents_chain
+from langchain_community.chat_message_histories import ChatMessageHistory
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.runnables.history import RunnableWithMessageHistory
+
+ROUNDS = 10
+REQUESTS_PER_ROUND = 10
+QUERY = "Căn hộ dưới 10 triệu"
+
+def build_chain_per_request(rag_service: RagService, chat_history: list[dict], search_kwargs: dict):
+    # Mirrors what `generate_response` used to construct on every call
+    retriever = rag_service.vector_stores[COLLECTION_NAME].as_retriever(search_kwargs=search_kwargs)
+    history_aware_retriever = create_history_aware_retriever(rag_service.llm, retriever, contextualize_q_prompt)
+
+    context = '\n' + ''.join(page_content + '\n' for chat in chat_history for page_content in chat['page_contents'])
+    qa_prompt = ChatPromptTemplate.from_messages(
+        [
+            ("system", qa_system_prompt + context),
+            MessagesPlaceholder("chat_history"),
+            ("human", "{input}"),
+        ]
+    )
+
+    question_answer_chain = create_stuff_documents_chain(rag_service.llm, qa_prompt)
+    rag_chain = create_retrieval_chain(history_aware_retriever, question_answer_chain)
+    chat_history_item = ChatMessageHistory()
+
+    for chat in chat_history:
+        chat_history_item.add_message({"role": "human", "content": chat['human']})
+        chat_history_item.add_message({"role": "ai", "content": chat['ai']})
+
+    return RunnableWithMessageHistory(
+        rag_chain,
+        lambda session_id: chat_history_item,
+        input_messages_key="input",
+        history_messages_key="chat_history",
+        output_messages_key="answer",
+    )
+
+def construct_then_invoke(rag_service: RagService, chat_history: list[dict]):
+    _, config = rag_service._prepare_run(query=QUERY, chat_history=chat_history)
+    chain = build_chain_per_request(rag_service, chat_history, config["configurable"]["search_kwargs"])
+
+    chain.invoke({"input": QUERY}, config={"configurable": {"session_id": "1"}, "callbacks": config["callbacks"]})
+
+def prebuilt(rag_service: RagService, chat_history: list[dict]):
+    rag_service.generate_response(collection_name=COLLECTION_NAME, query=QUERY, chat_history=chat_history)
+
+def measure(request, rag_service: RagService, chat_history: list[dict]) -> list[float]:
+    latencies = []
+
+    for _ in range(REQUESTS_PER_ROUND):
+        start = time.perf_counter()
+        request(rag_service, chat_history)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    return latencies
+
+def run():
+    rag_service = RagService(qdrant_repo=make_qdrant_repo(), collection_names=[COLLECTION_NAME], llm=make_llm(), embeddings=fake_embeddings)
+    chat_history = make_chat_history(turns=5)
+    paths = {"construct then invoke (before)": construct_then_invoke, "prebuilt chain (after)": prebuilt}
+    latencies = {name: [] for name in paths}
+
+    for round in range(ROUNDS + 1):
+        for name, request in paths.items():
+            measured = measure(request, rag_service, chat_history)
+
+            # The first round warms up imports and caches
+            if round:
+                latencies[name].extend(measured)
+
+    _, config = rag_service._prepare_run(query=QUERY, chat_history=chat_history)
+    start = time.perf_counter()
+    for _ in range(ROUNDS * REQUESTS_PER_ROUND):
+        build_chain_per_request(rag_service, chat_history, config["configurable"]["search_kwargs"])
+    build_ms = (time.perf_counter() - start) * 1000 / (ROUNDS * REQUESTS_PER_ROUND)
+
+    print(f"{ROUNDS * REQUESTS_PER_ROUND} requests per path, 5 turns of history, stubbed LLM/Qdrant")
+
+    for name in paths:
+        print(f"{name:>30}: {statistics.median(latencies[name]):6.1f} ms median per request")
+
+    print(f"{'of which construction':>30}: {build_ms:6.1f} ms")
+
+if __name__ == "__main__":
+    run()
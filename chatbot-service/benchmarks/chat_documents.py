@@ -0,0 +1,97 @@
+"""Storage size and history read latency of chat records with inline document copies vs. document references.
+
+Writes chats that cite listings from a shared pool (popular listings are cited over and over, as in production),
+measures, runs the `migrate_chat_documents` migration and measures again, with a cold and a warm document cache.
+
+Needs a MongoDB at MONGO_URL. Data goes to the `chatbot_benchmark` database, which is dropped afterwards.
+
+Run from `chatbot-service`: python -m benchmarks.chat_documents
+"""
+import os
+
+os.environ["DATABASE_NAME"] = "chatbot_benchmark"
+
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta
+from pymongo import MongoClient
+from benchmarks.stubs import make_property
+from app.core.config import settings
+from app.scripts.migrate_chat_documents import collection_size, migrate
+from app.services import chat_document_service
+from app.services.chat_document_service import resolve_documents
+from app.services.chat_service import CHAT_HISTORY_PROJECTION, client, collection, create_indexes, get_chats_by_user_id
+
+USERS = 50
+CHATS_PER_USER = 60
+PROPERTY_POOL = 300
+ITERATIONS = 5
+
+def make_document(i: int):
+    property = {**make_property(i), "description": "Mô tả căn hộ " * 80, "images": [f"https://example.com/{i}-{k}.jpg" for k in range(8)]}
+    page_content = f"Tiêu đề: {property['title']}\nMô tả: {property['description']}\nGiá: {property['price']} (Slug: {property['slug']})"
+
+    return property, page_content
+
+def make_chats():
+    random.seed(0)
+    documents = [make_document(i) for i in range(PROPERTY_POOL)]
+    chats = []
+
+    for user in range(USERS):
+        for i in range(CHATS_PER_USER):
+            now = datetime.now() - timedelta(minutes=CHATS_PER_USER - i)
+            # Skewed towards the first listings of the pool
+            cited = {int(random.paretovariate(1.2)) % PROPERTY_POOL for _ in range(3)}
+            chats.append({
+                "user_id": f"user-{user}",
+                "request": f"Tìm căn hộ quận {i % 12 + 1} dưới {i % 20 + 5} triệu",
+                "response": f"Bạn có thể tham khảo căn hộ {i}",
+                "source_documents": [documents[j][0] for j in cited],
+                "page_contents": [documents[j][1] for j in cited],
+                "created_at": now,
+                "updated_at": now,
+            })
+
+    return chats
+
+async def measure(label: str, iterations: int = ITERATIONS):
+    start = time.perf_counter()
+    moved = 0
+
+    for _ in range(iterations):
+        for user in range(USERS):
+            chats = await get_chats_by_user_id(user_id=f"user-{user}", top_k=settings.CHAT_HISTORY_MAX_TURNS, projection=CHAT_HISTORY_PROJECTION)
+            await resolve_documents(chats)
+            moved += sum(len(page_content) for chat in chats for page_content in chat["page_contents"])
+
+    loads = iterations * USERS
+    print(f"{label}: {(time.perf_counter() - start) * 1000 / loads:.2f} ms per history load ({moved / loads / 1000:.1f} kB of page content)")
+
+def print_sizes(db, label: str):
+    chat, documents = collection_size(db, "chat"), collection_size(db, "chat_documents")
+    print(f"{label}: chat {chat / 1e6:.2f} MB, chat_documents {documents / 1e6:.2f} MB, total {(chat + documents) / 1e6:.2f} MB")
+
+async def run():
+    sync_db = MongoClient(settings.MONGO_URL)[settings.DATABASE_NAME]
+
+    await client.drop_database(settings.DATABASE_NAME)
+    await collection.insert_many(make_chats())
+    await create_indexes()
+
+    print(f"{USERS * CHATS_PER_USER} chats, {USERS} users, {PROPERTY_POOL} listings in the cited pool")
+    print_sizes(sync_db, "Inline copies")
+    await measure("Inline copies")
+
+    migrate(sync_db)
+    print_sizes(sync_db, "References")
+
+    chat_document_service._cache.clear()
+    await measure("References, cold cache", iterations=1)
+    await measure("References, warm cache")
+
+    await client.drop_database(settings.DATABASE_NAME)
+
+if __name__ == "__main__":
+    asyncio.run(run())
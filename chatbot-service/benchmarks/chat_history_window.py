@@ -0,0 +1,75 @@
+"""History load time for a user with thousands of stored chats: full history vs. the bounded window.
+
+Needs a MongoDB at MONGO_URL. Data goes to the `chatbot_benchmark` database, which is dropped afterwards.
+
+Run from `chatbot-service`: python -m benchmarks.chat_history_window
+"""
+import os
+
+os.environ["DATABASE_NAME"] = "chatbot_benchmark"
+
+import asyncio
+import time
+from datetime import datetime, timedelta
+from benchmarks.stubs import make_property
+from app.core.config import settings
+from app.services.chat_service import CHAT_HISTORY_PROJECTION, client, collection, create_indexes, get_chats_by_user_id
+from app.utils.chat_history import trim_chat_history
+from app.utils.tokens import count_tokens
+
+USER_ID = "benchmark-user"
+CHATS = 3000
+ITERATIONS = 20
+
+def make_chat(i: int):
+    now = datetime.now() - timedelta(minutes=CHATS - i)
+    properties = [{**make_property(i * 3 + j), "description": "Mô tả căn hộ " * 80, "images": [f"https://example.com/{i}-{j}-{k}.jpg" for k in range(8)]} for j in range(3)]
+
+    return {
+        "user_id": USER_ID,
+        "request": f"Tìm căn hộ quận {i % 12 + 1} dưới {i % 20 + 5} triệu",
+        "response": f"Bạn có thể tham khảo căn hộ {i} (Slug: property-{i * 3})",
+        "source_documents": properties,
+        "page_contents": [f"Tiêu đề: {p['title']}\nMô tả: {p['description']}\nGiá: {p['price']} (Slug: {p['slug']})" for p in properties],
+        "created_at": now,
+        "updated_at": now,
+    }
+
+def to_history(chats):
+    return [{"human": c["request"], "ai": c["response"], "source_documents": c["source_documents"], "page_contents": c["page_contents"]} for c in reversed(chats)]
+
+async def measure(label, load):
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        chat_history = await load()
+    elapsed_ms = (time.perf_counter() - start) * 1000 / ITERATIONS
+    prompt_tokens = sum(count_tokens(c["human"]) + count_tokens(c["ai"]) + sum(count_tokens(p) for p in c["page_contents"]) for c in chat_history)
+
+    print(f"{label}: {elapsed_ms:.1f} ms per load, {len(chat_history)} turns, ~{prompt_tokens} history tokens")
+
+async def run():
+    await client.drop_database(settings.DATABASE_NAME)
+    await collection.insert_many([make_chat(i) for i in range(CHATS)])
+
+    async def load_full():
+        return to_history(await get_chats_by_user_id(user_id=USER_ID))
+
+    async def load_window():
+        chats = await get_chats_by_user_id(user_id=USER_ID, top_k=settings.CHAT_HISTORY_MAX_TURNS, projection=CHAT_HISTORY_PROJECTION)
+        return trim_chat_history(
+            to_history(chats), max_turns=settings.CHAT_HISTORY_MAX_TURNS, max_tokens=settings.CHAT_HISTORY_MAX_TOKENS,
+            include_page_contents=not settings.CONTEXT_PACKING_ENABLED
+        )
+
+    await measure("Full history, no index", load_full)
+    await measure("Bounded window, no index", load_window)
+
+    await create_indexes()
+
+    await measure("Full history, (user_id, updated_at) index", load_full)
+    await measure("Bounded window, (user_id, updated_at) index", load_window)
+
+    await client.drop_database(settings.DATABASE_NAME)
+
+if __name__ == "__main__":
+    asyncio.run(run())
@@ -0,0 +1,68 @@
+"""Cold start of an API worker and of an ingestion process, each measured in a fresh interpreter.
+
+- import: `import app.api.main` alone, which no longer builds anything or touches the network
+- sequential: import, then the services built one after the other, which is what importing used to do
+- parallel: import, then the lifespan's concurrent `warm_up`
+- consumer: `import app.consumer`, which leaves out the chains, the chat client and scikit-learn
+
+Needs Qdrant at QDRANT_URL and QDRANT_PROPERTY_COLLECTION set, like the API itself. No MongoDB or RabbitMQ.
+
+Run from `chatbot-service`: python -m benchmarks.cold_start
+"""
+import asyncio
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+RUNS = 3
+SCENARIOS = ("import", "sequential", "parallel", "consumer")
+
+def measure_scenario(scenario: str) -> dict:
+    # Runs in the child interpreter, so every import and every lazy service starts cold
+    start = time.perf_counter()
+
+    if scenario == "consumer":
+        import app.consumer
+        return {"total": time.perf_counter() - start}
+
+    import app.api.main
+    from app.core.bootstrap import get_intent_classifier, get_property_ingestion_service, get_rag_service, warm_up
+
+    timings = {"import": time.perf_counter() - start}
+    services = (get_rag_service, get_intent_classifier, get_property_ingestion_service)
+
+    if scenario == "sequential":
+        for service in services:
+            service_start = time.perf_counter()
+            service()
+            timings[service.__name__] = time.perf_counter() - service_start
+
+    if scenario == "parallel":
+        asyncio.run(warm_up(*services))
+
+    timings["total"] = time.perf_counter() - start
+
+    return timings
+
+def run_scenario(scenario: str) -> dict:
+    output = subprocess.run([sys.executable, "-m", "benchmarks.cold_start", scenario], capture_output=True, text=True, check=True).stdout
+
+    return json.loads(output.strip().splitlines()[-1])
+
+def run():
+    print(f"Median of {RUNS} fresh processes per scenario")
+
+    for scenario in SCENARIOS:
+        runs = [run_scenario(scenario) for _ in range(RUNS)]
+        timings = {name: statistics.median(run[name] for run in runs) * 1000 for name in runs[0]}
+        details = ", ".join(f"{name} {ms:.0f} ms" for name, ms in timings.items() if name != "total")
+
+        print(f"{scenario:>10}: {timings['total']:7.0f} ms" + (f" ({details})" if details else ""))
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        print(json.dumps(measure_scenario(sys.argv[1])))
+    else:
+        run()
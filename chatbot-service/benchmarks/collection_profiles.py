@@ -0,0 +1,137 @@
+"""Memory, search latency and recall@k of each Qdrant collection profile on a synthetic clustered corpus.
+
+Recall is measured against exact (brute-force) cosine search. RAM is estimated from the profile: float32
+originals unless they are on disk, the quantized copy, and the HNSW links.
+
+Uses the Qdrant server at QDRANT_BENCHMARK_URL if set, otherwise Qdrant local mode. Local mode accepts the
+profiles but always searches the float32 vectors exhaustively, so latency and recall only differ between profiles on a
+server. The "emulated" column estimates what quantization alone does to recall: it takes the top k * oversampling
+candidates by quantized score and rescores them with the originals, as Qdrant does.
+
+Run from `chatbot-service`: python -m benchmarks.collection_profiles
+"""
+import os
+import time
+import numpy as np
+from qdrant_client import QdrantClient
+from qdrant_client.http import models
+from app.repositories.qdrant_repository import QdrantRepository, get_collection_profile
+
+VECTOR_SIZE = 768
+POINTS = 20_000
+CLUSTERS = 200
+QUERIES = 200
+TOP_K = 5
+UPLOAD_BATCH = 1000
+
+PROFILES = [
+    ("default", {}),
+    ("default", {"hnsw_m": 32, "hnsw_ef_construct": 200, "hnsw_ef": 128}),
+    ("scalar", {}),
+    ("binary", {}),
+    ("binary", {"oversampling": 1.0}),
+]
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def make_corpus(rng):
+    # Listings cluster by area, type and price, so do their embeddings
+    centers = rng.standard_normal((CLUSTERS, VECTOR_SIZE)).astype(np.float32)
+    corpus = normalize(centers[rng.integers(CLUSTERS, size=POINTS)] + 0.6 * rng.standard_normal((POINTS, VECTOR_SIZE)).astype(np.float32))
+    queries = normalize(centers[rng.integers(CLUSTERS, size=QUERIES)] + 0.6 * rng.standard_normal((QUERIES, VECTOR_SIZE)).astype(np.float32))
+
+    return corpus, queries
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    candidates = np.argpartition(-scores, k - 1)[:k]
+    return candidates[np.argsort(-scores[candidates])]
+
+def estimate_ram(profile) -> float:
+    originals = 0 if profile.on_disk else POINTS * VECTOR_SIZE * 4
+    quantized = {"scalar": POINTS * VECTOR_SIZE, "binary": POINTS * VECTOR_SIZE / 8}.get(profile.quantization, 0)
+    # Layer 0 of the graph holds up to 2 * m links of 4 bytes per point
+    links = POINTS * 2 * (profile.hnsw_m or 16) * 4
+
+    return (originals + quantized + links) / 1e6
+
+def emulate_quantized_recall(profile, corpus, queries, truth) -> float:
+    if profile.quantization is None:
+        return None
+
+    if profile.quantization == "scalar":
+        # int8 over the 0.99 quantile range, as the profile's ScalarQuantizationConfig
+        low, high = np.quantile(corpus, [0.005, 0.995])
+        quantized = np.round((np.clip(corpus, low, high) - low) / (high - low) * 255).astype(np.float32)
+        approximate = queries @ quantized.T
+    else:
+        # One bit per dimension, scored by the number of matching signs
+        approximate = np.sign(queries) @ np.sign(corpus).T
+
+    candidates = int(TOP_K * (profile.oversampling or 1.0))
+    hits = 0
+
+    for query, scores, expected in zip(queries, approximate, truth):
+        shortlist = top_k(scores, candidates)
+        rescored = shortlist[top_k(corpus[shortlist] @ query, TOP_K)]
+        hits += len(set(rescored) & set(expected))
+
+    return hits / (QUERIES * TOP_K)
+
+def wait_until_indexed(qdrant_repo: QdrantRepository, collection_name: str):
+    while qdrant_repo.client.get_collection(collection_name=collection_name).status != "green":
+        time.sleep(0.5)
+
+def measure(qdrant_repo: QdrantRepository, name: str, overrides: dict, corpus, queries, truth):
+    profile = get_collection_profile(name, **overrides)
+    collection_name = f"benchmark-profile-{name}-{len(overrides)}"
+
+    if qdrant_repo.client.collection_exists(collection_name):
+        qdrant_repo.delete_collection(collection_name)
+
+    qdrant_repo.create_collection(collection_name=collection_name, vector_size=VECTOR_SIZE, profile=profile)
+
+    for i in range(0, POINTS, UPLOAD_BATCH):
+        qdrant_repo.client.upsert(
+            collection_name=collection_name,
+            points=models.Batch(ids=list(range(i, i + UPLOAD_BATCH)), vectors=corpus[i:i + UPLOAD_BATCH].tolist()),
+            wait=True
+        )
+
+    wait_until_indexed(qdrant_repo, collection_name)
+
+    latencies, hits = [], 0
+
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        points = qdrant_repo.client.query_points(collection_name=collection_name, query=query.tolist(), limit=TOP_K, search_params=profile.search_params()).points
+        latencies.append(time.perf_counter() - start)
+        hits += len({point.id for point in points} & set(expected.tolist()))
+
+    emulated = emulate_quantized_recall(profile, corpus, queries, truth)
+    label = name + "".join(f", {key}={value}" for key, value in overrides.items())
+
+    print(
+        f"{label:<52} RAM ~{estimate_ram(profile):6.1f} MB, "
+        f"p50 {np.percentile(latencies, 50) * 1000:6.2f} ms, p99 {np.percentile(latencies, 99) * 1000:6.2f} ms, "
+        f"recall@{TOP_K} {hits / (QUERIES * TOP_K):.3f}"
+        + (f", emulated quantized recall@{TOP_K} {emulated:.3f}" if emulated is not None else "")
+    )
+
+    qdrant_repo.delete_collection(collection_name)
+
+def run():
+    rng = np.random.default_rng(0)
+    corpus, queries = make_corpus(rng)
+    truth = [top_k(scores, TOP_K) for scores in queries @ corpus.T]
+
+    url = os.getenv("QDRANT_BENCHMARK_URL")
+    qdrant_repo = QdrantRepository(client=QdrantClient(url=url) if url else QdrantClient(location=":memory:"))
+
+    print(f"{POINTS} points x {VECTOR_SIZE} dims, {QUERIES} queries, Qdrant {url or 'local mode'}")
+
+    for name, overrides in PROFILES:
+        measure(qdrant_repo, name, overrides, corpus, queries, truth)
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,61 @@
+"""Load test for the async /generate path with a stubbed LLM (fixed latency) and in-memory Qdrant.
+
+The LLM waits overlap, but the chain's own work (LangChain's runnables and callbacks, prompt formatting, the
+in-memory search) runs on the event loop, one request at a time. So the wall time of REQUESTS concurrent requests
+is at least the LLM latency of one request plus REQUESTS times the CPU time of one, and it is compared with both a
+single request's latency and the serial sum a blocking pipeline would take.
+
+Run from `chatbot-service`: python -m benchmarks.concurrent_generate
+"""
+import asyncio
+import statistics
+import time
+from benchmarks.stubs import COLLECTION_NAME, fake_embeddings, make_chat_history, make_llm, make_qdrant_repo
+from app.services.rag_service import RagService
+from app.utils.executor import install_default_executor
+
+REQUESTS = 50
+SINGLE_REQUESTS = 5
+LLM_LATENCY = 0.2
+
+async def run():
+    install_default_executor()
+
+    rag_service = RagService(
+        qdrant_repo=make_qdrant_repo(),
+        collection_names=[COLLECTION_NAME],
+        llm=make_llm(latency=LLM_LATENCY),
+        embeddings=fake_embeddings
+    )
+    chat_history = make_chat_history(turns=3)
+
+    async def one_request(i):
+        await rag_service.agenerate_response(collection_name=COLLECTION_NAME, query=f"Căn hộ số {i} dưới 10 triệu", chat_history=chat_history)
+
+    # Warm-up, the first request pays for imports and caches
+    await one_request(-1)
+
+    # One at a time first: the latency of a request on an idle loop, and the CPU time it takes
+    single_latencies = []
+    cpu_start = time.process_time()
+
+    for i in range(SINGLE_REQUESTS):
+        start = time.perf_counter()
+        await one_request(i)
+        single_latencies.append(time.perf_counter() - start)
+
+    cpu_per_request = (time.process_time() - cpu_start) / SINGLE_REQUESTS
+    single = statistics.median(single_latencies)
+    serial = single * REQUESTS
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one_request(i) for i in range(REQUESTS)))
+    wall = time.perf_counter() - start
+
+    print(f"Requests: {REQUESTS}, stub LLM latency: {LLM_LATENCY * 1000:.0f} ms per call (2 calls per request)")
+    print(f"Single request: {single * 1000:.0f} ms, of which {cpu_per_request * 1000:.1f} ms CPU on the event loop")
+    print(f"Concurrent wall time: {wall:.2f} s = {wall / single:.1f}x a single request, {wall / serial:.0%} of the serial sum ({serial:.2f} s)")
+    print(f"Expected with the CPU work serialized on the loop: {single + (REQUESTS - 1) * cpu_per_request:.2f} s")
+
+if __name__ == "__main__":
+    asyncio.run(run())
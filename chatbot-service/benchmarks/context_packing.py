@@ -0,0 +1,107 @@
+"""Prompt tokens of the property context: every historic and retrieved page content as is vs. `pack_context`.
+
+The history has five turns citing three listings each, and some of them come back in the retrieval, as follow-up
+questions usually do. Listings have a long description, owner contact details and a dozen attributes, like the
+content built by `to_property_document`.
+
+Exits non-zero if a packed context goes over its budget, or drops a retrieved listing while a lower-ranked one was
+packed.
+
+Run from `chatbot-service`: python -m benchmarks.context_packing
+"""
+import sys
+import time
+from app.utils.context_packer import format_history_context, pack_context
+from app.utils.document import to_property_document
+from app.utils.tokens import count_tokens
+
+TURNS = 5
+CITED_PER_TURN = 3
+RETRIEVED = 5
+ITERATIONS = 200
+BUDGETS = (4000, 2000, 1000, 500)
+DESCRIPTION_TOKENS = 80
+
+ATTRIBUTES = [
+    ("Amenity", "Máy lạnh"), ("Amenity", "Máy giặt"), ("Amenity", "Tủ lạnh"), ("Amenity", "Wifi"),
+    ("Highlight", "Gần chợ"), ("Highlight", "Gần trường học"), ("Highlight", "View sông"),
+    ("Facility", "Thang máy"), ("Facility", "Hầm xe"), ("Facility", "Bảo vệ 24/7"), ("Facility", "Hồ bơi"), ("Facility", "Phòng gym"),
+]
+
+def make_property(i: int):
+    return {
+        "id": f"property-{i}",
+        "title": f"Căn hộ {i} phòng ngủ đầy đủ nội thất",
+        "description": (
+            f"Căn hộ {i} rộng 70m2, thoáng mát, nhiều ánh sáng tự nhiên, nội thất mới, bếp riêng, ban công rộng. "
+            "Khu dân cư an ninh, yên tĩnh, gần chợ, siêu thị, trường học và bệnh viện, di chuyển thuận tiện vào trung tâm. "
+        ) * 6,
+        "latitude": 10.85,
+        "longitude": 106.77,
+        "address": {"street": f"{i} Võ Văn Ngân", "ward": "Linh Chiểu", "district": "Thủ Đức", "city": "Hồ Chí Minh"},
+        "attributes": [{"type": type, "name": name} for type, name in ATTRIBUTES],
+        "images": [f"https://example.com/{i}-{k}.jpg" for k in range(5)],
+        "rentalConditions": [{"type": "Đặt cọc", "value": "2 tháng"}, {"type": "Thời hạn", "value": "12 tháng"}, {"type": "Thanh toán", "value": "Hàng tháng"}],
+        "price": 5000000 + (i % 20) * 1000000,
+        "owner": {"name": "Nguyễn Văn A", "email": f"owner{i}@example.com", "phoneNumber": "0900000000"},
+        "slug": f"can-ho-{i}-phong-ngu",
+        "type": {"name": "Căn hộ"},
+    }
+
+def make_request():
+    documents = [to_property_document(make_property(i)) for i in range(TURNS * CITED_PER_TURN + RETRIEVED - 2)]
+    history = [
+        {"source_documents": [document.metadata for document in cited], "page_contents": [document.page_content for document in cited]}
+        for cited in (documents[turn * CITED_PER_TURN:(turn + 1) * CITED_PER_TURN] for turn in range(TURNS))
+    ]
+    # Two of the retrieved listings were already cited in the last turn
+    cited = TURNS * CITED_PER_TURN
+
+    return documents[cited - 2:cited + RETRIEVED - 2], history
+
+def unpacked_tokens(retrieved, history) -> int:
+    # What the stuff chain and `history_context` received before packing
+    history_context = format_history_context(None, [page_content for chat in history for page_content in chat["page_contents"]])
+
+    return count_tokens(history_context) + count_tokens("\n\n".join(document.page_content for document in retrieved))
+
+def pack(retrieved, history, budget: int):
+    return pack_context(
+        retrieved=[(document.metadata, document.page_content) for document in retrieved],
+        history=[document for chat in reversed(history) for document in zip(chat["source_documents"], chat["page_contents"])],
+        max_tokens=budget,
+        description_tokens=DESCRIPTION_TOKENS
+    )
+
+def run():
+    retrieved, history = make_request()
+    baseline = unpacked_tokens(retrieved, history)
+    failures = 0
+
+    print(f"{TURNS} turns x {CITED_PER_TURN} cited + {RETRIEVED} retrieved listings, description cut to {DESCRIPTION_TOKENS} tokens")
+    print(f"{'unpacked':>12}: {baseline:6d} tokens")
+
+    for budget in BUDGETS:
+        start = time.perf_counter()
+        for _ in range(ITERATIONS):
+            packed_retrieved, history_contents = pack(retrieved, history, budget)
+        elapsed_ms = (time.perf_counter() - start) * 1000 / ITERATIONS
+
+        contents = [content for _, content in packed_retrieved] + history_contents
+        tokens = sum(count_tokens(content) for content in contents)
+        detailed = sum("Mô tả:" in content for content in contents)
+        missing = [document.metadata["slug"] for document in retrieved if not any(f"(Slug: {document.metadata['slug']})" in content for _, content in packed_retrieved)]
+        passed = tokens <= budget and not (missing and history_contents)
+        failures += not passed
+
+        print(
+            f"{'FAIL' if not passed else '':4}budget {budget:>4}: {tokens:6d} tokens ({tokens / baseline:.0%}), "
+            f"{len(packed_retrieved)} retrieved + {len(history_contents)} historic listings, {detailed} with description, "
+            f"{elapsed_ms:.2f} ms to pack" + (f", slugs lost: {', '.join(missing)}" if missing else "")
+        )
+
+    if failures:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    run()
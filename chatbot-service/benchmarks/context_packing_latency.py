@@ -0,0 +1,79 @@
+"""Per-request latency of `generate_response` with context packing on and off, against the same chain without a
+packing step, with a zero-latency stub LLM and in-memory Qdrant. What is left is the CPU cost the packing step adds.
+
+Runs alternate between the variants and the medians are compared. Exits non-zero if packing on makes the median
+request more than MAX_OVERHEAD slower than the chain without the step. A step LangChain is slow to trace (e.g. a
+RunnableLambda, whose source it parses on every call) shows up here even when the packing itself is cheap.
+
+Run from `chatbot-service`: python -m benchmarks.context_packing_latency
+"""
+import statistics
+import sys
+import time
+from benchmarks.stubs import COLLECTION_NAME, fake_embeddings, make_chat_history, make_llm, make_qdrant_repo
+from langchain.chains import create_retrieval_chain
+from langchain.chains.combine_documents import create_stuff_documents_chain
+from app.core.config import settings
+from app.services.rag_service import RagService, qa_prompt
+from app.utils.context_packer import format_history_context
+
+ROUNDS = 10
+REQUESTS_PER_ROUND = 5
+MAX_OVERHEAD = 0.25
+
+class WithoutPackStepRagService(RagService):
+    """The answer chain with no packing step, the history context is formatted before the run."""
+
+    def _build_rag_chain(self, retriever):
+        question_answer_chain = create_stuff_documents_chain(self.llm.with_config(tags=["answer"]), qa_prompt)
+
+        return create_retrieval_chain(self._build_history_aware_retriever(retriever), question_answer_chain)
+
+    def _prepare_run(self, query: str, chat_history: list[dict], summary: str = None):
+        inputs, config = super()._prepare_run(query=query, chat_history=chat_history, summary=summary)
+        inputs["history_context"] = format_history_context(summary, [page_content for _, page_content in inputs["history_documents"]])
+
+        return inputs, config
+
+def measure(rag_service: RagService, chat_history: list[dict]) -> list[float]:
+    latencies = []
+
+    for _ in range(REQUESTS_PER_ROUND):
+        start = time.perf_counter()
+        rag_service.generate_response(collection_name=COLLECTION_NAME, query="Căn hộ dưới 10 triệu", chat_history=chat_history)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    return latencies
+
+def run():
+    qdrant_repo = make_qdrant_repo()
+    services = {
+        "without step": WithoutPackStepRagService(qdrant_repo=qdrant_repo, collection_names=[COLLECTION_NAME], llm=make_llm(), embeddings=fake_embeddings),
+        "packing off": RagService(qdrant_repo=qdrant_repo, collection_names=[COLLECTION_NAME], llm=make_llm(), embeddings=fake_embeddings),
+        "packing on": RagService(qdrant_repo=qdrant_repo, collection_names=[COLLECTION_NAME], llm=make_llm(), embeddings=fake_embeddings),
+    }
+    chat_history = make_chat_history(turns=5)
+    latencies = {name: [] for name in services}
+
+    for round in range(ROUNDS + 1):
+        for name, rag_service in services.items():
+            settings.CONTEXT_PACKING_ENABLED = name == "packing on"
+            measured = measure(rag_service, chat_history)
+
+            # The first round warms up imports and caches
+            if round:
+                latencies[name].extend(measured)
+
+    baseline = statistics.median(latencies["without step"])
+    print(f"{ROUNDS * REQUESTS_PER_ROUND} requests per variant, 5 turns of history")
+
+    for name in services:
+        median = statistics.median(latencies[name])
+        print(f"{name:>12}: {median:6.1f} ms median per request ({median / baseline - 1:+.0%})")
+
+    if statistics.median(latencies["packing on"]) / baseline - 1 > MAX_OVERHEAD:
+        print(f"FAIL packing adds more than {MAX_OVERHEAD:.0%} to a request")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    run()
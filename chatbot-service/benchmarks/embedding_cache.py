@@ -0,0 +1,54 @@
+"""Embedding round-trips saved by the (model, text) cache for repeated property updates and queries.
+
+The remote API is stood in for by a fake embedding model with a fixed per-call latency.
+
+Run from `chatbot-service`: python -m benchmarks.embedding_cache
+"""
+import os
+import tempfile
+import time
+from benchmarks.stubs import SlowFakeEmbeddings, make_property
+from app.utils.embedding_cache import CachedEmbeddings, EmbeddingCache
+
+PROPERTIES = 200
+UPDATES_PER_PROPERTY = 3
+QUERIES = ["Căn hộ quận 1 dưới 10 triệu", "Phòng trọ gần Đại học Bách Khoa", "Nhà nguyên căn Thủ Đức có chỗ để xe"]
+QUERY_REPEATS = 50
+API_LATENCY = 0.05
+
+def run_workload(embeddings):
+    contents = [f"Tiêu đề: {p['title']}\nGiá: {p['price']} (Slug: {p['slug']})" for p in (make_property(i) for i in range(PROPERTIES))]
+
+    start = time.perf_counter()
+    # PROPERTY_UPDATED events usually resend unchanged content
+    for _ in range(UPDATES_PER_PROPERTY):
+        for content in contents:
+            embeddings.embed_documents([content])
+    for _ in range(QUERY_REPEATS):
+        for query in QUERIES:
+            embeddings.embed_query(query)
+
+    return time.perf_counter() - start
+
+def run():
+    uncached = SlowFakeEmbeddings(size=768, latency=API_LATENCY)
+    uncached_s = run_workload(uncached)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "embeddings.sqlite3")
+        remote = SlowFakeEmbeddings(size=768, latency=API_LATENCY)
+        cache = EmbeddingCache(path=path, max_size=10000)
+        cached_s = run_workload(CachedEmbeddings(remote, model="fake", cache=cache))
+
+        print(f"Without cache: {uncached_s:.2f} s, {uncached.calls} API calls")
+        print(f"With cache: {cached_s:.2f} s, {remote.calls} API calls, stats: {cache.stats()}")
+
+        # A restarted process only has the disk tier
+        restarted_remote = SlowFakeEmbeddings(size=768, latency=API_LATENCY)
+        restarted_cache = EmbeddingCache(path=path, max_size=10000)
+        restarted_s = run_workload(CachedEmbeddings(restarted_remote, model="fake", cache=restarted_cache))
+
+        print(f"After restart (disk tier): {restarted_s:.2f} s, {restarted_remote.calls} API calls, stats: {restarted_cache.stats()}")
+
+if __name__ == "__main__":
+    run()
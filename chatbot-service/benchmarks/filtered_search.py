@@ -0,0 +1,82 @@
+"""Filtered vector search latency with and without payload indexes on tens of thousands of properties.
+
+Uses the Qdrant server at QDRANT_BENCHMARK_URL if set, otherwise Qdrant local mode. Local mode accepts payload
+indexes but always scans payloads, so the indexed/unindexed difference only shows against a server.
+
+Run from `chatbot-service`: python -m benchmarks.filtered_search
+"""
+import os
+import random
+import statistics
+import time
+import numpy as np
+from qdrant_client import QdrantClient
+from qdrant_client.http import models
+from app.repositories.qdrant_repository import QdrantRepository
+from app.utils.document import coerce_property_metadata
+
+PROPERTIES = 20000
+VECTOR_SIZE = 768
+QUERIES = 200
+DISTRICTS = [f"Quận {i}" for i in range(1, 13)] + ["Thủ Đức", "Bình Thạnh", "Gò Vấp", "Tân Bình"]
+TYPES = ["Căn hộ", "Nhà nguyên căn", "Phòng trọ", "Văn phòng"]
+
+def make_points(rng: np.random.Generator):
+    vectors = rng.standard_normal((PROPERTIES, VECTOR_SIZE), dtype=np.float32)
+
+    for i in range(PROPERTIES):
+        metadata = coerce_property_metadata({
+            "id": f"property-{i}",
+            "slug": f"property-{i}",
+            # Prices arrive as strings from some producers, coercion makes them FLOAT-indexable
+            "price": str(random.randint(2, 50) * 1000000),
+            "address": {"city": "Hồ Chí Minh", "district": random.choice(DISTRICTS)},
+            "type": {"name": random.choice(TYPES)},
+        })
+
+        yield models.PointStruct(id=i, vector=vectors[i].tolist(), payload={"page_content": "", "metadata": metadata})
+
+def make_filter():
+    min_price = random.randint(2, 40) * 1000000
+
+    return models.Filter(must=[
+        models.FieldCondition(key="metadata.price", range=models.Range(gte=min_price, lte=min_price + 5000000)),
+        models.FieldCondition(key="metadata.address.district", match=models.MatchValue(value=random.choice(DISTRICTS))),
+        models.FieldCondition(key="metadata.type.name", match=models.MatchValue(value=random.choice(TYPES))),
+    ])
+
+def measure(qdrant_repo: QdrantRepository, collection_name: str, queries):
+    latencies = []
+
+    for vector, query_filter in queries:
+        start = time.perf_counter()
+        qdrant_repo.client.search(collection_name=collection_name, query_vector=vector, query_filter=query_filter, limit=5)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    latencies.sort()
+    return statistics.median(latencies), latencies[int(len(latencies) * 0.99) - 1]
+
+def run():
+    random.seed(0)
+    rng = np.random.default_rng(0)
+    url = os.getenv("QDRANT_BENCHMARK_URL")
+    qdrant_repo = QdrantRepository(client=QdrantClient(url=url) if url else QdrantClient(location=":memory:"))
+    points = list(make_points(rng))
+    queries = [(rng.standard_normal(VECTOR_SIZE).tolist(), make_filter()) for _ in range(QUERIES)]
+
+    for collection_name, indexed in (("benchmark-unindexed", False), ("benchmark-indexed", True)):
+        qdrant_repo.client.recreate_collection(collection_name=collection_name, vectors_config=models.VectorParams(size=VECTOR_SIZE, distance=models.Distance.COSINE))
+
+        if indexed:
+            qdrant_repo.create_payload_indexes(collection_name)
+
+        for i in range(0, len(points), 1000):
+            qdrant_repo.client.upsert(collection_name=collection_name, points=points[i:i + 1000])
+
+        p50, p99 = measure(qdrant_repo, collection_name, queries)
+        print(f"{collection_name}: p50 {p50:.2f} ms, p99 {p99:.2f} ms over {QUERIES} filtered searches ({PROPERTIES} points, {'server' if url else 'local mode'})")
+
+        qdrant_repo.delete_collection(collection_name)
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,101 @@
+"""Offline relevance of dense, sparse and hybrid (RRF) retrieval on the listings in `properties.json`.
+
+The five listings are mixed with synthetic distractors in the same wards and districts, and each query names a
+project, street or ward the way users type it (often without diacritics). Uses the configured EMBEDDING_BACKEND
+(EMBEDDING_BACKEND=local runs fully offline) and Qdrant local mode.
+
+Run from `chatbot-service`: python -m benchmarks.hybrid_retrieval
+"""
+import json
+import os
+import random
+from qdrant_client import QdrantClient
+from qdrant_client.http import models
+from langchain.docstore.document import Document
+from app.repositories.qdrant_repository import SPARSE_VECTOR_NAME, QdrantRepository
+from app.utils.embedding import get_embedding_size, get_embeddings
+from app.utils.sparse import to_sparse_document, to_sparse_query
+
+COLLECTION_NAME = "benchmark-hybrid"
+PROPERTIES_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "properties.json")
+DISTRACTORS = 300
+TOP_K = 5
+
+# (query, index of the expected listing in properties.json)
+QUERIES = [
+    ("căn hộ 1PN Masteri Thảo Điền", 0),
+    ("Masteri Thao Dien 1 phong ngu view noi khu", 0),
+    ("Masteri Thao Dien 2 PN đầy đủ nội thất", 1),
+    ("căn hộ 72m2 Masteri 2 phòng ngủ", 1),
+    ("Vinhomes Central Park 1 phòng ngủ", 2),
+    ("can ho vinhomes central park binh thanh", 2),
+    ("Lê Văn Sỹ Apartment giá hợp lý", 3),
+    ("căn hộ Le Van Sy quận 3", 3),
+    ("căn hộ đường Trần Quý Cáp free internet", 4),
+    ("tran quy cap binh thanh 20m2", 4),
+]
+
+WARDS = [("Thảo Điền", "Quận 2"), ("Phường 1", "Bình Thạnh"), ("Phường 11", "Bình Thạnh"), ("Phường 12", "Quận 3"), ("An Phú", "Quận 2")]
+STREETS = ["Nguyễn Văn Hưởng", "Xô Viết Nghệ Tĩnh", "Điện Biên Phủ", "Nguyễn Đình Chiểu", "Quốc Hương", "Ung Văn Khiêm"]
+
+def listing_content(p, slug):
+    conditions = "\n".join(f"{c['type']}: {c['value']}" for c in p.get("conditions", []))
+    return f"Tiêu đề: {p['title']}\nMô tả: {p['description']}\nĐịa chỉ: {p['street']}, {p['ward']}, {p['district']}, {p['city']}\n{conditions}\nGiá: {p['price']} (Slug: {slug})"
+
+def make_documents():
+    with open(PROPERTIES_PATH, encoding="utf-8") as f:
+        listings = json.load(f)
+
+    documents = [Document(page_content=listing_content(p, f"listing-{i}"), metadata={"id": f"listing-{i}", "slug": f"listing-{i}"}) for i, p in enumerate(listings)]
+    random.seed(0)
+
+    for i in range(DISTRACTORS):
+        ward, district = random.choice(WARDS)
+        bedrooms = random.randint(1, 3)
+        p = {
+            "title": f"Cho thuê căn hộ {bedrooms} PN đường {random.choice(STREETS)} - nội thất đầy đủ",
+            "description": "Căn hộ thoáng mát, gần chợ, trường học và trung tâm thương mại. Tiện ích: hồ bơi, gym, bảo vệ 24/7.",
+            "street": f"{random.randint(1, 300)} {random.choice(STREETS)}", "ward": ward, "district": district, "city": "Hồ Chí Minh",
+            "conditions": [{"type": "Phòng ngủ", "value": str(bedrooms)}], "price": random.randint(5, 25) * 1000000,
+        }
+        documents.append(Document(page_content=listing_content(p, f"distractor-{i}"), metadata={"id": f"distractor-{i}", "slug": f"distractor-{i}"}))
+
+    return documents
+
+def evaluate(label, search):
+    reciprocal_ranks, hits_at_1, hits_at_k = [], 0, 0
+
+    for query, expected in QUERIES:
+        slugs = [point.payload["metadata"]["slug"] for point in search(query)]
+        rank = slugs.index(f"listing-{expected}") + 1 if f"listing-{expected}" in slugs else None
+        reciprocal_ranks.append(1 / rank if rank else 0)
+        hits_at_1 += rank == 1
+        hits_at_k += rank is not None
+
+    print(f"{label:>6}: recall@1 {hits_at_1 / len(QUERIES):.2f}, recall@{TOP_K} {hits_at_k / len(QUERIES):.2f}, MRR {sum(reciprocal_ranks) / len(QUERIES):.3f}")
+
+def run():
+    embeddings = get_embeddings()
+    qdrant_repo = QdrantRepository(client=QdrantClient(location=":memory:"))
+    qdrant_repo.client.create_collection(
+        collection_name=COLLECTION_NAME,
+        vectors_config=models.VectorParams(size=get_embedding_size(), distance=models.Distance.COSINE),
+        sparse_vectors_config={SPARSE_VECTOR_NAME: models.SparseVectorParams(modifier=models.Modifier.IDF)}
+    )
+
+    documents = make_documents()
+    qdrant_repo.insert_documents(
+        collection_name=COLLECTION_NAME,
+        documents=documents,
+        embeddings=embeddings.embed_documents([doc.page_content for doc in documents]),
+        sparse_embeddings=[to_sparse_document(doc.page_content) for doc in documents]
+    )
+
+    print(f"{len(documents)} documents, {len(QUERIES)} queries")
+
+    evaluate("dense", lambda query: qdrant_repo.client.query_points(collection_name=COLLECTION_NAME, query=embeddings.embed_query(query), limit=TOP_K).points)
+    evaluate("sparse", lambda query: qdrant_repo.client.query_points(collection_name=COLLECTION_NAME, query=to_sparse_query(query), using=SPARSE_VECTOR_NAME, limit=TOP_K).points)
+    evaluate("hybrid", lambda query: qdrant_repo.hybrid_search(collection_name=COLLECTION_NAME, dense_query=embeddings.embed_query(query), sparse_query=to_sparse_query(query), top_k=TOP_K))
+
+if __name__ == "__main__":
+    run()
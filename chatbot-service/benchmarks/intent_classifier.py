@@ -0,0 +1,95 @@
+"""Accuracy and latency of the local intent classifier against the labelled examples in `app/data/intents.jsonl`.
+
+Accuracy is measured with stratified 5-fold cross-validation, on the held-out examples as written and without
+diacritics. With INTENT_BENCHMARK_LLM=true (needs a real GOOGLE_API_KEY) the held-out examples are also labelled by
+the Gemini `classify_question` prompt, and the local classifier's agreement with those labels and both latencies are reported.
+
+Run from `chatbot-service`: python -m benchmarks.intent_classifier
+"""
+import os
+import statistics
+import time
+from collections import Counter
+from sklearn.model_selection import StratifiedKFold
+from app.core.config import settings
+from app.services.intent_service import ROUTED_REPLIES, IntentClassifier, load_intent_examples
+from app.utils.sparse import strip_diacritics
+
+FOLDS = 5
+LATENCY_ROUNDS = 20
+
+# Questions the RAG prompt answers, which mention contracts or payments but must not be routed
+RAG_QUESTIONS = [
+    "căn hộ có hợp đồng thông minh không",
+    "lợi ích của hợp đồng thông minh là gì",
+    "nhà này có cho thanh toán bằng tiền điện tử không",
+    "hợp đồng thuê nhà trên blockchain có an toàn không",
+    "phòng trọ quận 7 đặt cọc mấy tháng",
+]
+
+def percentile(values, q):
+    return sorted(values)[min(int(len(values) * q), len(values) - 1)]
+
+def run():
+    texts, labels = load_intent_examples()
+    held_out = []
+    correct = Counter()
+    correct_stripped = Counter()
+    totals = Counter(labels)
+    # (routed, routed to the right intent) per held-out example, as `route_intent` in the API does it
+    routed, routed_correctly = 0, 0
+
+    for train, test in StratifiedKFold(n_splits=FOLDS, shuffle=True, random_state=0).split(texts, labels):
+        classifier = IntentClassifier(texts=[texts[i] for i in train], labels=[labels[i] for i in train], min_confidence=settings.INTENT_MIN_CONFIDENCE)
+
+        for i in test:
+            correct[labels[i]] += classifier.classify(texts[i]) == labels[i]
+            correct_stripped[labels[i]] += classifier.classify(strip_diacritics(texts[i])) == labels[i]
+            intent = classifier.classify(texts[i])
+            routed += intent in ROUTED_REPLIES
+            routed_correctly += intent in ROUTED_REPLIES and intent == labels[i]
+            held_out.append((classifier, texts[i], labels[i]))
+
+    print(f"{len(texts)} examples, {FOLDS}-fold cross-validation, min confidence {settings.INTENT_MIN_CONFIDENCE}")
+    print(f"Accuracy: {sum(correct.values()) / len(texts):.3f}, without diacritics: {sum(correct_stripped.values()) / len(texts):.3f}")
+
+    for label, total in totals.items():
+        print(f"  {label:>24}: {correct[label] / total:.3f} ({correct_stripped[label] / total:.3f} without diacritics)")
+
+    routable = sum(totals[label] for label in ROUTED_REPLIES)
+    print(f"Routing: precision {routed_correctly / routed if routed else 1:.3f}, recall {routed_correctly / routable:.3f} (the rest goes to RAG)")
+
+    start = time.perf_counter()
+    classifier = IntentClassifier(min_confidence=settings.INTENT_MIN_CONFIDENCE)
+    print(f"Startup training on the full dataset: {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    for question in RAG_QUESTIONS:
+        label, confidence = classifier.predict(question)
+        print(f"  {'ROUTED' if classifier.classify(question) in ROUTED_REPLIES else 'rag':>6}: {question!r} ({label}, p={confidence:.2f})")
+
+    latencies = []
+
+    for _ in range(LATENCY_ROUNDS):
+        for text in texts:
+            start = time.perf_counter()
+            classifier.classify(text)
+            latencies.append(time.perf_counter() - start)
+
+    print(f"Local classify latency: p50 {percentile(latencies, 0.5) * 1000:.3f} ms, p99 {percentile(latencies, 0.99) * 1000:.3f} ms")
+
+    if os.getenv("INTENT_BENCHMARK_LLM", "false").lower() == "true":
+        from app.services.rag_service import classify_question_with_llm, get_llm
+
+        agreement, llm_latencies = 0, []
+
+        for fold_classifier, text, _ in held_out:
+            start = time.perf_counter()
+            llm_label = classify_question_with_llm(get_llm(), text)
+            llm_latencies.append(time.perf_counter() - start)
+            agreement += fold_classifier.classify(text) == llm_label
+
+        print(f"Agreement with Gemini labels: {agreement / len(held_out):.3f}")
+        print(f"Gemini classify latency: p50 {statistics.median(llm_latencies) * 1000:.0f} ms, p99 {percentile(llm_latencies, 0.99) * 1000:.0f} ms")
+
+if __name__ == "__main__":
+    run()
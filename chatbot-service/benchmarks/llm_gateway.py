@@ -0,0 +1,123 @@
+"""Checks of `LLMGateway` against a fake LLM backend with a fixed latency, plus `GatewayChatModel` over the stub chat model.
+
+- coalescing: a burst of identical prompts makes one backend call
+- rate limit: distinct prompts never start faster than the rate (plus the initial burst)
+- concurrency: no more calls in flight than `max_concurrency`
+- throttling: 429s are retried, slow the rate down and the calls still succeed
+- load shedding: beyond the wait queue, calls fail fast with `GatewayOverloaded`
+
+Exits non-zero if any check fails.
+
+Run from `chatbot-service`: python -m benchmarks.llm_gateway
+"""
+import asyncio
+import sys
+import time
+from app.utils.llm_gateway import GatewayOverloaded, LLMGateway
+
+LATENCY = 0.05
+
+class FakeResourceExhausted(Exception):
+    """Stands in for google.api_core's 429."""
+
+    code = 429
+
+class FakeLLM:
+    """Answers after `latency` seconds, fails the first `throttled` calls with a 429 and records concurrency."""
+
+    def __init__(self, latency: float = LATENCY, throttled: int = 0):
+        self.latency = latency
+        self.throttled = throttled
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def generate(self, prompt: str) -> str:
+        self.calls += 1
+        call = self.calls
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+        try:
+            await asyncio.sleep(self.latency)
+
+            if call <= self.throttled:
+                raise FakeResourceExhausted("429 Resource has been exhausted")
+
+            return f"answer to {prompt}"
+        finally:
+            self.in_flight -= 1
+
+def make_gateway(**kwargs) -> LLMGateway:
+    options = {"name": "benchmark", "rate": 1000, "burst": 1000, "max_concurrency": 1000, "max_queue": 1000, "queue_timeout": 10, "backoff_base": 0.01}
+    return LLMGateway(**{**options, **kwargs})
+
+async def ask(gateway: LLMGateway, llm: FakeLLM, prompt: str):
+    return await gateway.call(prompt, lambda: llm.generate(prompt))
+
+async def check_coalescing():
+    gateway, llm = make_gateway(), FakeLLM()
+    answers = await asyncio.gather(*(ask(gateway, llm, f"prompt {i % 3}") for i in range(60)))
+
+    return llm.calls == 3 and answers[0] == answers[3] == "answer to prompt 0", f"60 requests over 3 prompts made {llm.calls} backend calls"
+
+async def check_rate_limit():
+    rate, burst, calls = 40, 5, 45
+    gateway, llm = make_gateway(rate=rate, burst=burst), FakeLLM(latency=0)
+
+    start = time.monotonic()
+    await asyncio.gather(*(ask(gateway, llm, f"prompt {i}") for i in range(calls)))
+    elapsed = time.monotonic() - start
+    expected = (calls - burst) / rate
+
+    return elapsed >= expected * 0.95, f"{calls} calls at {rate}/s with a burst of {burst}: {elapsed:.2f} s (at least {expected:.2f} s), {calls / elapsed:.1f} calls/s"
+
+async def check_concurrency():
+    gateway, llm = make_gateway(max_concurrency=4), FakeLLM()
+    await asyncio.gather(*(ask(gateway, llm, f"prompt {i}") for i in range(40)))
+
+    return llm.max_in_flight <= 4, f"max in flight {llm.max_in_flight} with max_concurrency=4"
+
+async def check_throttling():
+    gateway, llm = make_gateway(rate=100, burst=10, max_retries=3), FakeLLM(throttled=5)
+    rates = []
+    set_rate = gateway._set_rate
+    gateway._set_rate = lambda rate: (set_rate(rate), rates.append(gateway.bucket.rate))
+
+    answers = await asyncio.gather(*(ask(gateway, llm, f"prompt {i}") for i in range(10)))
+    passed = all(answers) and llm.calls == 15 and min(rates) < 100
+
+    return passed, f"10 calls, first 5 throttled: {llm.calls} backend calls, all answered, rate went down to {min(rates):.1f}/s and back to {gateway.bucket.rate:.1f}/s"
+
+async def check_load_shedding():
+    gateway, llm = make_gateway(max_concurrency=2, max_queue=10, queue_timeout=0.2), FakeLLM(latency=0.1)
+    results = await asyncio.gather(*(ask(gateway, llm, f"prompt {i}") for i in range(50)), return_exceptions=True)
+    shed = sum(isinstance(result, GatewayOverloaded) for result in results)
+    answered = sum(isinstance(result, str) for result in results)
+
+    return shed > 0 and shed + answered == 50, f"50 calls, 2 slots, queue of 10: {answered} answered, {shed} shed fast"
+
+async def check_chat_model():
+    from langchain_core.messages import HumanMessage
+    from benchmarks.stubs import make_llm
+    from app.utils.gateway_models import GatewayChatModel
+
+    inner = make_llm(latency=LATENCY)
+    llm = GatewayChatModel(llm=inner, gateway=make_gateway())
+    answers = await asyncio.gather(*(llm.ainvoke([HumanMessage(content="Căn hộ quận 7 dưới 10 triệu")]) for _ in range(20)))
+
+    return inner.calls == 1 and len({answer.content for answer in answers}) == 1, f"20 identical prompts through GatewayChatModel made {inner.calls} LLM call(s)"
+
+async def run():
+    failures = 0
+
+    for check in (check_coalescing, check_rate_limit, check_concurrency, check_throttling, check_load_shedding, check_chat_model):
+        passed, details = await check()
+        failures += not passed
+        print(f"{'ok  ' if passed else 'FAIL'} {check.__name__}: {details}")
+
+    if failures:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    asyncio.run(run())
@@ -0,0 +1,52 @@
+"""CPU throughput of the local sentence-transformers backend for different batch sizes, with and without int8 quantization.
+
+Also measures concurrent single-text callers going through the batching worker thread vs. encoding one by one.
+Downloads LOCAL_EMBEDDING_MODEL on first run.
+
+Run from `chatbot-service`: python -m benchmarks.local_embedding
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+from benchmarks.stubs import make_property
+from app.core.config import settings
+from app.utils.local_embedding import LocalEmbeddings
+
+TEXTS = 256
+BATCH_SIZES = [1, 8, 16, 32, 64]
+CONCURRENT_CALLERS = 32
+
+def make_texts():
+    return [f"Tiêu đề: {p['title']}\nĐịa chỉ: {p['address']['street']}, {p['address']['ward']}, {p['address']['district']}\nGiá: {p['price']} (Slug: {p['slug']})" for p in (make_property(i) for i in range(TEXTS))]
+
+def run_model(quantize: bool):
+    embeddings = LocalEmbeddings(model_name=settings.LOCAL_EMBEDDING_MODEL, batch_size=settings.LOCAL_EMBEDDING_BATCH_SIZE, max_wait_ms=settings.LOCAL_EMBEDDING_MAX_WAIT_MS, quantize=quantize)
+    texts = make_texts()
+    label = "int8" if quantize else "fp32"
+
+    embeddings.encode(texts[:8])  # warm-up
+
+    for batch_size in BATCH_SIZES:
+        start = time.perf_counter()
+        embeddings.encode(texts, batch_size=batch_size)
+        elapsed = time.perf_counter() - start
+        print(f"[{label}] batch_size={batch_size:>2}: {TEXTS / elapsed:7.1f} texts/s")
+
+    start = time.perf_counter()
+    for text in texts:
+        embeddings.encode([text])
+    sequential = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=CONCURRENT_CALLERS) as pool:
+        list(pool.map(embeddings.embed_query, texts))
+    batched = time.perf_counter() - start
+
+    print(f"[{label}] {TEXTS} single-text callers: sequential {TEXTS / sequential:7.1f} texts/s, {CONCURRENT_CALLERS} concurrent through the batching worker {TEXTS / batched:7.1f} texts/s")
+
+def run():
+    print(f"Model: {settings.LOCAL_EMBEDDING_MODEL}, {TEXTS} texts")
+    run_model(quantize=False)
+    run_model(quantize=True)
+
+if __name__ == "__main__":
+    run()
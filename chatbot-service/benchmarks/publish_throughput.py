@@ -0,0 +1,54 @@
+"""Confirmed publish throughput: one publish and confirm round-trip at a time vs. batched and pooled publishing.
+
+Uses a local broker stand-in (`FakeBroker`) that confirms each message one simulated network round-trip after
+it is published.
+
+Run from `chatbot-service`: python -m benchmarks.publish_throughput
+"""
+import asyncio
+import time
+from benchmarks.stubs import FakeBroker, make_property
+from app.services.rabbitmq_service import RabbitMQ
+
+MESSAGES = 2000
+CONFIRM_LATENCY = 0.002
+BATCH_SIZE = 100
+PUBLISHERS = 8
+
+EXCHANGE = {"name": "benchmark-exchange", "type": "fanout"}
+
+async def measure(label: str, publish):
+    broker = FakeBroker(confirm_latency=CONFIRM_LATENCY)
+    rabbitmq = RabbitMQ(url="amqp://benchmark", channel_pool_size=4, connect=broker.connect)
+    messages = [make_property(i) for i in range(MESSAGES)]
+
+    start = time.perf_counter()
+    await publish(rabbitmq, messages)
+    elapsed = time.perf_counter() - start
+    await rabbitmq.close()
+
+    print(f"{label:<25}: {MESSAGES / elapsed:9.1f} msg/s, {elapsed:.2f} s, confirmed {broker.published}/{MESSAGES}")
+
+async def sequential(rabbitmq, messages):
+    for message in messages:
+        await rabbitmq.publish_in_queue(EXCHANGE, message)
+
+async def batched(rabbitmq, messages):
+    for i in range(0, len(messages), BATCH_SIZE):
+        await rabbitmq.publish_many(messages[i:i + BATCH_SIZE], exchange=EXCHANGE)
+
+async def pooled(rabbitmq, messages):
+    async def publisher(offset: int):
+        for message in messages[offset::PUBLISHERS]:
+            await rabbitmq.publish_in_queue(EXCHANGE, message)
+
+    await asyncio.gather(*(publisher(offset) for offset in range(PUBLISHERS)))
+
+async def run():
+    print(f"{MESSAGES} messages, stub confirm latency {CONFIRM_LATENCY * 1000:.0f} ms")
+    await measure("One at a time", sequential)
+    await measure(f"publish_many({BATCH_SIZE})", batched)
+    await measure(f"{PUBLISHERS} concurrent publishers", pooled)
+
+if __name__ == "__main__":
+    asyncio.run(run())
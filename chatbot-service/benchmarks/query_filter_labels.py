@@ -0,0 +1,83 @@
+"""Check of the query filters against the payload labels of real listings, including the relaxed retry.
+
+Loads a property dump (`../properties.json` by default, or QUERY_FILTER_BENCHMARK_SOURCE) through the same
+`to_property_data` / `to_property_document` path as `reindex_properties`, into an in-memory Qdrant, then runs each
+query through `RagService`'s retriever with the search kwargs `_prepare_run` builds for the given QUERY_FILTER_FIELDS.
+A search that finds nothing under the type, bedroom or amenity conditions is retried with price and location only.
+
+Exits non-zero if a query retrieves other listings than the table expects, or retries when it shouldn't (or the
+other way round).
+
+Run from `chatbot-service`: python -m benchmarks.query_filter_labels
+"""
+import os
+import sys
+from prometheus_client import REGISTRY
+from qdrant_client import QdrantClient
+from qdrant_client.http import models
+from benchmarks.stubs import COLLECTION_NAME, VECTOR_SIZE, fake_embeddings, make_llm
+from app.core.config import settings
+from app.repositories.qdrant_repository import QdrantRepository
+from app.scripts.reindex_properties import read_records, to_property_data
+from app.services.rag_service import RagService
+from app.utils.document import to_property_document
+from app.utils.query_parser import FILTER_FIELDS, RELAXED_FILTER_FIELDS
+
+SOURCE = os.getenv("QUERY_FILTER_BENCHMARK_SOURCE", "../properties.json")
+
+# (query, QUERY_FILTER_FIELDS, positions of the dump records expected, whether the search is retried). The dump lists
+# cities, districts, prices and "Phòng ngủ" conditions, but no type name and no attribute names.
+CASES = [
+    ("căn hộ quận 2 dưới 15 triệu", RELAXED_FILTER_FIELDS, {0, 1}, False),
+    ("phòng ở Bình Thạnh dưới 10 triệu", RELAXED_FILTER_FIELDS, {4}, False),
+    ("quận 3 khoảng 5 triệu", RELAXED_FILTER_FIELDS, {3}, False),
+    ("thuê nhà ở sài gòn từ 13 đến 14 triệu", RELAXED_FILTER_FIELDS, {0, 1}, False),
+    ("1 phòng ngủ ở Bình Thạnh", FILTER_FIELDS, {2, 4}, False),
+    ("2 phòng ngủ quận 2", FILTER_FIELDS, {1}, False),
+    # Type and amenity labels the dump doesn't carry: the filtered search is empty and the retry recovers
+    ("căn hộ quận 2 dưới 15 triệu", FILTER_FIELDS, {0, 1}, True),
+    ("phòng có máy lạnh ở Bình Thạnh", FILTER_FIELDS, {2, 4}, True),
+    ("3 phòng ngủ quận 3", FILTER_FIELDS, {3}, True),
+    # Nothing left to relax, an empty search stays empty
+    ("quận 3 dưới 1 triệu", FILTER_FIELDS, set(), False),
+]
+
+def make_qdrant_repo(records: list[dict]) -> QdrantRepository:
+    qdrant_repo = QdrantRepository(client=QdrantClient(location=":memory:"))
+    qdrant_repo.client.create_collection(COLLECTION_NAME, vectors_config=models.VectorParams(size=VECTOR_SIZE, distance=models.Distance.COSINE))
+    documents = [to_property_document(to_property_data({**record, "propertyId": f"listing-{position}"})) for position, record in enumerate(records)]
+    qdrant_repo.insert_documents(COLLECTION_NAME, documents, fake_embeddings.embed_documents([document.page_content for document in documents]))
+
+    return qdrant_repo
+
+def fallbacks() -> float:
+    return REGISTRY.get_sample_value("chatbot_retrieval_filter_fallbacks_total") or 0.0
+
+def run():
+    records = read_records(SOURCE)
+    rag_service = RagService(qdrant_repo=make_qdrant_repo(records), collection_names=[COLLECTION_NAME], llm=make_llm(), embeddings=fake_embeddings)
+    retriever = rag_service._build_retriever(COLLECTION_NAME)
+    failures = 0
+
+    print(f"{len(records)} listings from {SOURCE}")
+
+    for query, fields, expected, expected_retry in CASES:
+        settings.QUERY_FILTER_FIELDS = list(fields)
+        _, config = rag_service._prepare_run(query=query, chat_history=[])
+        before = fallbacks()
+        found = {int(document.metadata["id"].removeprefix("listing-")) for document in retriever.invoke(query, config)}
+        retried = fallbacks() > before
+        passed = found == expected and retried == expected_retry
+        failures += not passed
+
+        print(
+            f"{'FAIL' if not passed else '':4}{query!r} [{','.join(fields)}]: {sorted(found)}"
+            + (f", retried with {','.join(RELAXED_FILTER_FIELDS)}" if retried else "")
+            + ("" if passed else f" (expected {sorted(expected)}" + (", retried" if expected_retry else ", no retry") + ")")
+        )
+
+    if failures:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,76 @@
+"""Table-driven check of `parse_query` on Vietnamese phrasings and of `parse_number` on price strings, plus per-query
+parse time.
+
+Exits non-zero if any case parses differently from the table.
+
+Run from `chatbot-service`: python -m benchmarks.query_parser
+"""
+import sys
+import time
+from app.utils.query_parser import parse_number, parse_query
+
+# (query, expected fields of ParsedQuery). Fields left out must keep their default.
+CASES = [
+    ("Căn hộ quận 1 dưới 10 triệu", {"districts": ["Quận 1"], "types": ["Căn hộ", "Chung cư", "Căn hộ chung cư"], "max_price": 10_000_000}),
+    ("tìm phòng trọ q3 tầm 3tr", {"districts": ["Quận 3"], "types": ["Phòng trọ"], "min_price": 2_400_000, "max_price": 3_600_000}),
+    ("Nhà nguyên căn từ 5 đến 10 triệu ở Bình Thạnh", {"types": ["Nhà nguyên căn", "Nhà riêng"], "districts": ["Bình Thạnh"], "min_price": 5_000_000, "max_price": 10_000_000}),
+    ("căn hộ 2 phòng ngủ quận 7 có hồ bơi", {"types": ["Căn hộ", "Chung cư", "Căn hộ chung cư"], "bedrooms": 2, "districts": ["Quận 7"], "amenities": [["Hồ bơi", "Bể bơi"]]}),
+    ("chung cư 1PN gần trung tâm sài gòn", {"types": ["Căn hộ", "Chung cư", "Căn hộ chung cư"], "bedrooms": 1, "cities": ["Hồ Chí Minh"]}),
+    ("Phòng trên 2 triệu có máy lạnh và chỗ để xe", {"min_price": 2_000_000, "amenities": [["Máy lạnh", "Điều hòa"], ["Chỗ để xe", "Bãi đỗ xe"]]}),
+    ("nhà giá 15 triệu ở Thủ Đức", {"min_price": 12_000_000, "max_price": 18_000_000, "districts": ["Thủ Đức", "Thành phố Thủ Đức"]}),
+    ("phòng trọ dưới 500k", {"types": ["Phòng trọ"], "max_price": 500_000}),
+    ("căn hộ không quá 12.000.000 đồng", {"types": ["Căn hộ", "Chung cư", "Căn hộ chung cư"], "max_price": 12_000_000}),
+    ("căn hộ dịch vụ Q.10 khoảng 1,5 triệu", {"types": ["Căn hộ dịch vụ"], "districts": ["Quận 10"], "min_price": 1_200_000, "max_price": 1_800_000}),
+    ("văn phòng cho thuê ở Cầu Giấy, Hà Nội", {"types": ["Văn phòng"], "districts": ["Cầu Giấy"], "cities": ["Hà Nội"]}),
+    ("căn hộ 30-50m2 quận 2", {"types": ["Căn hộ", "Chung cư", "Căn hộ chung cư"], "districts": ["Quận 2"]}),
+    ("phòng 7 - 9 triệu có wifi", {"min_price": 7_000_000, "max_price": 9_000_000, "amenities": [["Wifi", "Internet"]]}),
+    ("Biệt thự Thảo Điền trên 2 tỷ", {"types": ["Biệt thự"], "min_price": 2_000_000_000}),
+    ("Tôi muốn thuê nhà gần trường học", {}),
+    ("Căn hộ Masteri Thảo Điền còn trống không?", {"types": ["Căn hộ", "Chung cư", "Căn hộ chung cư"]}),
+    ("nhà trọ quận gò vấp thang máy dưới 4 củ", {"types": ["Phòng trọ"], "districts": ["Gò Vấp"], "amenities": [["Thang máy"]], "max_price": 4_000_000}),
+    ("CĂN HỘ QUẬN 3 DƯỚI 8TR", {"types": ["Căn hộ", "Chung cư", "Căn hộ chung cư"], "districts": ["Quận 3"], "max_price": 8_000_000}),
+]
+
+# Price strings as producers send them, also coerced with `parse_number` before they are stored (see `to_number`)
+NUMBER_CASES = [
+    ("13000000", 13_000_000), ("13.000.000", 13_000_000), ("13,000,000", 13_000_000), ("1.500", 1_500),
+    ("13,5", 13.5), ("13.5", 13.5), ("1,25", 1.25), ("0.5", 0.5),
+]
+
+ITERATIONS = 1000
+
+def run():
+    failures = 0
+
+    for query, expected in CASES:
+        parsed = vars(parse_query(query))
+        defaults = {"min_price": None, "max_price": None, "cities": [], "districts": [], "types": [], "bedrooms": None, "amenities": []}
+        expected = {**defaults, **expected}
+        mismatches = {key: (parsed[key], value) for key, value in expected.items() if parsed[key] != value}
+
+        if mismatches:
+            failures += 1
+            print(f"FAIL {query!r}: " + ", ".join(f"{key}={got!r} (expected {want!r})" for key, (got, want) in mismatches.items()))
+
+    for number, expected in NUMBER_CASES:
+        parsed = parse_number(number)
+
+        if parsed != expected:
+            failures += 1
+            print(f"FAIL parse_number({number!r}) = {parsed!r} (expected {expected!r})")
+
+    print(f"{len(CASES) + len(NUMBER_CASES) - failures}/{len(CASES) + len(NUMBER_CASES)} cases passed")
+
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        for query, _ in CASES:
+            parse_query(query).to_filter()
+    elapsed_us = (time.perf_counter() - start) * 1_000_000 / (ITERATIONS * len(CASES))
+
+    print(f"parse_query + to_filter: {elapsed_us:.1f} µs per query")
+
+    if failures:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,73 @@
+"""Slug attribution over a long synthetic history: the previous nested substring scan vs. one-pass extraction.
+
+The history has hundreds of turns citing five listings each, and the answer cites a few of them. Slugs such as
+`property-1` and `property-12` show the substring scan's false positives, which the one-pass version doesn't have.
+
+Run from `chatbot-service`: python -m benchmarks.slug_attribution
+"""
+import time
+from types import SimpleNamespace
+from app.utils.attribution import attribute_documents
+
+TURNS = 500
+DOCS_PER_TURN = 5
+ITERATIONS = 200
+
+def legacy_attribute(answer, context_documents, chat_history):
+    properties, slugs, page_contents = [], [], []
+
+    for item in context_documents:
+        if item.metadata['slug'] in answer and item.metadata['slug'] not in slugs:
+            properties.append(item.metadata)
+            page_contents.append(item.page_content)
+            slugs.append(item.metadata['slug'])
+
+    for chat in chat_history:
+        for j, document in enumerate(chat['source_documents']):
+            if document['slug'] in answer and document['slug'] not in slugs:
+                properties.append(document)
+                page_contents.append(chat['page_contents'][j])
+                slugs.append(document['slug'])
+
+    return properties, page_contents, slugs
+
+def make_document(i: int):
+    return {"id": f"id-{i}", "slug": f"property-{i}", "title": f"Căn hộ {i}"}, f"Tiêu đề: Căn hộ {i}\nMô tả: " + "thoáng mát " * 40 + f"(Slug: property-{i})"
+
+def make_history():
+    history = []
+
+    for turn in range(TURNS):
+        documents = [make_document(turn * DOCS_PER_TURN + j) for j in range(DOCS_PER_TURN)]
+        history.append({
+            "human": f"Câu hỏi {turn}",
+            "ai": f"Trả lời {turn}",
+            "source_documents": [metadata for metadata, _ in documents],
+            "page_contents": [page_content for _, page_content in documents],
+        })
+
+    return history
+
+def measure(label, attribute, answer, context, history):
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        _, _, slugs = attribute(answer, context, history)
+    elapsed_ms = (time.perf_counter() - start) * 1000 / ITERATIONS
+
+    print(f"{label}: {elapsed_ms:.3f} ms per response, slugs {slugs}")
+
+def run():
+    history = make_history()
+    context = [SimpleNamespace(metadata=metadata, page_content=page_content) for metadata, page_content in map(make_document, range(10_000, 10_005))]
+    answer = (
+        "Dựa trên yêu cầu của bạn, có một vài lựa chọn phù hợp. " * 20
+        + "Căn hộ ở Thủ Đức giá 7 triệu (Slug: property-10002). "
+        + "Bạn cũng có thể xem lại căn đã nhắc trước đó (Slug: property-12) và (Slug: property-1234, property-10002)."
+    )
+
+    print(f"{TURNS} history turns x {DOCS_PER_TURN} documents, answer of {len(answer)} characters")
+    measure("Nested substring scan", legacy_attribute, answer, context, history)
+    measure("One-pass extraction  ", lambda *args: attribute_documents(*args), answer, context, history)
+
+if __name__ == "__main__":
+    run()
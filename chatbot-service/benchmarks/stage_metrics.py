@@ -0,0 +1,54 @@
+"""Per-stage latency breakdown of the /generate pipeline, read back from the Prometheus metrics it records.
+
+Uses a stubbed LLM (fixed latency), fake embeddings behind the embedding cache and in-memory Qdrant, so the LLM
+stages should dominate and the rest shows the pipeline's own overhead.
+
+Run from `chatbot-service`: python -m benchmarks.stage_metrics
+"""
+import asyncio
+from prometheus_client import REGISTRY
+from benchmarks.stubs import COLLECTION_NAME, SlowFakeEmbeddings, make_chat_history, make_llm, make_qdrant_repo
+from app.services.rag_service import RagService
+from app.utils.embedding_cache import CachedEmbeddings, EmbeddingCache
+from app.utils.executor import install_default_executor
+
+REQUESTS = 20
+LLM_LATENCY = 0.1
+EMBEDDING_LATENCY = 0.02
+
+def sample(name: str, labels: dict):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+async def run():
+    install_default_executor()
+
+    embeddings = CachedEmbeddings(SlowFakeEmbeddings(size=768, latency=EMBEDDING_LATENCY), model="fake", cache=EmbeddingCache())
+    rag_service = RagService(
+        qdrant_repo=make_qdrant_repo(),
+        collection_names=[COLLECTION_NAME],
+        llm=make_llm(latency=LLM_LATENCY),
+        embeddings=embeddings
+    )
+    chat_history = make_chat_history(turns=3)
+
+    for i in range(REQUESTS):
+        await rag_service.agenerate_response(collection_name=COLLECTION_NAME, query=f"Căn hộ số {i} dưới 10 triệu", chat_history=chat_history)
+
+    print(f"Requests: {REQUESTS}, stub LLM latency: {LLM_LATENCY * 1000:.0f} ms, stub embedding latency: {EMBEDDING_LATENCY * 1000:.0f} ms")
+    print(f"{'stage':>24} {'count':>6} {'mean ms':>9}")
+
+    for stage in ("contextualize_question", "retrieve", "embed_query", "qdrant_search", "context_pack", "answer", "slug_attribution"):
+        count = sample("chatbot_stage_seconds_count", {"stage": stage})
+        total = sample("chatbot_stage_seconds_sum", {"stage": stage})
+        print(f"{stage:>24} {count:>6.0f} {total / count * 1000 if count else 0:>9.2f}")
+
+    for call in ("contextualize_question", "answer"):
+        prompt = sample("chatbot_llm_tokens_total", {"call": call, "kind": "prompt"})
+        completion = sample("chatbot_llm_tokens_total", {"call": call, "kind": "completion"})
+        print(f"{call} tokens per request: {prompt / REQUESTS:.0f} prompt, {completion / REQUESTS:.0f} completion")
+
+    documents = sample("chatbot_retrieved_documents_sum", {}) / max(sample("chatbot_retrieved_documents_count", {}), 1)
+    print(f"Retrieved documents per search: {documents:.1f}")
+
+if __name__ == "__main__":
+    asyncio.run(run())
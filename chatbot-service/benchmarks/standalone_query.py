@@ -0,0 +1,79 @@
+"""Table-driven check of `is_standalone_query` on Vietnamese follow-up and standalone queries, plus per-query time.
+
+A standalone query marked as a follow-up only costs the usual rewriting call; a follow-up marked as standalone is
+searched without its context, so the follow-up cases are the ones that must never fail.
+
+Exits non-zero if any case is classified differently from the table.
+
+Run from `chatbot-service`: python -m benchmarks.standalone_query
+"""
+import sys
+import time
+from app.utils.standalone_query import is_standalone_query
+
+STANDALONE = [
+    "Tìm căn hộ 2 phòng ngủ ở quận 7 dưới 15 triệu",
+    "Có phòng trọ nào ở Gò Vấp giá khoảng 3 triệu không?",
+    "Nhà nguyên căn Bình Thạnh có chỗ để xe",
+    "Tôi muốn thuê chung cư gần trung tâm Sài Gòn",
+    "Biệt thự Thảo Điền có hồ bơi",
+    "Văn phòng cho thuê ở Cầu Giấy, Hà Nội",
+    "phòng trọ q3 tầm 3tr có máy lạnh",
+    "Căn hộ Masteri Thảo Điền còn trống không?",
+    "Hợp đồng thông minh là gì?",
+    "Thanh toán bằng tiền điện tử trên SmartRent như thế nào?",
+    "Quy trình thuê nhà gồm những bước nào?",
+    "Mặt bằng kinh doanh ở Thủ Đức",
+    "Có căn hộ dịch vụ nào ở Phú Nhuận không?",
+    "Tìm nhà ở Đà Nẵng",
+]
+
+FOLLOW_UP = [
+    "Căn đó giá bao nhiêu?",
+    "Căn thứ hai có thang máy không?",
+    "Cái đầu tiên ở đường nào?",
+    "Nó có cho nuôi thú cưng không?",
+    "Còn quận 7 thì sao?",
+    "Rẻ hơn nữa",
+    "Có căn nào rẻ hơn không?",
+    "Vậy còn căn hộ ở Bình Thạnh?",
+    "So sánh hai căn giúp tôi",
+    "Cho tôi số điện thoại chủ nhà",
+    "Địa chỉ cụ thể ở đâu?",
+    "Có máy lạnh không?",
+    "Căn hộ vừa rồi có ban công không?",
+    "Phòng bạn vừa gửi còn trống không?",
+    "Ở đó an ninh có tốt không?",
+    "Mấy căn trên căn nào gần chợ nhất?",
+    "Thêm điều kiện có chỗ để xe",
+    "Giá thuê có bao gồm phí quản lý không?",
+    "ok, đặt lịch xem nhà đó giúp tôi",
+    "can ho do gia bao nhieu",
+]
+
+ITERATIONS = 1000
+
+def run():
+    cases = [(query, True) for query in STANDALONE] + [(query, False) for query in FOLLOW_UP]
+    failures = 0
+
+    for query, expected in cases:
+        if is_standalone_query(query) != expected:
+            failures += 1
+            print(f"FAIL {query!r}: expected {'standalone' if expected else 'follow-up'}")
+
+    print(f"{len(cases) - failures}/{len(cases)} cases passed ({len(STANDALONE)} standalone, {len(FOLLOW_UP)} follow-up)")
+
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        for query, _ in cases:
+            is_standalone_query(query)
+    elapsed_us = (time.perf_counter() - start) * 1_000_000 / (ITERATIONS * len(cases))
+
+    print(f"is_standalone_query: {elapsed_us:.1f} µs per query")
+
+    if failures:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    run()
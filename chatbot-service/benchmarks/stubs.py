@@ -0,0 +1,190 @@
+import asyncio
+import json
+import os
+import time
+
+# Benchmarks that fall back to the default Gemini clients only build them, they never call them
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain.docstore.document import Document
+from qdrant_client import QdrantClient
+from qdrant_client.http import models
+from app.repositories.qdrant_repository import QdrantRepository
+
+COLLECTION_NAME = "benchmark-properties"
+VECTOR_SIZE = 768
+
+fake_embeddings = DeterministicFakeEmbedding(size=VECTOR_SIZE)
+
+class SlowFakeEmbeddings(DeterministicFakeEmbedding):
+    """Deterministic fake embeddings that wait `latency` seconds per call and count the calls."""
+
+    latency: float = 0.0
+    calls: int = 0
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        time.sleep(self.latency)
+        return super().embed_documents(texts)
+
+    def embed_query(self, text):
+        self.calls += 1
+        time.sleep(self.latency)
+        return super().embed_query(text)
+
+class SlowFakeChatModel(FakeListChatModel):
+    """Fake chat model that waits `latency` seconds per call, like a remote LLM would, and counts the calls."""
+
+    latency: float = 0.0
+    calls: int = 0
+
+    def _call(self, *args, **kwargs):
+        self.calls += 1
+        time.sleep(self.latency)
+        return super()._call(*args, **kwargs)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.responses[0]))])
+
+def make_llm(latency: float = 0.0):
+    return SlowFakeChatModel(responses=["Căn hộ phù hợp với bạn (Slug: property-0)"], latency=latency)
+
+def make_property(i: int):
+    return {
+        "id": f"property-{i}",
+        "title": f"Căn hộ {i}",
+        "price": 5000000 + (i % 20) * 1000000,
+        "slug": f"property-{i}",
+        "address": {"street": f"{i} Võ Văn Ngân", "ward": "Linh Chiểu", "district": "Thủ Đức", "city": "Hồ Chí Minh"},
+        "type": {"name": "Căn hộ"},
+    }
+
+def make_property_event(i: int, type: str = "PROPERTY_UPDATED"):
+    property = make_property(i)
+
+    return json.dumps({
+        "type": type,
+        "data": {
+            **property,
+            "propertyId": property["id"],
+            "status": "ACTIVE",
+            "description": f"Căn hộ {i} thoáng mát, gần chợ và trường học",
+            "latitude": 10.85,
+            "longitude": 106.77,
+            "images": [f"https://example.com/{i}.jpg"],
+            "rentalConditions": [{"type": "Đặt cọc", "value": "2 tháng"}],
+            "attributes": [{"type": "Amenity", "name": "Máy lạnh"}, {"type": "Facility", "name": "Thang máy"}],
+            "owner": {"name": "Nguyễn Văn A", "email": "owner@example.com", "phoneNumber": "0900000000"},
+        }
+    }).encode("utf-8")
+
+class FakeBroker:
+    """Local RabbitMQ stand-in: records acks and nacks, and confirms each publish after `confirm_latency` seconds."""
+
+    def __init__(self, confirm_latency: float = 0.0):
+        self.confirm_latency = confirm_latency
+        self.messages = asyncio.Queue()
+        self.acked = 0
+        self.nacked = 0
+        self.published = 0
+        self.delivery_tag = 0
+        self.unacked = []
+
+    def deliver(self, body: bytes):
+        self.delivery_tag += 1
+        self.unacked.append(self.delivery_tag)
+        self.messages.put_nowait(FakeIncomingMessage(self, self.delivery_tag, body))
+
+    def stop(self):
+        self.messages.put_nowait(None)
+
+    def settle(self, delivery_tag: int, multiple: bool) -> int:
+        settled = [tag for tag in self.unacked if tag <= delivery_tag] if multiple else [delivery_tag]
+        self.unacked = [tag for tag in self.unacked if tag not in settled]
+        return len(settled)
+
+    async def connect(self, url: str = None) -> "FakeConnection":
+        return FakeConnection(self)
+
+class FakeIncomingMessage:
+    def __init__(self, broker: FakeBroker, delivery_tag: int, body: bytes):
+        self.broker = broker
+        self.delivery_tag = delivery_tag
+        self.body = body
+        self.redelivered = False
+        self.timestamp = None
+
+    async def ack(self, multiple: bool = False):
+        self.broker.acked += self.broker.settle(self.delivery_tag, multiple)
+
+    async def nack(self, multiple: bool = False, requeue: bool = True):
+        self.broker.nacked += self.broker.settle(self.delivery_tag, multiple)
+
+class FakeExchange:
+    def __init__(self, broker: FakeBroker):
+        self.broker = broker
+
+    async def publish(self, message, routing_key: str):
+        # The broker's confirm arrives one round-trip later
+        await asyncio.sleep(self.broker.confirm_latency)
+        self.broker.published += 1
+
+class FakeChannel:
+    def __init__(self, broker: FakeBroker):
+        self.default_exchange = FakeExchange(broker)
+        self.is_closed = False
+
+    async def declare_exchange(self, name: str, type: str, durable: bool = False) -> FakeExchange:
+        return self.default_exchange
+
+    async def close(self):
+        self.is_closed = True
+
+class FakeConnection:
+    def __init__(self, broker: FakeBroker):
+        self.broker = broker
+
+    async def channel(self, publisher_confirms: bool = True) -> FakeChannel:
+        return FakeChannel(self.broker)
+
+    async def close(self):
+        pass
+
+def make_qdrant_repo(documents: int = 100):
+    qdrant_repo = QdrantRepository(client=QdrantClient(location=":memory:"))
+    qdrant_repo.client.create_collection(
+        collection_name=COLLECTION_NAME,
+        vectors_config=models.VectorParams(size=VECTOR_SIZE, distance=models.Distance.COSINE)
+    )
+
+    docs = [
+        Document(page_content=f"Tiêu đề: Căn hộ {i}\nGiá: {property['price']} (Slug: {property['slug']})", metadata=property)
+        for i, property in enumerate(make_property(i) for i in range(documents))
+    ]
+    if not docs:
+        return qdrant_repo
+
+    qdrant_repo.insert_documents(
+        collection_name=COLLECTION_NAME,
+        documents=docs,
+        embeddings=fake_embeddings.embed_documents([doc.page_content for doc in docs])
+    )
+
+    return qdrant_repo
+
+def make_chat_history(turns: int):
+    return [
+        {
+            "human": f"Tìm căn hộ số {i}",
+            "ai": f"Căn hộ {i} (Slug: property-{i})",
+            "source_documents": [make_property(i)],
+            "page_contents": [f"Tiêu đề: Căn hộ {i} (Slug: property-{i})"],
+        }
+        for i in range(turns)
+    ]
@@ -108,7 +108,10 @@ class RabbitMQ {
                 exchange,
             });
 
-        this.channels[name]!.publish(exchange.name, '', Buffer.from(JSON.stringify(message)));
+        // AMQP timestamps are in seconds, consumers use it to measure queue lag
+        this.channels[name]!.publish(exchange.name, '', Buffer.from(JSON.stringify(message)), {
+            timestamp: Math.floor(Date.now() / 1000),
+        });
     }
 
     async subscribeToQueue({